@@ -0,0 +1,403 @@
+"""本地模拟的百度网盘服务
+
+在本机启动一个 HTTP 服务，模拟 storage.py 通过 BaiduPCSApi 调用的接口：
+access_shared、shared_paths、list_shared_paths（分页）、list、makedir、
+transfer_shared_paths、rename、quota。配合 FakePCSApi 客户端，可以在没有真实账号的情况下
+测量 transfer_share、list_local_files、_list_shared_dir_files 的性能。
+
+服务端的分享内容、网盘中已有的文件、延迟、分页上限和 -65（频率限制）注入都由场景配置决定，
+通过 POST /admin/setup 设置，GET /admin/stats 查看各接口调用次数。
+
+单独启动:
+    python benchmarks/fake_pcs.py --port 8765
+
+在 BaiduStorage 中使用:
+    BaiduStorage.api_factory = staticmethod(lambda cookies: FakePCSApi('http://127.0.0.1:8765', cookies))
+"""
+import argparse
+import json
+import posixpath
+import random
+import threading
+import time
+import urllib.request
+from collections import Counter, namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 与 baidupcs_py 返回对象的字段保持一致（storage.py 只用到这些属性）
+SharedPath = namedtuple('SharedPath', ['fs_id', 'path', 'size', 'is_dir', 'is_file', 'uk', 'share_id', 'bdstoken'])
+PcsFile = namedtuple('PcsFile', ['fs_id', 'path', 'size', 'is_dir', 'is_file'])
+
+# 默认场景
+DEFAULT_SCENARIO = {
+    'latency_ms': 0,            # 每个请求的固定延迟
+    'jitter_ms': 0,             # 额外的随机延迟上限
+    'max_page_size': 100,       # list_shared_paths 每页最多返回的条数
+    'share': {
+        'url': 'https://pan.baidu.com/s/1fake',
+        'pwd': '',
+        'root_name': '剧集',     # 分享的顶层文件夹名，为空时文件直接位于分享根目录
+        'depth': 1,              # 子目录层数（不含顶层文件夹）
+        'dirs_per_level': 0,     # 每层子目录数
+        'files_per_dir': 100,    # 每个目录的文件数
+        'file_size': 1024 * 1024 * 1024,
+    },
+    'save_dir': '/我的资源/剧集',
+    'existing_ratio': 0.0,       # 网盘中已存在的文件比例（增量转存）
+    'rate_limit': {
+        'methods': ['transfer_shared_paths'],
+        'every': 0,              # 每 N 次调用返回一次 -65，0 表示不注入
+        'probability': 0.0,      # 按概率返回 -65
+    },
+}
+
+
+class FakePCSError(Exception):
+    """与 BaiduPCSError 的字符串格式一致，storage.py 通过 'error_code: N' 判断错误类型"""
+
+    def __init__(self, error_code, message=''):
+        super().__init__(f'error_code: {error_code}, message: {message}')
+        self.error_code = error_code
+
+
+class Node:
+    __slots__ = ('name', 'is_dir', 'fs_id', 'size', 'children')
+
+    def __init__(self, name, is_dir, fs_id, size=0):
+        self.name = name
+        self.is_dir = is_dir
+        self.fs_id = fs_id
+        self.size = size
+        self.children = {} if is_dir else None
+
+
+class FakePan:
+    """模拟的网盘状态：一个分享和当前账号的网盘目录树"""
+
+    def __init__(self, scenario=None):
+        self.lock = threading.Lock()
+        self.setup(scenario or {})
+
+    def setup(self, scenario):
+        config = json.loads(json.dumps(DEFAULT_SCENARIO))
+        for key, value in scenario.items():
+            if isinstance(value, dict) and isinstance(config.get(key), dict):
+                config[key].update(value)
+            else:
+                config[key] = value
+        with self.lock:
+            self.config = config
+            self.stats = Counter()
+            self._next_fs_id = 1
+            self._rng = random.Random(42)
+            self.uk = 1000001
+            self.share_id = 2000002
+            self.bdstoken = 'fake-bdstoken'
+            self.share_root = Node('', True, self._fs_id())
+            self.share_files = {}  # fs_id -> (相对路径, Node)
+            self.disk = Node('', True, self._fs_id())
+            self._build_share(config['share'])
+            self._fill_existing(config['save_dir'], config['existing_ratio'])
+        return config
+
+    def _fs_id(self):
+        fs_id = self._next_fs_id
+        self._next_fs_id += 1
+        return fs_id
+
+    def _build_share(self, share):
+        root = self.share_root
+        if share['root_name']:
+            folder = Node(share['root_name'], True, self._fs_id())
+            root.children[folder.name] = folder
+            root = folder
+
+        def fill(node, rel, level):
+            for i in range(share['files_per_dir']):
+                name = f'第{i + 1:04d}集.mkv'
+                child = node.children[name] = Node(name, False, self._fs_id(), share['file_size'])
+                self.share_files[child.fs_id] = (posixpath.join(rel, name), child)
+            if level < share['depth']:
+                for i in range(share['dirs_per_level']):
+                    name = f'S{level + 1:02d}E{i + 1:02d}'
+                    sub = node.children[name] = Node(name, True, self._fs_id())
+                    fill(sub, posixpath.join(rel, name), level + 1)
+
+        fill(root, share['root_name'], 0)
+
+    def _fill_existing(self, save_dir, ratio):
+        """按比例把分享中的文件预先放入网盘，模拟已经转存过的部分"""
+        if ratio <= 0:
+            return
+        single_folder = bool(self.config['share']['root_name'])
+        for rel, node in self.share_files.values():
+            if self._rng.random() >= ratio:
+                continue
+            if single_folder:
+                rel = rel.split('/', 1)[1]
+            path = posixpath.join(save_dir, rel)
+            parent = self._makedirs(posixpath.dirname(path))
+            parent.children[node.name] = Node(node.name, False, self._fs_id(), node.size)
+
+    # ---- 目录树操作 ----
+
+    def _find(self, root, path):
+        node = root
+        for part in [p for p in path.split('/') if p]:
+            if not node.is_dir or part not in node.children:
+                return None
+            node = node.children[part]
+        return node
+
+    def _makedirs(self, path):
+        node = self.disk
+        for part in [p for p in path.split('/') if p]:
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = Node(part, True, self._fs_id())
+            elif not child.is_dir:
+                raise FakePCSError(-8, 'file already exists')
+            node = child
+        return node
+
+    def _share_path(self, rel):
+        return f'/sharelink{self.uk}-{self.share_id}/{rel}'.rstrip('/')
+
+    def _shared_item(self, node, rel):
+        return {'fs_id': node.fs_id, 'path': self._share_path(rel), 'size': node.size,
+                'is_dir': node.is_dir, 'is_file': not node.is_dir, 'uk': self.uk,
+                'share_id': self.share_id, 'bdstoken': self.bdstoken}
+
+    # ---- 接口 ----
+
+    def call(self, method, params):
+        with self.lock:
+            self.stats[method] += 1
+            self._maybe_rate_limit(method)
+            handler = getattr(self, f'api_{method}', None)
+            if handler is None:
+                raise FakePCSError(-1, f'unknown method {method}')
+            return handler(**params)
+
+    def _maybe_rate_limit(self, method):
+        limit = self.config['rate_limit']
+        if method not in limit['methods']:
+            return
+        hit = bool(limit['every']) and self.stats[method] % limit['every'] == 0
+        hit = hit or (limit['probability'] > 0 and self._rng.random() < limit['probability'])
+        if hit:
+            self.stats['rate_limited'] += 1
+            raise FakePCSError(-65, '访问频率过快')
+
+    def api_quota(self):
+        used = sum(node.size for node in self._walk(self.disk))
+        return [2 * 1024 ** 4, used]
+
+    def api_user_info(self):
+        return {'user': {'id': self.uk, 'name': 'fake_user'}}
+
+    def api_access_shared(self, shared_url, pwd=None):
+        share = self.config['share']
+        if shared_url != share['url']:
+            raise FakePCSError(115, '分享链接已失效')
+        if share['pwd'] and pwd != share['pwd']:
+            raise FakePCSError(-9, '提取码错误')
+        return True
+
+    def api_shared_paths(self, shared_url):
+        if shared_url != self.config['share']['url']:
+            raise FakePCSError(115, '分享链接已失效')
+        return [self._shared_item(node, name) for name, node in self.share_root.children.items()]
+
+    def api_list_shared_paths(self, path, uk, share_id, bdstoken, page=1, size=100):
+        prefix = self._share_path('')
+        rel = path[len(prefix):].strip('/') if path.startswith(prefix) else path.strip('/')
+        node = self._find(self.share_root, rel)
+        if node is None or not node.is_dir:
+            raise FakePCSError(-9, 'No such file or directory')
+        size = min(size, self.config['max_page_size'])
+        start = (page - 1) * size
+        children = list(node.children.items())[start:start + size]
+        self.stats['shared_pages'] += 1
+        return [self._shared_item(child, posixpath.join(rel, name)) for name, child in children]
+
+    def api_list(self, remotepath):
+        node = self._find(self.disk, remotepath)
+        if node is None or not node.is_dir:
+            raise FakePCSError(31066, 'No such file or directory')
+        return [{'fs_id': child.fs_id, 'path': posixpath.join(remotepath, name), 'size': child.size,
+                 'is_dir': child.is_dir, 'is_file': not child.is_dir}
+                for name, child in node.children.items()]
+
+    def api_makedir(self, directory):
+        if self._find(self.disk, directory) is not None:
+            raise FakePCSError(-8, 'file already exists')
+        self._makedirs(directory)
+        return True
+
+    def api_transfer_shared_paths(self, remotedir, fs_ids, uk, share_id, bdstoken, shared_url):
+        target = self._find(self.disk, remotedir)
+        if target is None or not target.is_dir:
+            raise FakePCSError(-9, 'No such file or directory')
+        for fs_id in fs_ids:
+            if fs_id not in self.share_files:
+                raise FakePCSError(4, '存储好像出问题了')
+        for fs_id in fs_ids:
+            _, node = self.share_files[fs_id]
+            target.children[node.name] = Node(node.name, False, self._fs_id(), node.size)
+            self.stats['transferred_files'] += 1
+            self.stats['transferred_bytes'] += node.size
+        return True
+
+    def api_rename(self, source, dest):
+        parent = self._find(self.disk, posixpath.dirname(source))
+        name = posixpath.basename(source)
+        if parent is None or name not in parent.children:
+            raise FakePCSError(-9, 'No such file or directory')
+        node = parent.children.pop(name)
+        dest_parent = self._makedirs(posixpath.dirname(dest))
+        node.name = posixpath.basename(dest)
+        dest_parent.children[node.name] = node
+        return True
+
+    def _walk(self, node):
+        for child in node.children.values():
+            if child.is_dir:
+                yield from self._walk(child)
+            else:
+                yield child
+
+
+def make_handler(pan):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, payload):
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _body(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            return json.loads(self.rfile.read(length) or b'{}')
+
+        def do_GET(self):
+            if self.path == '/admin/stats':
+                with pan.lock:
+                    self._send(200, dict(pan.stats))
+            else:
+                self._send(404, {'error_code': 404, 'message': 'not found'})
+
+        def do_POST(self):
+            params = self._body()
+            if self.path == '/admin/setup':
+                self._send(200, pan.setup(params))
+                return
+            if not self.path.startswith('/api/'):
+                self._send(404, {'error_code': 404, 'message': 'not found'})
+                return
+            config = pan.config
+            delay = config['latency_ms'] + random.uniform(0, config['jitter_ms'])
+            if delay > 0:
+                time.sleep(delay / 1000)
+            try:
+                self._send(200, {'result': pan.call(self.path[len('/api/'):], params)})
+            except FakePCSError as e:
+                self._send(200, {'error_code': e.error_code, 'message': str(e)})
+
+    return Handler
+
+
+def start_server(host='127.0.0.1', port=0, scenario=None):
+    """在后台线程启动模拟服务，返回 (server, base_url)"""
+    pan = FakePan(scenario)
+    server = ThreadingHTTPServer((host, port), make_handler(pan))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+
+class FakePCSApi:
+    """与 BaiduPCSApi 接口一致的客户端，请求发往本地模拟服务"""
+
+    def __init__(self, base_url, cookies=None):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = cookies
+        self._baidupcs = self  # get_user_info 通过 client._baidupcs.user_info() 获取账号信息
+
+    def _call(self, method, **params):
+        req = urllib.request.Request(f'{self.base_url}/api/{method}',
+                                     data=json.dumps(params).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            payload = json.loads(resp.read())
+        if 'error_code' in payload:
+            raise FakePCSError(payload['error_code'], payload['message'].split('message: ', 1)[-1])
+        return payload['result']
+
+    def quota(self):
+        return tuple(self._call('quota'))
+
+    def user_info(self):
+        return self._call('user_info')
+
+    def access_shared(self, shared_url, password=None, *args, **kwargs):
+        return self._call('access_shared', shared_url=shared_url, pwd=password)
+
+    def shared_paths(self, shared_url):
+        return [SharedPath(**item) for item in self._call('shared_paths', shared_url=shared_url)]
+
+    def list_shared_paths(self, sharedpath, uk, share_id, bdstoken, page=1, size=100):
+        return [SharedPath(**item) for item in self._call(
+            'list_shared_paths', path=sharedpath, uk=uk, share_id=share_id,
+            bdstoken=bdstoken, page=page, size=size)]
+
+    def list(self, remotepath, *args, **kwargs):
+        return [PcsFile(**item) for item in self._call('list', remotepath=remotepath)]
+
+    def makedir(self, directory):
+        return self._call('makedir', directory=directory)
+
+    def transfer_shared_paths(self, remotedir, fs_ids, uk, share_id, bdstoken, shared_url):
+        return self._call('transfer_shared_paths', remotedir=remotedir, fs_ids=fs_ids, uk=uk,
+                          share_id=share_id, bdstoken=bdstoken, shared_url=shared_url)
+
+    def rename(self, source, dest):
+        return self._call('rename', source=source, dest=dest)
+
+
+def admin(base_url, path, payload=None):
+    """调用模拟服务的管理接口"""
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    req = urllib.request.Request(f'{base_url}{path}', data=data,
+                                 headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=60) as resp:
+        return json.loads(resp.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地模拟的百度网盘服务')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--scenario', help='场景配置（JSON 字符串），默认见 DEFAULT_SCENARIO')
+    args = parser.parse_args()
+    scenario = json.loads(args.scenario) if args.scenario else None
+    pan = FakePan(scenario)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(pan))
+    server.daemon_threads = True
+    print(f'模拟网盘服务已启动: http://{args.host}:{args.port}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
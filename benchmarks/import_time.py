@@ -0,0 +1,86 @@
+"""启动导入耗时基准
+
+用 python -X importtime 在子进程中导入 web_app（与容器启动时相同的导入路径），统计：
+    1. 导入总耗时（多次运行取最小值）和导入后的峰值内存
+    2. 自身耗时最多的模块、按顶层包汇总的耗时
+    3. 只在首次使用时导入的模块（通知渠道、版本检查用到的 feedparser、网盘客户端）是否出现在启动路径中
+子进程在临时目录中运行，web_app 导入时创建的日志目录不会写到仓库里。
+
+用法:
+    python benchmarks/import_time.py --repeat 5 --top 20
+    python benchmarks/import_time.py --check   # 延迟导入的模块出现在启动路径中时返回非0
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 应在首次使用时才导入的模块
+DEFERRED_MODULES = ('notify', 'feedparser', 'requests', 'baidupcs_py')
+
+IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+SNIPPET = 'import resource, web_app; print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)'
+
+
+def profile_import(module_dir):
+    """导入一次 web_app，返回 (各模块 [(名称, 自身us, 累计us, 层级)], 峰值内存KB)"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, env.get('PYTHONPATH')]))
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', SNIPPET], cwd=module_dir, env=env,
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f'导入 web_app 失败:\n{proc.stderr[-2000:]}')
+    modules = []
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return modules, int(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='启动导入耗时基准')
+    parser.add_argument('--repeat', type=int, default=5, help='运行次数，耗时取最小值')
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--check', action='store_true', help='延迟导入的模块出现在启动路径中时返回非0')
+    args = parser.parse_args()
+
+    runs = []
+    with tempfile.TemporaryDirectory() as module_dir:
+        for _ in range(args.repeat):
+            runs.append(profile_import(module_dir))
+    # 首次运行可能需要生成字节码缓存，取总耗时最小的一次
+    modules, max_rss = min(runs, key=lambda run: sum(m[1] for m in run[0]))
+    total_ms = sum(m[1] for m in modules) / 1000
+    web_app = next((m for m in modules if m[0] == 'web_app'), None)
+
+    print(f"导入模块数: {len(modules)}")
+    print(f"导入总耗时: {total_ms:.1f} ms（其中 import web_app {web_app[2] / 1000:.1f} ms）")
+    print(f"峰值内存: {max_rss / 1024:.1f} MB")
+
+    print(f"\n自身耗时最多的 {args.top} 个模块:")
+    for name, self_us, cumulative_us, _ in sorted(modules, key=lambda m: -m[1])[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  (累计 {cumulative_us / 1000:8.1f} ms)  {name}")
+
+    packages = {}
+    for name, self_us, _, _ in modules:
+        package = name.split('.')[0]
+        packages[package] = packages.get(package, 0) + self_us
+    print(f"\n按顶层包汇总（前 {args.top}）:")
+    for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+
+    loaded = sorted({name.split('.')[0] for name, _, _, _ in modules} & set(DEFERRED_MODULES))
+    print(f"\n启动路径中的延迟导入模块: {', '.join(loaded) if loaded else '无'}")
+    if args.check and loaded:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""任务列表序列化与压缩基准
+
+构造 1000 个任务（部分任务带较长的 transferred_files 列表）的 /api/tasks 响应，
+对比标准库 json（Flask 默认参数）与 orjson 的序列化耗时，以及 gzip/brotli 压缩后的体积和耗时。
+orjson、brotli 未安装时跳过对应项。
+
+用法:
+    python benchmarks/json_payload.py --tasks 1000 --files 200
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_utils import orjson, brotli, compress, GZIP_LEVEL, BROTLI_QUALITY  # noqa: E402
+
+
+def make_fixture(task_count, files_per_task):
+    tasks = []
+    for i in range(task_count):
+        task = {
+            'order': i + 1,
+            'name': f'电视剧 第{i + 1}部',
+            'url': f'https://pan.baidu.com/s/1{"x" * 20}{i}',
+            'pwd': 'abcd',
+            'save_dir': f'/我的资源/电视剧/剧集{i + 1}',
+            'category': f'分类{i % 10}',
+            'cron': '*/30 * * * *',
+            'status': 'normal',
+            'message': '转存成功',
+            'last_execute_time': 1700000000 + i,
+        }
+        # 约五分之一的任务带有转存文件列表
+        if i % 5 == 0:
+            task['transferred_files'] = [
+                f'/我的资源/电视剧/剧集{i + 1}/第{j + 1:03d}集.1080p.WEB-DL.mkv' for j in range(files_per_task)
+            ]
+        tasks.append(task)
+    return {'success': True, 'tasks': tasks}
+
+
+def bench(func, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='任务列表序列化与压缩基准')
+    parser.add_argument('--tasks', type=int, default=1000)
+    parser.add_argument('--files', type=int, default=200, help='带转存记录的任务的文件数')
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    payload = make_fixture(args.tasks, args.files)
+
+    # 与 Flask DefaultJSONProvider 的默认参数一致
+    ms, data = bench(lambda: json.dumps(payload, ensure_ascii=True, sort_keys=True,
+                                        separators=(',', ':')).encode('utf-8'), args.repeat)
+    print(f'json   序列化 {ms:8.2f}ms  {len(data) / 1024:10.1f}KB')
+    if orjson is not None:
+        ms, data = bench(lambda: orjson.dumps(payload, option=orjson.OPT_NON_STR_KEYS), args.repeat)
+        print(f'orjson 序列化 {ms:8.2f}ms  {len(data) / 1024:10.1f}KB')
+    else:
+        print('orjson 未安装，跳过')
+
+    ms, packed = bench(lambda: compress(data, 'gzip'), args.repeat)
+    print(f'gzip(level={GZIP_LEVEL})   压缩 {ms:8.2f}ms  {len(packed) / 1024:10.1f}KB  '
+          f'({len(packed) / len(data):.1%})')
+    if brotli is not None:
+        ms, packed = bench(lambda: compress(data, 'br'), args.repeat)
+        print(f'br(quality={BROTLI_QUALITY})   压缩 {ms:8.2f}ms  {len(packed) / 1024:10.1f}KB  '
+              f'({len(packed) / len(data):.1%})')
+    else:
+        print('brotli 未安装，跳过')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""日志开销基准
+
+模拟一次 10000 个文件的转存：transfer_share 对每个分享文件和本地文件各输出一条 DEBUG 日志。
+分别在以下配置下统计调用线程上的日志耗时：
+    1. 每条日志执行两次未预编译的正则替换（原配置）
+    2. 只对含敏感关键字的日志做预编译的正则替换
+    3. 在 2 的基础上开启 enqueue，由后台线程写入
+    4. 在 2 的基础上把各输出的级别设为 INFO（DEBUG 日志在调用处即被跳过）
+控制台输出写入 os.devnull，避免终端速度影响结果。
+
+用法:
+    python benchmarks/logging_overhead.py --files 10000
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loguru import logger  # noqa: E402
+from utils import redact_sensitive_info  # noqa: E402
+
+LOG_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+
+
+def legacy_filter_sensitive_info(record):
+    """原配置中的 patcher"""
+    message = record["message"]
+    message = re.sub(r"BDUSS['\"]?\s*:\s*['\"]?([^'\"]+)['\"]?", "BDUSS: [已隐藏]", message)
+    message = re.sub(r"cookies['\"]?\s*:\s*['\"]?([^'\"]+)['\"]?", "cookies: [已隐藏]", message)
+    record["message"] = message
+    return True
+
+
+def configure(log_dir, patcher, level, enqueue):
+    logger.remove()
+    logger.configure(patcher=patcher)
+    console = open(os.devnull, 'w', encoding='utf-8')
+    logger.add(console, level=level, enqueue=enqueue, format=LOG_FORMAT)
+    logger.add(os.path.join(log_dir, 'bench.log'), level=level, enqueue=enqueue,
+               encoding='utf-8', format=LOG_FORMAT)
+    return console
+
+
+def simulate_transfer(file_count):
+    """与 transfer_share 中逐文件的日志量相当"""
+    for i in range(file_count):
+        path = f'/我的资源/电视剧/剧集/第{i:05d}集.1080p.WEB-DL.mkv'
+        logger.debug(f"分享文件: {path}, fs_id: {100000000 + i}, 大小: {i * 1024}")
+        logger.debug(f"本地已存在检查: {path} -> 不存在")
+        if i % 1000 == 0:
+            logger.info(f"已处理 {i}/{file_count} 个文件")
+
+
+def run(label, file_count, log_dir, patcher, level, enqueue):
+    console = configure(log_dir, patcher, level, enqueue)
+    start = time.perf_counter()
+    simulate_transfer(file_count)
+    caller = time.perf_counter() - start
+    # 等待后台线程写完，统计总耗时
+    logger.complete()
+    logger.remove()
+    total = time.perf_counter() - start
+    console.close()
+    print(f'{label}: 调用线程 {caller * 1000:8.1f}ms, 写入完成 {total * 1000:8.1f}ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='日志开销基准')
+    parser.add_argument('--files', type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as log_dir:
+        run('每条日志正则替换  ', args.files, log_dir, legacy_filter_sensitive_info, 'DEBUG', False)
+        run('按需替换          ', args.files, log_dir, redact_sensitive_info, 'DEBUG', False)
+        run('按需替换 + enqueue', args.files, log_dir, redact_sensitive_info, 'DEBUG', True)
+        run('按需替换 + INFO   ', args.files, log_dir, redact_sensitive_info, 'INFO', False)
+
+
+if __name__ == '__main__':
+    main()
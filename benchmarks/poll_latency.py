@@ -0,0 +1,220 @@
+"""状态轮询延迟压测
+
+持续发起慢请求，同时模拟多个页面高频轮询 /api/tasks/status，统计轮询的响应时间分布。
+阻塞操作被放到线程池之后，轮询的 p95 应当与没有慢请求时处于同一量级。
+
+两种运行方式:
+    1. 压测运行中的实例，慢请求默认为 /api/version/check:
+       python benchmarks/poll_latency.py --url http://127.0.0.1:5000 --user admin --password admin123
+    2. --local: 自行启动 fake_pcs.py 模拟网盘（每个接口带固定延迟）和使用它的 Web 服务（独立进程，
+       与容器中相同的 gevent 服务器），慢请求为 /api/share/info（会访问模拟网盘）。
+       加 --max-p95 后，有慢请求时轮询的 p95 超过阈值（或轮询出错）返回非0，可用作回归检查:
+       python benchmarks/poll_latency.py --local --duration 10 --max-p95 200
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(BENCH_DIR)
+
+SHARE_URL = 'https://pan.baidu.com/s/1fake'
+LOCAL_USER = 'admin'
+LOCAL_PASSWORD = 'admin'
+
+
+def make_opener(base_url, username, password):
+    """登录并返回带会话cookie的opener"""
+    opener = urllib.request.build_opener(
+        urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+    body = json.dumps({'username': username, 'password': password}).encode()
+    req = urllib.request.Request(f'{base_url}/api/auth/login', data=body,
+                                 headers={'Content-Type': 'application/json'})
+    with opener.open(req, timeout=10) as resp:
+        if not json.loads(resp.read()).get('success'):
+            raise SystemExit('登录失败')
+    return opener
+
+
+def request(opener, url, method='GET', timeout=120, body=None):
+    req = urllib.request.Request(url, method=method,
+                                 data=(body or '{}').encode() if method == 'POST' else None,
+                                 headers={'Content-Type': 'application/json'})
+    start = time.perf_counter()
+    with opener.open(req, timeout=timeout) as resp:
+        resp.read()
+    return time.perf_counter() - start
+
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return 0.0
+    k = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[k]
+
+
+def run(args, with_slow):
+    opener = make_opener(args.url, args.user, args.password)
+    stop = threading.Event()
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def poller():
+        while not stop.is_set():
+            try:
+                elapsed = request(opener, f'{args.url}/api/tasks/status', timeout=30)
+                with lock:
+                    latencies.append(elapsed)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+            time.sleep(args.interval)
+
+    def slow():
+        while not stop.is_set():
+            try:
+                request(opener, f'{args.url}{args.slow_path}', method=args.slow_method, body=args.slow_body)
+            except Exception:
+                pass
+
+    threads = [threading.Thread(target=poller, daemon=True) for _ in range(args.pollers)]
+    if with_slow:
+        threads += [threading.Thread(target=slow, daemon=True) for _ in range(args.slow_clients)]
+    for t in threads:
+        t.start()
+    time.sleep(args.duration)
+    stop.set()
+    for t in threads:
+        t.join(timeout=1)
+    return latencies, errors
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def serve_app(port, fake_url):
+    """在当前目录中写入测试配置并启动 Web 服务，网盘客户端替换为 FakePCSApi"""
+    os.makedirs('config', exist_ok=True)
+    config = {
+        'baidu': {
+            'users': {'bench': {'cookies': 'BDUSS=fake; STOKEN=fake', 'name': 'bench'}},
+            'current_user': 'bench',
+            'tasks': [{'url': f'https://pan.baidu.com/s/task{i}', 'save_dir': f'/bench/{i}',
+                       'order': i + 1, 'status': 'normal'} for i in range(50)]
+        },
+        'cron': {'default_schedule': []},
+        'notify': {'enabled': False},
+        'version_check': {'enabled': False},
+        'auth': {'users': LOCAL_USER, 'password': LOCAL_PASSWORD, 'session_timeout': 3600}
+    }
+    with open(os.path.join('config', 'config.json'), 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False)
+
+    from fake_pcs import FakePCSApi
+    from gevent.pywsgi import WSGIServer
+    import storage
+    import web_app
+    storage.BaiduStorage.api_factory = staticmethod(lambda cookies: FakePCSApi(fake_url, cookies))
+    web_app.init_app()
+    WSGIServer(('127.0.0.1', port), web_app.app, log=None).serve_forever()
+
+
+def start_local(args):
+    """启动模拟网盘和 Web 服务，等待网盘客户端就绪，返回 (Web 进程, Web 地址, 临时目录)"""
+    from fake_pcs import start_server
+    _, fake_url = start_server(scenario={'latency_ms': args.fake_latency,
+                                         'share': {'url': SHARE_URL}})
+    port = free_port()
+    work_dir = tempfile.TemporaryDirectory(prefix='poll_latency_')
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, BENCH_DIR, env.get('PYTHONPATH')]))
+    output = None if args.verbose else subprocess.DEVNULL
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve', str(port), '--fake-url', fake_url],
+                            cwd=work_dir.name, env=env, stdout=output, stderr=output)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            break
+        try:
+            with urllib.request.urlopen(f'{base_url}/api/health?ready=1', timeout=5):
+                return proc, base_url, work_dir
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.5)
+    proc.kill()
+    work_dir.cleanup()
+    raise SystemExit('本地 Web 服务启动失败（加 --verbose 查看日志）')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='状态轮询延迟压测')
+    parser.add_argument('--url', default='http://127.0.0.1:5000')
+    parser.add_argument('--user', default='admin')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--pollers', type=int, default=20, help='模拟的页面数')
+    parser.add_argument('--interval', type=float, default=1.0, help='每个页面的轮询间隔（秒）')
+    parser.add_argument('--duration', type=float, default=30.0, help='每轮压测时长（秒）')
+    parser.add_argument('--slow-path', default=None, help='慢请求路径，默认 /api/version/check，--local 时为 /api/share/info')
+    parser.add_argument('--slow-method', default=None)
+    parser.add_argument('--slow-body', default=None, help='POST 慢请求的 JSON 请求体')
+    parser.add_argument('--slow-clients', type=int, default=4)
+    parser.add_argument('--local', action='store_true', help='启动模拟网盘和本地 Web 服务后再压测')
+    parser.add_argument('--fake-latency', type=int, default=1000, help='--local 时模拟网盘每个接口的延迟（毫秒）')
+    parser.add_argument('--max-p95', type=float, default=None,
+                        help='有慢请求时轮询 p95 的上限（毫秒），超过或轮询出错时返回非0')
+    parser.add_argument('--verbose', action='store_true', help='--local 时输出 Web 服务的日志')
+    parser.add_argument('--serve', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--fake-url', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve_app(args.serve, args.fake_url)
+        return
+
+    proc = work_dir = None
+    if args.local:
+        proc, args.url, work_dir = start_local(args)
+        args.user, args.password = LOCAL_USER, LOCAL_PASSWORD
+        if args.slow_path is None:
+            args.slow_path, args.slow_method = '/api/share/info', 'POST'
+            args.slow_body = json.dumps({'url': SHARE_URL})
+    args.slow_path = args.slow_path or '/api/version/check'
+    args.slow_method = args.slow_method or 'GET'
+
+    try:
+        for label, with_slow in (('仅轮询', False), ('轮询 + 慢请求', True)):
+            latencies, errors = run(args, with_slow)
+            ms = [v * 1000 for v in latencies]
+            p95 = percentile(ms, 95)
+            print(f'{label}: 请求 {len(ms)} 次, 失败 {len(errors)} 次, '
+                  f'p50 {percentile(ms, 50):.1f}ms, p95 {p95:.1f}ms, '
+                  f'p99 {percentile(ms, 99):.1f}ms, max {max(ms, default=0):.1f}ms')
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+            work_dir.cleanup()
+
+    if args.max_p95 is not None:
+        if errors or not ms or p95 > args.max_p95:
+            print(f'检查失败: 有慢请求时轮询 p95 {p95:.1f}ms（上限 {args.max_p95:.1f}ms），失败 {len(errors)} 次')
+            sys.exit(1)
+        print(f'检查通过: 有慢请求时轮询 p95 {p95:.1f}ms ≤ {args.max_p95:.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
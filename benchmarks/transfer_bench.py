@@ -0,0 +1,172 @@
+"""转存流程基准（离线）
+
+启动 fake_pcs.py 模拟服务（独立进程），将 BaiduStorage 的客户端替换为 FakePCSApi，
+在多个场景下执行 transfer_share 和 list_local_files，报告接口调用次数、耗时和峰值内存。
+
+transfer_share 中为规避频率限制的固定等待（每个目录组1秒、-65 后10秒等）默认不真正等待，
+只累计其时长单独列出；加 --real-sleep 按实际等待执行。
+
+用法:
+    python benchmarks/transfer_bench.py
+    python benchmarks/transfer_bench.py --scenario flat_1000 --scenario rate_limited
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+from fake_pcs import FakePCSApi, admin  # noqa: E402
+
+SHARE_URL = 'https://pan.baidu.com/s/1fake'
+
+SCENARIOS = {
+    # 单个文件夹，1000 个文件（10 页）
+    'flat_1000': {'share': {'files_per_dir': 1000, 'depth': 0}},
+    # 两层子目录，每层 5 个目录，每个目录 20 个文件
+    'tree': {'share': {'files_per_dir': 20, 'depth': 2, 'dirs_per_level': 5}},
+    # 1000 个文件中 90% 已转存过
+    'incremental_90': {'share': {'files_per_dir': 1000, 'depth': 0}, 'existing_ratio': 0.9},
+    # 目录树 + 每 3 次转存返回一次 -65
+    'rate_limited': {'share': {'files_per_dir': 20, 'depth': 2, 'dirs_per_level': 5},
+                     'rate_limit': {'every': 3}},
+    # 每个请求 20ms 延迟
+    'latency_20ms': {'share': {'files_per_dir': 300, 'depth': 1, 'dirs_per_level': 3},
+                     'latency_ms': 20},
+}
+
+
+class SkippedSleepTime:
+    """替换 storage 模块中的 time，sleep 只累计时长不实际等待"""
+
+    def __init__(self):
+        self.slept = 0.0
+
+    def sleep(self, seconds):
+        self.slept += seconds
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_fake_server():
+    port = free_port()
+    proc = subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, 'fake_pcs.py'), '--port', str(port)],
+                            stdout=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    for _ in range(100):
+        try:
+            admin(base_url, '/admin/stats')
+            return proc, base_url
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise SystemExit('模拟服务启动失败')
+
+
+def make_storage(work_dir, base_url):
+    """在临时目录中用测试配置创建 BaiduStorage"""
+    os.makedirs(os.path.join(work_dir, 'config'), exist_ok=True)
+    config = {
+        'baidu': {
+            'users': {'bench': {'cookies': 'BDUSS=fake; STOKEN=fake', 'name': 'bench'}},
+            'current_user': 'bench',
+            'tasks': []
+        },
+        'cron': {'default_schedule': []},
+        'notify': {'enabled': False},
+        'file_operations': {'rename_delay_seconds': 0},
+        'auth': {'users': 'admin', 'password': 'admin', 'session_timeout': 3600}
+    }
+    with open(os.path.join(work_dir, 'config', 'config.json'), 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False)
+    os.chdir(work_dir)
+
+    import storage
+    storage.BaiduStorage.api_factory = staticmethod(lambda cookies: FakePCSApi(base_url, cookies))
+    return storage, storage.BaiduStorage()
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def format_calls(stats):
+    keys = ['access_shared', 'shared_paths', 'list_shared_paths', 'list', 'makedir',
+            'transfer_shared_paths', 'rename', 'rate_limited']
+    return ' '.join(f'{key}={stats[key]}' for key in keys if stats.get(key))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='转存流程基准（离线）')
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help='要运行的场景，可重复指定，默认全部')
+    parser.add_argument('--real-sleep', action='store_true', help='按实际时长执行转存流程中的等待')
+    parser.add_argument('--verbose', action='store_true', help='输出 storage 的日志')
+    args = parser.parse_args()
+
+    from loguru import logger
+    logger.remove()
+    if args.verbose:
+        logger.add(sys.stderr, level='DEBUG')
+
+    proc, base_url = start_fake_server()
+    work_dir = tempfile.mkdtemp(prefix='transfer_bench_')
+    try:
+        storage_module, storage = make_storage(work_dir, base_url)
+        for name in args.scenario or list(SCENARIOS):
+            scenario = dict(SCENARIOS[name], share=dict(SCENARIOS[name].get('share', {}), url=SHARE_URL))
+            config = admin(base_url, '/admin/setup', scenario)
+            save_dir = config['save_dir']
+
+            sleeper = SkippedSleepTime()
+            if not args.real_sleep:
+                storage_module.time = sleeper
+            try:
+                result, elapsed, peak = measure(
+                    lambda: storage.transfer_share(SHARE_URL, None, None, save_dir))
+            finally:
+                storage_module.time = time
+            stats = admin(base_url, '/admin/stats')
+            status = '成功' if result.get('success') else f"失败: {result.get('error')}"
+            print(f'[{name}] transfer_share {status}，转存 {len(result.get("transferred_files", []))} 个文件')
+            print(f'    耗时 {elapsed * 1000:.0f}ms（跳过等待 {sleeper.slept:.1f}s），'
+                  f'峰值内存 {peak / 1024 / 1024:.2f}MB，分享列表分页 {stats.get("shared_pages", 0)} 次')
+            print(f'    调用: {format_calls(stats)}')
+            metrics = result.get('metrics', {})
+            steps = ' '.join(f'{step}={elapsed * 1000:.0f}ms' for step, elapsed in metrics.get('steps', {}).items())
+            print(f'    阶段: {steps}，重试 {metrics.get("retries", 0)} 次，'
+                  f'-65 {metrics.get("rate_limited", 0)} 次，转存 {metrics.get("bytes_transferred", 0) / 1024 / 1024:.1f}MB')
+
+            before = admin(base_url, '/admin/stats')
+            files, elapsed, peak = measure(lambda: storage.list_local_files(save_dir))
+            calls = admin(base_url, '/admin/stats').get('list', 0) - before.get('list', 0)
+            print(f'[{name}] list_local_files {len(files)} 个文件，耗时 {elapsed * 1000:.0f}ms，'
+                  f'峰值内存 {peak / 1024 / 1024:.2f}MB，list 调用 {calls} 次')
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+if __name__ == '__main__':
+    main()
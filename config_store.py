@@ -0,0 +1,226 @@
+import json
+import os
+import sqlite3
+import time
+from threading import RLock
+from loguru import logger
+
+CONFIG_PATH = 'config/config.json'
+SQLITE_PATH = 'config/config.db'
+
+
+class JsonConfigStore:
+    """基于 config.json 的配置存储（默认后端）
+
+    整个配置作为一个 JSON 文档读写，单任务更新也会重写整个文件。
+    """
+
+    name = 'json'
+    row_writes = False  # 单任务更新只能整体重写
+
+    def __init__(self, path=CONFIG_PATH):
+        self.path = path
+        self._lock = RLock()
+
+    def exists(self):
+        """配置是否存在且不为空"""
+        return os.path.exists(self.path) and os.path.getsize(self.path) > 0
+
+    def load(self):
+        """加载完整配置"""
+        with self._lock:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+
+    def save(self, config):
+        """保存完整配置"""
+        with self._lock:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                json.dump(config, f, ensure_ascii=False, indent=4)
+
+            # 确保配置已经写入文件
+            with open(self.path, 'r', encoding='utf-8') as f:
+                saved_config = json.load(f)
+                if saved_config != config:
+                    logger.error("配置保存验证失败")
+                    raise Exception("配置保存验证失败")
+
+    def close(self):
+        pass
+
+
+class SqliteConfigStore:
+    """基于 SQLite 的配置存储
+
+    任务按行存储（自增 id 为主键，保持任务列表顺序；order、url 建索引），其余配置段
+    以 JSON 形式存放在 settings 表中。单任务更新只写一行，不再重写整个配置。
+    首次启动时如果数据库为空，会从 config.json 一次性迁移。
+    """
+
+    name = 'sqlite'
+    row_writes = True
+
+    def __init__(self, path=SQLITE_PATH, json_path=CONFIG_PATH):
+        self.path = path
+        self.json_path = json_path
+        self._lock = RLock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._init_schema()
+
+    def _init_schema(self):
+        with self._lock:
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS settings (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS tasks (
+                    id INTEGER PRIMARY KEY,
+                    task_order INTEGER,
+                    url TEXT NOT NULL,
+                    category TEXT,
+                    data TEXT NOT NULL
+                );
+            ''')
+            columns = [row[1] for row in self._conn.execute('PRAGMA table_info(tasks)')]
+            if 'id' not in columns:
+                self._upgrade_tasks_table()
+            self._conn.executescript('''
+                CREATE INDEX IF NOT EXISTS idx_tasks_order ON tasks(task_order);
+                CREATE INDEX IF NOT EXISTS idx_tasks_url ON tasks(url);
+            ''')
+
+    def _upgrade_tasks_table(self):
+        """旧版 tasks 表以 task_order 为主键，重复或缺失 order 的任务无法写入，改为自增 id 主键"""
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._conn.execute('ALTER TABLE tasks RENAME TO tasks_old')
+            self._conn.execute('''
+                CREATE TABLE tasks (
+                    id INTEGER PRIMARY KEY,
+                    task_order INTEGER,
+                    url TEXT NOT NULL,
+                    category TEXT,
+                    data TEXT NOT NULL
+                )
+            ''')
+            self._conn.execute('''
+                INSERT INTO tasks (task_order, url, category, data)
+                SELECT task_order, url, category, data FROM tasks_old ORDER BY task_order
+            ''')
+            self._conn.execute('DROP TABLE tasks_old')
+            self._conn.execute('DROP INDEX IF EXISTS idx_tasks_category')
+            self._conn.execute('COMMIT')
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
+        logger.info("已升级 SQLite 任务表结构")
+
+    def _is_empty(self):
+        row = self._conn.execute('SELECT COUNT(*) FROM settings').fetchone()
+        return row[0] == 0
+
+    def exists(self):
+        """数据库中已有配置，或存在可迁移的 config.json"""
+        with self._lock:
+            if not self._is_empty():
+                return True
+        return os.path.exists(self.json_path) and os.path.getsize(self.json_path) > 0
+
+    def load(self):
+        """加载完整配置，数据库为空时先从 config.json 迁移"""
+        with self._lock:
+            if self._is_empty():
+                self._migrate_from_json()
+
+            config = {}
+            for key, value in self._conn.execute('SELECT key, value FROM settings'):
+                config[key] = json.loads(value)
+
+            tasks = [
+                json.loads(data) for (data,) in
+                self._conn.execute('SELECT data FROM tasks ORDER BY id')
+            ]
+            config.setdefault('baidu', {})['tasks'] = tasks
+            return config
+
+    def _migrate_from_json(self):
+        """从 config.json 一次性迁移到 SQLite"""
+        if not os.path.exists(self.json_path):
+            raise FileNotFoundError(self.json_path)
+
+        with open(self.json_path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+
+        self.save(config)
+        task_count = len(config.get('baidu', {}).get('tasks', []))
+        logger.success(f"已将 {self.json_path} 迁移到 {self.path}，共 {task_count} 个任务")
+
+        # 保留原文件作为备份，避免后续误用
+        backup_path = f'{self.json_path}.migrated.{int(time.time())}'
+        try:
+            os.replace(self.json_path, backup_path)
+            logger.info(f"原配置文件已备份到: {backup_path}")
+        except OSError as e:
+            logger.warning(f"备份原配置文件失败: {str(e)}")
+
+    @staticmethod
+    def _task_row(task):
+        category = task.get('category') or None
+        return (task.get('order'), task.get('url', ''), category,
+                json.dumps(task, ensure_ascii=False))
+
+    def save(self, config):
+        """在一个事务中保存完整配置"""
+        with self._lock:
+            settings = []
+            for key, value in config.items():
+                if key == 'baidu':
+                    value = {k: v for k, v in value.items() if k != 'tasks'}
+                settings.append((key, json.dumps(value, ensure_ascii=False)))
+            tasks = config.get('baidu', {}).get('tasks', [])
+
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute('DELETE FROM settings')
+                self._conn.executemany('INSERT INTO settings (key, value) VALUES (?, ?)', settings)
+                self._conn.execute('DELETE FROM tasks')
+                self._conn.executemany(
+                    'INSERT INTO tasks (task_order, url, category, data) VALUES (?, ?, ?, ?)',
+                    [self._task_row(task) for task in tasks]
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def save_task(self, task):
+        """只更新单个任务所在的行，任务必须带有order（加载时已保证 order 唯一，见 BaiduStorage）"""
+        with self._lock:
+            order, url, category, data = self._task_row(task)
+            cursor = self._conn.execute(
+                'UPDATE tasks SET url = ?, category = ?, data = ? WHERE task_order = ?',
+                (url, category, data, order)
+            )
+            if cursor.rowcount == 0:
+                self._conn.execute(
+                    'INSERT INTO tasks (task_order, url, category, data) VALUES (?, ?, ?, ?)',
+                    (order, url, category, data)
+                )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_config_store():
+    """根据环境变量 CONFIG_BACKEND 创建配置存储（json/sqlite，默认json）"""
+    backend = os.getenv('CONFIG_BACKEND', 'json').strip().lower()
+    if backend == 'sqlite':
+        return SqliteConfigStore(os.getenv('CONFIG_DB_PATH', SQLITE_PATH))
+    if backend != 'json':
+        logger.warning(f"未知的配置存储后端: {backend}，使用json")
+    return JsonConfigStore()
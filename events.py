@@ -0,0 +1,68 @@
+import json
+import time
+from collections import deque, namedtuple
+from itertools import islice
+from threading import Lock
+
+# 单条事件: id 单调递增，type 为事件类型，data 为可序列化为JSON的内容
+Event = namedtuple('Event', ['id', 'type', 'data', 'time'])
+
+# 环形缓冲区默认容量，断线重连时可从缓冲区内补发错过的事件
+DEFAULT_BUFFER_SIZE = 2000
+
+
+class EventBroker:
+    """进程内事件中心
+
+    生产者（调度器线程、批量作业线程、请求处理）调用 publish 发布事件，
+    SSE 连接按 Last-Event-ID 从环形缓冲区增量读取。发布只是一次加锁追加，
+    不会因为慢的订阅者而阻塞。
+    """
+
+    def __init__(self, maxlen=DEFAULT_BUFFER_SIZE):
+        self._events = deque(maxlen=maxlen)
+        self._lock = Lock()
+        self._last_id = 0
+
+    @property
+    def last_id(self):
+        return self._last_id
+
+    def publish(self, event_type, data):
+        """发布事件，返回事件id"""
+        with self._lock:
+            self._last_id += 1
+            self._events.append(Event(self._last_id, event_type, data, time.time()))
+            return self._last_id
+
+    def since(self, last_id):
+        """获取 last_id 之后的事件
+        Returns:
+            tuple: (events, missed)，missed 为 True 表示有事件已被挤出缓冲区，
+                   订阅者需要重新拉取完整数据
+        """
+        if last_id == self._last_id:
+            return [], False
+        if last_id > self._last_id:
+            # 服务重启后id重新计数，订阅者持有的id已无效
+            return [], True
+        with self._lock:
+            if not self._events:
+                return [], False
+            first_id = self._events[0].id
+            missed = last_id + 1 < first_id
+            start = max(0, last_id + 1 - first_id)
+            events = list(islice(self._events, start, None))
+        return events, missed
+
+
+def format_sse(event_type, data, event_id=None):
+    """按 text/event-stream 格式编码一条事件"""
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event_type}')
+    payload = json.dumps(data, ensure_ascii=False)
+    for line in payload.splitlines() or ['']:
+        lines.append(f'data: {line}')
+    return '\n'.join(lines) + '\n\n'
@@ -15,6 +15,20 @@ export function useVersionCheck() {
     notes?: string
   } | null>(null)
   
+  // 版本检查接口返回 pending 时的重试
+  const PENDING_RETRY_DELAY = 10 * 1000
+  const MAX_PENDING_RETRIES = 3
+  let pendingRetries = 0
+  
+  const schedulePendingRetry = () => {
+    if (pendingRetries >= MAX_PENDING_RETRIES) {
+      console.log('版本信息仍在获取中，稍后再检查')
+      return
+    }
+    pendingRetries++
+    setTimeout(checkForUpdates, PENDING_RETRY_DELAY)
+  }
+  
   const checkForUpdates = async () => {
     if (checking.value) return
     
@@ -27,7 +41,14 @@ export function useVersionCheck() {
         try {
           const response = await apiService.checkVersion(source)
           
+          if (response.pending) {
+            // 服务端还没有缓存，正在后台获取：稍后重试，不再依次尝试其他来源
+            schedulePendingRetry()
+            break
+          }
+          
           if (response.success && response.version) {
+            pendingRetries = 0
             latestVersion.value = response.version
             hasUpdate.value = compareVersions(response.version, currentVersion.value) > 0
             
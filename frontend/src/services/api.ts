@@ -114,16 +114,23 @@ export class ApiService {
     return httpClient.get('/api/logs', { limit })
   }
 
-  async getTasksStatus(): Promise<ApiResponse<{ tasks: Task[] }>> {
-    return httpClient.get('/api/tasks/status')
+  async getTasksStatus(since?: number | null): Promise<ApiResponse<{ tasks: Task[], version: number, full: boolean }>> {
+    // since 为上次响应的 version，只获取之后有变化的任务
+    const query = since != null ? `?since=${since}` : ''
+    return httpClient.get(`/api/tasks/status${query}`)
   }
 
   async getTaskStatus(taskId: number): Promise<ApiResponse<Task>> {
     return httpClient.get(`/api/tasks/${taskId}/status`)
   }
 
-  async getTaskLog(taskId: number): Promise<ApiResponse<any>> {
-    return httpClient.get(`/api/task/log/${taskId}`)
+  async getTaskLog(taskId: number, since?: number | null, run?: number | null): Promise<ApiResponse<any>> {
+    // since 为上次收到的最后一条日志序号，只获取新增日志；run 为上次响应中的执行编号，用于判断任务是否已重新执行
+    const params = new URLSearchParams()
+    if (since != null) params.set('since', String(since))
+    if (since != null && run != null) params.set('run', String(run))
+    const query = params.toString() ? `?${params}` : ''
+    return httpClient.get(`/api/task/log/${taskId}${query}`)
   }
 
   // 认证相关API
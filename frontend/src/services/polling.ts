@@ -43,6 +43,10 @@ class EventEmitter {
 
 export class PollingService extends EventEmitter {
   private taskStatusTimer: number | null = null
+  private eventSource: EventSource | null = null
+  private streamConnected = false
+  private lastTasks: Task[] = []
+  private lastVersion: number | null = null
   private isRunning = false
   private retryCount = 0
   private maxRetries = 3
@@ -68,9 +72,10 @@ export class PollingService extends EventEmitter {
     this.pollTaskStatus()
     
     // 启动任务状态定时轮询
-    this.taskStatusTimer = window.setInterval(() => {
-      this.pollTaskStatus()
-    }, this.config.taskStatusInterval)
+    this.startTimer(this.config.taskStatusInterval)
+    
+    // 优先使用服务端推送，连接成功后停止定时轮询
+    this.connectStream()
     
     this.emit('started')
   }
@@ -81,36 +86,119 @@ export class PollingService extends EventEmitter {
     this.isRunning = false
     console.log('停止任务状态轮询服务')
     
-    if (this.taskStatusTimer) {
-      clearInterval(this.taskStatusTimer)
-      this.taskStatusTimer = null
+    this.stopTimer()
+    
+    if (this.eventSource) {
+      this.eventSource.close()
+      this.eventSource = null
     }
+    this.streamConnected = false
     
     this.emit('stopped')
   }
 
   // 设置快速轮询（任务执行时使用）
   setFastPolling(enabled: boolean) {
-    if (this.taskStatusTimer) {
-      clearInterval(this.taskStatusTimer)
-    }
+    // 推送连接正常时状态变化实时到达，不需要加快轮询
+    if (this.streamConnected) return
     
     const interval = enabled 
       ? this.config.fastPollingInterval 
       : this.config.taskStatusInterval
       
+    this.startTimer(interval)
+    
+    console.log(`轮询频率已调整为: ${interval}ms`)
+  }
+
+  private startTimer(interval: number) {
+    this.stopTimer()
     this.taskStatusTimer = window.setInterval(() => {
-      this.pollTaskStatus()
+      // 定时轮询只获取上次之后变化的任务
+      this.pollTaskStatus(true)
     }, interval)
+  }
+
+  private stopTimer() {
+    if (this.taskStatusTimer) {
+      clearInterval(this.taskStatusTimer)
+      this.taskStatusTimer = null
+    }
+  }
+
+  // 订阅 /api/events 推送的任务状态，断开期间回退为定时轮询
+  private connectStream() {
+    if (typeof EventSource === 'undefined' || this.eventSource) return
     
-    console.log(`轮询频率已调整为: ${interval}ms`)
+    const source = new EventSource('/api/events?types=task_status,tasks_changed')
+    this.eventSource = source
+    
+    source.onopen = () => {
+      this.streamConnected = true
+      this.stopTimer()
+      // 重新连接后拉取一次完整状态，补上断开期间的变化
+      this.pollTaskStatus()
+      console.log('任务状态推送已连接，停止定时轮询')
+    }
+    
+    source.addEventListener('task_status', (event) => {
+      const data = JSON.parse((event as MessageEvent).data)
+      this.applyTaskDelta(data.task)
+    })
+    
+    // 任务增删、重排等整体变化，或错过了部分事件时重新拉取
+    source.addEventListener('tasks_changed', () => this.pollTaskStatus())
+    source.addEventListener('reset', () => this.pollTaskStatus())
+    
+    source.onerror = () => {
+      if (this.streamConnected) {
+        this.streamConnected = false
+        console.log('任务状态推送已断开，回退为定时轮询')
+      }
+      if (source.readyState === EventSource.CLOSED) {
+        // 浏览器不会再自动重连（如未登录），保持定时轮询
+        this.eventSource = null
+      }
+      if (this.isRunning && !this.taskStatusTimer) {
+        this.startTimer(this.config.taskStatusInterval)
+      }
+    }
+  }
+
+  // 将单个任务的增量合并到最近一次的完整列表中
+  private applyTaskDelta(delta: Partial<Task>) {
+    const index = this.lastTasks.findIndex(task => task.order === delta.order)
+    if (index === -1) {
+      this.pollTaskStatus()
+      return
+    }
+    this.lastTasks[index] = { ...this.lastTasks[index], ...delta }
+    this.emit('task_update', [...this.lastTasks])
   }
 
-  private async pollTaskStatus() {
+  private async pollTaskStatus(incremental = false) {
     try {
-      const response = await apiService.getTasksStatus()
+      const since = incremental ? this.lastVersion : null
+      const response = await apiService.getTasksStatus(since)
       if (response.success) {
-        this.emit('task_update', response.tasks || response.data?.tasks || [])
+        const tasks: Task[] = response.tasks || response.data?.tasks || []
+        const version = response.version ?? response.data?.version
+        const full = response.full ?? response.data?.full ?? true
+        if (full) {
+          this.lastTasks = tasks
+        } else {
+          // 只有变化的任务，按 order 合并到已有列表
+          for (const task of tasks) {
+            const index = this.lastTasks.findIndex(item => item.order === task.order)
+            if (index !== -1) {
+              this.lastTasks[index] = task
+            }
+          }
+        }
+        this.lastVersion = version ?? null
+        if (full || tasks.length > 0) {
+          this.emit('task_update', [...this.lastTasks])
+        }
         this.retryCount = 0
       } else {
         this.handleError('任务状态轮询失败', response.message)
@@ -231,7 +231,8 @@ export const useTaskStore = defineStore('tasks', () => {
 
       const response = await apiService.executeBatchTasks(taskIds)
       if (response.success) {
-        return response.results || response.data?.results
+        // 批量执行已改为后台作业，接口立即返回作业信息，进度通过 /api/jobs/<job_id> 查询
+        return response.job
       } else {
         throw new Error(response.message || '批量执行任务失败')
       }
@@ -19,6 +19,20 @@ export const useVersionStore = defineStore('version', () => {
     notes?: string
   } | null>(null)
   
+  // 版本检查接口返回 pending 时的重试
+  const PENDING_RETRY_DELAY = 10 * 1000
+  const MAX_PENDING_RETRIES = 3
+  let pendingRetries = 0
+  
+  const schedulePendingRetry = () => {
+    if (pendingRetries >= MAX_PENDING_RETRIES) {
+      console.log('版本信息仍在获取中，稍后再检查')
+      return
+    }
+    pendingRetries++
+    setTimeout(checkForUpdates, PENDING_RETRY_DELAY)
+  }
+  
   const checkForUpdates = async () => {
     // 防止重复检查：如果正在检查或最近30分钟内已检查过，则跳过
     const CACHE_DURATION = 30 * 60 * 1000 // 30分钟缓存
@@ -45,7 +59,14 @@ export const useVersionStore = defineStore('version', () => {
         try {
           const response = await apiService.checkVersion(source)
           
+          if (response.pending) {
+            // 服务端还没有缓存，正在后台获取：稍后重试，不再依次尝试其他来源
+            schedulePendingRetry()
+            break
+          }
+          
           if (response.success && response.version) {
+            pendingRetries = 0
             latestVersion.value = response.version
             hasUpdate.value = compareVersions(response.version, currentVersion.value) > 0
             lastCheckTime.value = now
@@ -0,0 +1,179 @@
+import os
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Lock
+from loguru import logger
+
+# 同时执行的任务数上限，过高容易触发百度接口频率限制
+DEFAULT_JOB_WORKERS = 2
+# 内存中保留的已结束作业数量
+MAX_FINISHED_JOBS = 50
+
+
+class BatchJob:
+    """一次批量执行作业
+
+    每个任务的进度保存在 items 中（按 order 索引），执行日志仍写入
+    各任务自己的日志缓冲区，与单任务执行共用。
+    """
+
+    def __init__(self, task_orders, names=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.created_at = int(time.time())
+        self.finished_at = None
+        self.status = 'pending'  # pending/running/completed/cancelled
+        self.cancel_event = Event()
+        self._lock = Lock()
+        self._futures = {}
+        names = names or {}
+        self.items = OrderedDict(
+            (order, {'order': order, 'name': names.get(order, ''), 'status': 'pending', 'message': ''})
+            for order in task_orders
+        )
+        # 汇总结果，格式与 generate_transfer_notification 的输入一致
+        self.results = {'success': [], 'skipped': [], 'failed': [], 'transferred_files': {}}
+        self._remaining = len(self.items)
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def update_item(self, order, status, message=''):
+        with self._lock:
+            item = self.items.get(order)
+            if item is not None:
+                item['status'] = status
+                item['message'] = message
+
+    def to_dict(self):
+        """作业摘要，用于接口返回"""
+        with self._lock:
+            items = [dict(item) for item in self.items.values()]
+            status = self.status
+        counts = {}
+        for item in items:
+            counts[item['status']] = counts.get(item['status'], 0) + 1
+        return {
+            'job_id': self.id,
+            'status': status,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+            'total': len(items),
+            'counts': counts,
+            'tasks': items
+        }
+
+
+class JobManager:
+    """批量作业管理器
+
+    所有作业共用一个有界线程池，保证同时执行的任务数不超过 max_workers。
+    run_task(order, job) 负责执行单个任务并返回结果字典:
+        {'status': 'success'|'skipped'|'failed', 'task': 任务, 'transferred_files': [...], 'error': ...}
+    on_finished(job) 在作业全部结束后调用一次（用于根据 job.results 发送汇总通知）。
+    """
+
+    def __init__(self, run_task, on_finished=None, max_workers=None):
+        if max_workers is None:
+            max_workers = int(os.getenv('BATCH_JOB_WORKERS', DEFAULT_JOB_WORKERS))
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='batch-job')
+        self._run_task = run_task
+        self._on_finished = on_finished
+        self._jobs = OrderedDict()
+        self._lock = Lock()
+
+    def submit(self, task_orders, names=None):
+        """提交批量作业，立即返回作业对象"""
+        job = BatchJob(task_orders, names)
+
+        def run_one(order):
+            if job.cancelled:
+                job.update_item(order, 'cancelled', '作业已取消')
+            else:
+                with job._lock:
+                    job.status = 'running'
+                job.update_item(order, 'running', '正在执行')
+                try:
+                    result = self._run_task(order, job)
+                except Exception as e:
+                    logger.error(f"批量作业 {job.id} 执行任务 order={order} 失败: {str(e)}")
+                    result = {'status': 'failed', 'error': str(e)}
+                status = result.get('status', 'failed')
+                job.update_item(order, status, result.get('message') or result.get('error', ''))
+                task = result.get('task')
+                if task is not None and status in job.results:
+                    with job._lock:
+                        job.results[status].append(task)
+                        if result.get('transferred_files'):
+                            job.results['transferred_files'][task['url']] = result['transferred_files']
+            self._finish_one(job)
+
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        logger.info(f"提交批量作业 {job.id}，共 {len(job.items)} 个任务，并发上限 {self.max_workers}")
+        if not job.items:
+            self._complete(job)
+        for order in job.items:
+            job._futures[order] = self._executor.submit(run_one, order)
+        return job
+
+    def _finish_one(self, job):
+        with job._lock:
+            job._remaining -= 1
+            done = job._remaining == 0
+        if done:
+            self._complete(job)
+
+    def _complete(self, job):
+        results = job.results
+        with job._lock:
+            job.status = 'cancelled' if job.cancelled else 'completed'
+            job.finished_at = int(time.time())
+        logger.info(f"批量作业 {job.id} 结束: 成功 {len(results['success'])}，"
+                    f"跳过 {len(results['skipped'])}，失败 {len(results['failed'])}")
+        if self._on_finished:
+            try:
+                self._on_finished(job)
+            except Exception as e:
+                logger.error(f"批量作业 {job.id} 结束回调失败: {str(e)}")
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self):
+        """按提交时间倒序列出作业"""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def cancel(self, job_id):
+        """取消作业：尚未开始的任务不再执行，已在执行的任务会正常结束
+        Returns:
+            bool: 作业是否存在且仍在进行
+        """
+        job = self.get(job_id)
+        if job is None or job.finished_at is not None:
+            return False
+        job.cancel_event.set()
+        for order, future in list(job._futures.items()):
+            if future.cancel():
+                # 还在队列中的任务直接取消，补记进度
+                job.update_item(order, 'cancelled', '作业已取消')
+                self._finish_one(job)
+        logger.info(f"已取消批量作业 {job.id}")
+        return True
+
+    def _prune(self):
+        """只保留最近的已结束作业，调用方需持有 _lock"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+    def shutdown(self):
+        for job in self.list_jobs():
+            job.cancel_event.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,223 @@
+import re
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from itertools import count
+from threading import Event, Lock, Thread
+from loguru import logger
+
+# 默认保留的日志条数
+DEFAULT_LOG_BUFFER_SIZE = 2000
+
+# 任务相关日志的消息前缀，如 "[任务3] 正在获取分享文件列表"
+TASK_PREFIX_PATTERN = re.compile(r'^\[任务(\d+)\]')
+
+
+class LogRingBuffer:
+    """内存中的日志环形缓冲区
+
+    由 loguru sink 调用 append 写入，保存最近 N 条结构化日志记录
+    (seq/timestamp/level/task_order/message)，查看日志不再读取和解析日志文件。
+    """
+
+    def __init__(self, maxlen=DEFAULT_LOG_BUFFER_SIZE):
+        self._entries = deque(maxlen=maxlen)
+        self._lock = Lock()
+        self._seq = count(1)
+
+    def append(self, record):
+        """从 loguru 记录生成结构化日志并加入缓冲区
+        Returns:
+            dict: 加入缓冲区的日志
+        """
+        message = record['message']
+        task_order = record['extra'].get('task_order')
+        if task_order is None:
+            match = TASK_PREFIX_PATTERN.match(message)
+            if match:
+                task_order = int(match.group(1))
+        entry = {
+            'seq': None,
+            'timestamp': record['time'].strftime('%Y-%m-%d %H:%M:%S'),
+            'level': record['level'].name,
+            'level_no': record['level'].no,
+            'task_order': task_order,
+            'source': f"{record['name']}:{record['function']}:{record['line']}",
+            'message': message
+        }
+        with self._lock:
+            entry['seq'] = next(self._seq)
+            self._entries.append(entry)
+        return entry
+
+    def query(self, limit=20, min_level=None, keyword=None, task_order=None, since=None):
+        """从最新的日志开始倒序查找，返回最多 limit 条（按时间正序）
+        Args:
+            min_level: 最低级别数值
+            keyword: 消息包含的关键字
+            task_order: 只返回指定任务的日志
+            since: 只返回 seq 大于该值的日志
+        """
+        result = []
+        if limit <= 0:
+            return result
+        with self._lock:
+            for entry in reversed(self._entries):
+                if since is not None and entry['seq'] <= since:
+                    break
+                if min_level is not None and entry['level_no'] < min_level:
+                    continue
+                if task_order is not None and entry['task_order'] != task_order:
+                    continue
+                if keyword and keyword not in entry['message']:
+                    continue
+                result.append(entry)
+                if len(result) >= limit:
+                    break
+        result.reverse()
+        return result
+
+    @property
+    def last_seq(self):
+        with self._lock:
+            return self._entries[-1]['seq'] if self._entries else 0
+
+
+# 单个任务保留的日志行数
+DEFAULT_TASK_LOG_LINES = 500
+# 任务日志闲置多久后被清理（秒）
+DEFAULT_TASK_LOG_TTL = 3600
+# 同时保留日志的任务数上限，超出时淘汰最久未写入的
+DEFAULT_TASK_LOG_TASKS = 200
+
+
+class TaskLogStore:
+    """任务执行日志缓冲区
+
+    每个任务一个有界 deque，按最后写入时间维护 LRU 顺序；后台线程定期
+    清理闲置超过 ttl 的缓冲区。内存占用上限为 max_tasks × max_lines 条，
+    与执行过的任务数量和日志多少无关。
+    从 reset 到 finish 之间（任务执行中）的缓冲区不会被清理。
+    """
+
+    def __init__(self, max_lines=DEFAULT_TASK_LOG_LINES, ttl=DEFAULT_TASK_LOG_TTL,
+                 max_tasks=DEFAULT_TASK_LOG_TASKS):
+        self.max_lines = max(1, max_lines)
+        self.ttl = ttl
+        self.max_tasks = max(1, max_tasks)
+        self._buffers = OrderedDict()  # order -> deque，越靠后越新
+        self._touched = {}  # order -> 最后写入的 monotonic 时间
+        self._active = set()  # 正在执行的任务
+        self._runs = {}  # order -> 当前这一轮执行的编号，每次 reset 递增
+        self._lock = Lock()
+        self._seq = count(1)
+        self._run_seq = count(1)
+        self._stop_event = Event()
+        self._thread = None
+
+    def reset(self, task_order):
+        """清空任务的旧日志，开始新一轮记录，任务执行结束后需调用 finish"""
+        with self._lock:
+            self._buffers[task_order] = deque(maxlen=self.max_lines)
+            self._runs[task_order] = next(self._run_seq)
+            self._active.add(task_order)
+            self._touch(task_order)
+            if len(self._buffers) > self.max_tasks:
+                # 淘汰最久未写入且已执行结束的任务
+                idle = [order for order in self._buffers if order not in self._active]
+                for order in idle[:len(self._buffers) - self.max_tasks]:
+                    self._drop(order)
+
+    def finish(self, task_order):
+        """任务执行结束，之后闲置超过 ttl 的日志可被清理"""
+        with self._lock:
+            self._active.discard(task_order)
+            if task_order in self._buffers:
+                self._touch(task_order)
+
+    def append(self, task_order, level, message):
+        """追加一条日志，任务没有日志缓冲区（未调用 reset）时忽略
+        Returns:
+            dict: 追加的日志，忽略时返回 None
+        """
+        with self._lock:
+            buffer = self._buffers.get(task_order)
+            if buffer is None:
+                return None
+            entry = {
+                'seq': next(self._seq),
+                'timestamp': datetime.now().strftime('%H:%M:%S'),
+                'level': level,
+                'message': message,
+                'task_order': task_order
+            }
+            buffer.append(entry)
+            self._touch(task_order)
+        return entry
+
+    def get(self, task_order):
+        """返回任务日志的副本（按 seq 升序）"""
+        with self._lock:
+            buffer = self._buffers.get(task_order)
+            return list(buffer) if buffer is not None else []
+
+    def get_run(self, task_order):
+        """返回 (执行编号, 日志副本)，没有日志时执行编号为 None
+        任务重新执行后编号改变，读者据此判断日志已被重置，不依赖 seq 是否连续
+        """
+        with self._lock:
+            buffer = self._buffers.get(task_order)
+            if buffer is None:
+                return None, []
+            return self._runs.get(task_order), list(buffer)
+
+    def _touch(self, task_order):
+        """调用方需持有 _lock"""
+        self._touched[task_order] = time.monotonic()
+        self._buffers.move_to_end(task_order)
+
+    def _drop(self, task_order):
+        """调用方需持有 _lock"""
+        del self._buffers[task_order]
+        self._touched.pop(task_order, None)
+        self._runs.pop(task_order, None)
+
+    def evict_expired(self):
+        """清理闲置超过 ttl 的任务日志
+        Returns:
+            int: 清理的任务数
+        """
+        deadline = time.monotonic() - self.ttl
+        with self._lock:
+            expired = []
+            for task_order in self._buffers:
+                if self._touched.get(task_order, 0) > deadline:
+                    # LRU 顺序，之后的都更新
+                    break
+                if task_order not in self._active:
+                    expired.append(task_order)
+            for task_order in expired:
+                self._drop(task_order)
+        return len(expired)
+
+    def start(self, interval=60):
+        """启动后台清理线程"""
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+
+        def run():
+            while not self._stop_event.wait(interval):
+                try:
+                    removed = self.evict_expired()
+                    if removed:
+                        logger.debug(f"已清理 {removed} 个任务的闲置日志")
+                except Exception as e:
+                    logger.error(f"清理任务日志失败: {str(e)}")
+
+        self._thread = Thread(target=run, name='task-log-evict', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread = None
@@ -0,0 +1,218 @@
+import bisect
+import math
+import re
+import time
+from contextlib import contextmanager
+from threading import Lock
+
+# Prometheus 文本格式的 Content-Type
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 默认的耗时分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    """指标基类，按标签值分别保存数据"""
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f'{self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}')
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self):
+        """返回 [(后缀, 标签值, 额外标签, 数值)]"""
+        with self._lock:
+            return [('', key, None, value) for key, value in self._values.items()]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        for suffix, key, extra, value in self._samples():
+            lines.append(f'{self.name}{suffix}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """可增可减的当前值，也可以传入 func 在采集时计算（仅限无标签）"""
+    type = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._func = None
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, func):
+        """采集时调用 func() 获取当前值，传入 None 取消"""
+        self._func = func
+
+    def _samples(self):
+        func = self._func
+        if func is None:
+            return super()._samples()
+        try:
+            return [('', (), None, func())]
+        except Exception:
+            return []
+
+
+class Histogram(_Metric):
+    """分桶统计，输出 _bucket、_sum、_count"""
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # 各桶计数（非累积）、总和
+                counts = self._values[key] = [[0] * len(self.buckets), 0.0]
+            counts[0][index] += 1
+            counts[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """统计 with 块的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            items = [(key, list(counts[0]), counts[1]) for key, counts in self._values.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                samples.append(('_bucket', key, ('le', _format_value(float(bound))), cumulative))
+            samples.append(('_sum', key, None, total))
+            samples.append(('_count', key, None, cumulative))
+        return samples
+
+
+class Registry:
+    """指标集合，render() 输出 Prometheus 文本格式"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = Lock()
+
+    def register(self, metric):
+        if not re.match(r'^[a-zA-Z_:][a-zA-Z0-9_:]*$', metric.name):
+            raise ValueError(f'无效的指标名: {metric.name}')
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f'指标已存在: {metric.name}')
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labelnames=()):
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name, documentation, labelnames=()):
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+def error_code(error):
+    """从 BaiduPCS 异常信息中提取错误码，没有错误时为 none，无法识别时为 unknown"""
+    if error is None:
+        return 'none'
+    match = re.search(r'(?:error_code|errno): (-?\d+)', str(error))
+    return match.group(1) if match else 'unknown'
+
+
+# 应用指标
+TASK_RUNS = counter(
+    'baidu_autosave_task_runs_total', '任务执行次数', ['outcome'])
+TRANSFER_DURATION = histogram(
+    'baidu_autosave_transfer_duration_seconds', '单次转存耗时（秒）', ['outcome'],
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800))
+API_CALLS = counter(
+    'baidu_autosave_api_calls_total', '网盘接口调用次数', ['operation', 'error_code'])
+API_DURATION = histogram(
+    'baidu_autosave_api_call_duration_seconds', '网盘接口调用耗时（秒）', ['operation'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+RATE_LIMIT_WAITS = counter(
+    'baidu_autosave_rate_limit_waits_total', '因频率限制（-65）等待的次数')
+RATE_LIMIT_WAIT_SECONDS = counter(
+    'baidu_autosave_rate_limit_wait_seconds_total', '因频率限制（-65）等待的总时长（秒）')
+SCHEDULER_QUEUE_DEPTH = gauge(
+    'baidu_autosave_scheduler_queue_depth', '已到触发时间、等待执行的定时任务数')
+SCHEDULER_LAG = histogram(
+    'baidu_autosave_scheduler_lag_seconds', '定时任务从 cron 触发时间到实际开始执行的延迟（秒）',
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600))
+SCHEDULER_SKIPS = counter(
+    'baidu_autosave_scheduler_skipped_total', '定时触发后未执行任务的次数', ['reason'])
+SCHEDULER_COALESCED = counter(
+    'baidu_autosave_scheduler_coalesced_total', '因合并（coalesce）而未单独执行的定时触发次数')
+NOTIFY_DURATION = histogram(
+    'baidu_autosave_notify_duration_seconds', '各通知渠道的发送耗时（秒）', ['channel'],
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+CONFIG_SAVE_DURATION = histogram(
+    'baidu_autosave_config_save_duration_seconds', '配置写入耗时（秒），mode 为 full（整体）或 task（单个任务）',
+    ['mode'])
@@ -16,6 +16,8 @@ from email.utils import formataddr
 
 import requests
 
+from metrics import NOTIFY_DURATION
+
 # 原先的 print 函数和主线程的锁
 _print = print
 mutex = threading.Lock()
@@ -1002,6 +1004,14 @@ def add_notify_function():
     return notify_function
 
 
+def timed(mode):
+    """记录各通知渠道的发送耗时"""
+    def wrapper(title: str, content: str) -> None:
+        with NOTIFY_DURATION.time(channel=mode.__name__):
+            mode(title, content)
+    return wrapper
+
+
 def send(title: str, content: str, ignore_default_config: bool = False, **kwargs):
     if kwargs:
         global push_config
@@ -1027,7 +1037,7 @@ def send(title: str, content: str, ignore_default_config: bool = False, **kwargs
 
     notify_function = add_notify_function()
     ts = [
-        threading.Thread(target=mode, args=(title, content), name=mode.__name__)
+        threading.Thread(target=timed(mode), args=(title, content), name=mode.__name__)
         for mode in notify_function
     ]
     [t.start() for t in ts]
@@ -0,0 +1,195 @@
+import io
+import marshal
+import os
+import sys
+import time
+from collections import Counter, OrderedDict
+from functools import wraps
+from itertools import count
+from threading import Event, Lock, Thread, get_ident
+from loguru import logger
+
+PROFILE_MODES = ('cprofile', 'sampling')
+PSTATS_SORT_KEYS = ('cumulative', 'tottime', 'ncalls', 'pcalls')
+
+# 保留的剖析报告数
+DEFAULT_MAX_REPORTS = 20
+# 采样间隔（秒）
+DEFAULT_SAMPLE_INTERVAL = 0.005
+# pstats 报告默认输出的函数数
+DEFAULT_PSTATS_LIMIT = 50
+
+
+class SamplingProfiler:
+    """定时采样目标线程的调用栈，输出 collapsed stack 格式（可直接用于 flamegraph.pl / speedscope）
+
+    与 cProfile 相比开销与调用次数无关，适合调用频繁的长时间任务，但只能反映耗时分布。
+    """
+
+    def __init__(self, interval=DEFAULT_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = Event()
+
+    def run(self, func, *args, **kwargs):
+        """在当前线程执行 func，同时在后台线程采样"""
+        target = get_ident()
+        sampler = Thread(target=self._sample, args=(target,), name='sampling-profiler', daemon=True)
+        sampler.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._stop.set()
+            sampler.join()
+
+    def _sample(self, target):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})')
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return ''.join(f'{stack} {samples}\n' for stack, samples in self.samples.most_common())
+
+
+class TaskProfiler:
+    """剖析单次任务执行，保存最近的报告
+
+    同一时间只允许一个剖析：cProfile 在同一进程中不能同时启用多个。
+    """
+
+    def __init__(self, max_reports=DEFAULT_MAX_REPORTS):
+        self._reports = OrderedDict()
+        self._max_reports = max_reports
+        self._ids = count(1)
+        self._busy = Lock()
+        self._lock = Lock()
+        self._scheduled = {'remaining': 0, 'mode': 'cprofile', 'sort': 'cumulative', 'limit': DEFAULT_PSTATS_LIMIT}
+
+    def start(self, func, *args, task_order=None, mode='cprofile', sort='cumulative',
+              limit=DEFAULT_PSTATS_LIMIT, interval=DEFAULT_SAMPLE_INTERVAL, trigger='manual', **kwargs):
+        """在新线程中剖析 func，返回报告ID；已有剖析在进行时返回 None"""
+        if not self._busy.acquire(blocking=False):
+            return None
+        report = self._new_report(task_order, mode, trigger)
+
+        def run():
+            try:
+                self._profile(report, func, args, kwargs, sort, limit, interval)
+            except Exception:
+                pass  # 已记录在报告中
+            finally:
+                self._busy.release()
+
+        Thread(target=run, name=f'profile-{report["id"]}', daemon=True).start()
+        return report['id']
+
+    def run_if_armed(self, func, *args, task_order=None, **kwargs):
+        """定时执行的入口：已设置剖析接下来的定时执行时在剖析下执行 func，否则直接执行"""
+        with self._lock:
+            options = dict(self._scheduled)
+            armed = options['remaining'] > 0 and self._busy.acquire(blocking=False)
+            if armed:
+                self._scheduled['remaining'] -= 1
+        if not armed:
+            return func(*args, **kwargs)
+        try:
+            report = self._new_report(task_order, options['mode'], 'scheduled')
+            logger.info(f"剖析定时执行: 任务{task_order}，报告ID {report['id']}")
+            return self._profile(report, func, args, kwargs, options['sort'], options['limit'],
+                                 DEFAULT_SAMPLE_INTERVAL)
+        finally:
+            self._busy.release()
+
+    def arm(self, count, mode='cprofile', sort='cumulative', limit=DEFAULT_PSTATS_LIMIT):
+        """剖析接下来的 count 次定时执行，count 为 0 时取消"""
+        with self._lock:
+            self._scheduled = {'remaining': max(0, int(count)), 'mode': mode, 'sort': sort, 'limit': limit}
+            return dict(self._scheduled)
+
+    def scheduled(self):
+        with self._lock:
+            return dict(self._scheduled)
+
+    def get(self, report_id):
+        with self._lock:
+            report = self._reports.get(report_id)
+            return dict(report) if report else None
+
+    def list(self):
+        """报告摘要（不含报告内容），最新的在前"""
+        with self._lock:
+            reports = list(self._reports.values())
+        return [{key: value for key, value in report.items() if key not in ('report', 'raw')}
+                for report in reversed(reports)]
+
+    def _new_report(self, task_order, mode, trigger):
+        report = {
+            'id': next(self._ids),
+            'task_order': task_order,
+            'mode': mode,
+            'trigger': trigger,
+            'status': 'running',
+            'started_at': int(time.time()),
+            'duration': None,
+            'error': None,
+            'report': None,
+            'raw': None,
+        }
+        with self._lock:
+            self._reports[report['id']] = report
+            while len(self._reports) > self._max_reports:
+                self._reports.popitem(last=False)
+        return report
+
+    def _profile(self, report, func, args, kwargs, sort, limit, interval):
+        start = time.perf_counter()
+        result = None
+        try:
+            if report['mode'] == 'sampling':
+                profiler = SamplingProfiler(interval)
+                try:
+                    result = profiler.run(func, *args, **kwargs)
+                finally:
+                    report['samples'] = sum(profiler.samples.values())
+                    report['report'] = profiler.collapsed()
+            else:
+                # 只在剖析时用到，不放在启动路径中
+                import cProfile
+                import pstats
+                profiler = cProfile.Profile()
+                try:
+                    result = profiler.runcall(func, *args, **kwargs)
+                finally:
+                    profiler.create_stats()
+                    # 与 cProfile.Profile.dump_stats 格式相同，可用 snakeviz 等工具打开
+                    # （需在 pstats.Stats 之前导出，Stats 会清空 profiler.stats）
+                    report['raw'] = marshal.dumps(profiler.stats)
+                    output = io.StringIO()
+                    pstats.Stats(profiler, stream=output).sort_stats(sort).print_stats(limit)
+                    report['report'] = output.getvalue()
+            report['status'] = 'done'
+            return result
+        except Exception as e:
+            report['status'] = 'error'
+            report['error'] = str(e)
+            logger.error(f"剖析任务执行失败: {str(e)}")
+            raise
+        finally:
+            report['duration'] = round(time.perf_counter() - start, 3)
+
+
+task_profiler = TaskProfiler()
+
+
+def profile_scheduled(func):
+    """装饰 TaskScheduler._execute_single_task，按 task_profiler 的设置剖析定时执行"""
+    @wraps(func)
+    def wrapper(self, task, *args, **kwargs):
+        return task_profiler.run_if_armed(func, self, task, *args, task_order=task.get('order'), **kwargs)
+    return wrapper
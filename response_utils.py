@@ -0,0 +1,97 @@
+import gzip
+import os
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+# 可选依赖：安装后自动启用
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 小于该大小的响应不压缩（字节）
+DEFAULT_COMPRESS_MIN_SIZE = 1024
+# 压缩级别偏向速度，NAS 等低功耗设备上大列表也不会明显增加CPU占用
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """安装了 orjson 时用其序列化 jsonify 的响应，否则与 Flask 默认行为一致
+
+    与 Flask 默认输出保持一致：按 sort_keys 排序键，日期时间交给 Flask 的 default 转为 HTTP 日期格式，
+    而不是 orjson 默认的 RFC 3339。非 ASCII 字符直接输出 UTF-8 而不转义为 \\uXXXX，解析结果相同。
+    orjson 不支持的类型或参数（如调试模式下的缩进）回退到标准库 json。
+    """
+
+    def dumps(self, obj, **kwargs):
+        # jsonify 在非调试模式下只传入紧凑的 separators，orjson 输出本身就是紧凑格式
+        if orjson is None or set(kwargs) - {'separators'}:
+            return super().dumps(obj, **kwargs)
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=self.default, option=option).decode('utf-8')
+        except TypeError:
+            return super().dumps(obj, **kwargs)
+
+
+def choose_encoding(accept_encoding):
+    """根据 Accept-Encoding 选择压缩方式，优先 br，其次 gzip，都不支持时返回 None"""
+    accepted = set()
+    for part in accept_encoding.split(','):
+        name, _, params = part.partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) == 0:
+                    continue  # q=0 表示明确不接受
+            except ValueError:
+                continue
+        accepted.add(name.strip().lower())
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding):
+    """按指定方式压缩响应体"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def init_compression(app, min_size=None):
+    """为 JSON 响应启用按 Accept-Encoding 协商的 gzip/brotli 压缩
+
+    只压缩普通的 JSON 响应：静态文件、SSE 等流式响应和已压缩的响应保持原样。
+    环境变量 RESPONSE_COMPRESSION=false 可关闭。
+    """
+    if os.getenv('RESPONSE_COMPRESSION', 'true').lower() in ('false', '0', 'no'):
+        return
+    if min_size is None:
+        min_size = int(os.getenv('RESPONSE_COMPRESS_MIN_SIZE', DEFAULT_COMPRESS_MIN_SIZE))
+
+    @app.after_request
+    def compress_response(response):
+        if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+                or 'Content-Encoding' in response.headers or response.mimetype != 'application/json'):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+        if encoding is None:
+            return response
+        data = response.get_data()
+        if len(data) < min_size:
+            return response
+        response.set_data(compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,213 @@
+import re
+from collections import defaultdict, deque
+from threading import Lock
+from metrics import SCHEDULER_LAG, SCHEDULER_SKIPS, SCHEDULER_COALESCED
+
+# 定时任务未执行的原因
+SKIP_REASONS = {
+    'busy': '其他任务正在执行',
+    'max_instances': '同一定时规则的上一次执行尚未结束',
+    'missed': '超过 misfire_grace_time 仍未执行',
+    'task_missing': '任务已不存在',
+    'login_invalid': '登录状态异常且刷新失败',
+}
+
+# 每个任务保留的最近调度记录条数
+DEFAULT_HISTORY_SIZE = 20
+
+
+def task_order_from_job_id(job_id):
+    """从作业ID（task_<order-1> 或 task_<order-1>_<序号>）解析任务order，不是任务作业时返回 None"""
+    match = re.match(r'^task_(\d+)(?:_\d+)?$', job_id or '')
+    return int(match.group(1)) + 1 if match else None
+
+
+class ScheduleStats:
+    """按任务统计定时触发情况：触发时间与实际开始时间的延迟、合并次数和跳过原因
+
+    提交事件在调度线程中发出，可能晚于作业在线程池中开始执行（或被判定错过），
+    两边先到的一方记录下来等另一方配对。
+    """
+
+    def __init__(self, history_size=DEFAULT_HISTORY_SIZE):
+        self._fired = defaultdict(deque)    # job_id -> 已提交未开始的触发时间
+        self._started = defaultdict(deque)  # job_id -> 先于提交事件开始的时间
+        self._missed = defaultdict(set)     # job_id -> 先于提交事件被判定错过的触发时间
+        self._last_fire = {}                # job_id -> 最近一次触发时间
+        self._tasks = {}                    # order -> 统计
+        self._history_size = history_size
+        self._version = 0
+        self._lock = Lock()
+
+    @property
+    def version(self):
+        """统计（触发、开始、跳过和排队数）实际变化时递增"""
+        return self._version
+
+    def last_fire(self, job_id):
+        """作业最近一次触发时间，尚未触发过时为 None"""
+        with self._lock:
+            return self._last_fire.get(job_id)
+
+    def submitted(self, job_id, fire_times, coalesced=0):
+        """作业已提交到线程池
+        Args:
+            fire_times: 本次提交对应的触发时间（时间戳）列表
+            coalesced: 因合并（coalesce）而未单独执行的触发次数
+        """
+        lags = []
+        with self._lock:
+            stats = self._fire(job_id, fire_times, coalesced)
+            missed = self._missed.get(job_id)
+            started = self._started.get(job_id)
+            for fire_time in fire_times:
+                if missed and fire_time in missed:
+                    missed.discard(fire_time)
+                elif started:
+                    lags.append(self._record_start(stats, job_id, fire_time, started.popleft()))
+                else:
+                    self._fired[job_id].append(fire_time)
+            self._cleanup(job_id)
+        for lag in lags:
+            SCHEDULER_LAG.observe(lag)
+
+    def started(self, job_id, start_time):
+        """作业开始执行"""
+        with self._lock:
+            fired = self._fired.get(job_id)
+            if not fired:
+                self._started[job_id].append(start_time)
+                return
+            lag = self._record_start(self._task(job_id), job_id, fired.popleft(), start_time)
+            self._cleanup(job_id)
+        SCHEDULER_LAG.observe(lag)
+
+    def missed(self, job_id, fire_time):
+        """触发时间已超过容错时间，不会执行"""
+        with self._lock:
+            fired = self._fired.get(job_id)
+            if fired and fire_time in fired:
+                fired.remove(fire_time)
+                self._cleanup(job_id)
+            else:
+                self._missed[job_id].add(fire_time)
+            self._skip(self._task(job_id), job_id, 'missed', fire_time)
+
+    def rejected(self, job_id, fire_times, coalesced=0):
+        """上一次执行尚未结束，本次触发没有提交"""
+        with self._lock:
+            stats = self._fire(job_id, fire_times, coalesced)
+            for fire_time in fire_times:
+                self._skip(stats, job_id, 'max_instances', fire_time)
+
+    def skipped(self, job_id, reason):
+        """作业已开始执行但没有执行任务"""
+        with self._lock:
+            self._skip(self._task(job_id), job_id, reason, None)
+
+    def pending(self):
+        """已到触发时间、尚未开始执行的作业数"""
+        with self._lock:
+            return sum(len(times) for times in self._fired.values())
+
+    def get(self, order):
+        """单个任务的统计，没有记录时返回 None"""
+        with self._lock:
+            stats = self._tasks.get(order)
+            return self._to_dict(order, stats) if stats else None
+
+    def snapshot(self):
+        """所有任务的统计，按 order 排序"""
+        with self._lock:
+            return [self._to_dict(order, self._tasks[order]) for order in sorted(self._tasks)]
+
+    def summary(self):
+        """汇总统计"""
+        with self._lock:
+            tasks = list(self._tasks.values())
+            pending = sum(len(times) for times in self._fired.values())
+        skipped = {}
+        for stats in tasks:
+            for reason, count in stats['skipped'].items():
+                skipped[reason] = skipped.get(reason, 0) + count
+        started = sum(stats['started'] for stats in tasks)
+        lag_total = sum(stats['lag_total'] for stats in tasks)
+        return {
+            'pending': pending,
+            'fires': sum(stats['fires'] for stats in tasks),
+            'started': started,
+            'coalesced': sum(stats['coalesced'] for stats in tasks),
+            'skipped': skipped,
+            'avg_lag': round(lag_total / started, 3) if started else None,
+            'max_lag': round(max((stats['lag_max'] for stats in tasks), default=0), 3) if started else None,
+        }
+
+    def _task(self, job_id):
+        order = task_order_from_job_id(job_id)
+        stats = self._tasks.get(order)
+        if stats is None:
+            stats = self._tasks[order] = {
+                'fires': 0, 'started': 0, 'coalesced': 0, 'skipped': {},
+                'lag_total': 0.0, 'lag_max': 0.0, 'last_lag': None,
+                'last_fire_time': None, 'last_start_time': None,
+                'history': deque(maxlen=self._history_size),
+            }
+        return stats
+
+    def _fire(self, job_id, fire_times, coalesced):
+        stats = self._task(job_id)
+        if fire_times or coalesced:
+            self._version += 1
+        stats['fires'] += len(fire_times) + coalesced
+        if fire_times:
+            self._last_fire[job_id] = max(fire_times[-1], self._last_fire.get(job_id, 0))
+            stats['last_fire_time'] = fire_times[-1]
+        if coalesced:
+            stats['coalesced'] += coalesced
+            stats['history'].append({'event': 'coalesced', 'job_id': job_id,
+                                     'fire_time': fire_times[0] if fire_times else None, 'count': coalesced})
+            SCHEDULER_COALESCED.inc(coalesced)
+        return stats
+
+    def _record_start(self, stats, job_id, fire_time, start_time):
+        lag = max(0.0, start_time - fire_time)
+        self._version += 1
+        stats['started'] += 1
+        stats['lag_total'] += lag
+        stats['lag_max'] = max(stats['lag_max'], lag)
+        stats['last_lag'] = lag
+        stats['last_start_time'] = round(start_time, 3)
+        stats['history'].append({'event': 'started', 'job_id': job_id, 'fire_time': fire_time,
+                                 'start_time': round(start_time, 3), 'lag': round(lag, 3)})
+        return lag
+
+    def _skip(self, stats, job_id, reason, fire_time):
+        self._version += 1
+        stats['skipped'][reason] = stats['skipped'].get(reason, 0) + 1
+        stats['history'].append({'event': 'skipped', 'job_id': job_id, 'fire_time': fire_time,
+                                 'reason': reason})
+        SCHEDULER_SKIPS.inc(reason=reason)
+
+    def _cleanup(self, job_id):
+        for pending in (self._fired, self._started, self._missed):
+            if job_id in pending and not pending[job_id]:
+                del pending[job_id]
+
+    @staticmethod
+    def _to_dict(order, stats):
+        started = stats['started']
+        return {
+            'task_order': order,
+            'fires': stats['fires'],
+            'started': started,
+            'coalesced': stats['coalesced'],
+            'skipped': dict(stats['skipped']),
+            'lag': {
+                'last': round(stats['last_lag'], 3) if stats['last_lag'] is not None else None,
+                'avg': round(stats['lag_total'] / started, 3) if started else None,
+                'max': round(stats['lag_max'], 3) if started else None,
+            },
+            'last_fire_time': stats['last_fire_time'],
+            'last_start_time': stats['last_start_time'],
+            'recent': list(stats['history']),
+        }
@@ -2,19 +2,28 @@ from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.executors.pool import ThreadPoolExecutor
 from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.events import EVENT_JOB_SUBMITTED, EVENT_JOB_MAX_INSTANCES, EVENT_JOB_MISSED
 from storage import BaiduStorage
-import json
 import os
 from loguru import logger
 import sys
-from notify import send as notify_send
-from notify import push_config as notify_push_config
-from utils import generate_transfer_notification
+from utils import generate_transfer_notification, notify_send
 import time
 from threading import Lock, Timer
 import pytz
 import datetime
 import re
+from metrics import SCHEDULER_QUEUE_DEPTH
+from schedule_stats import ScheduleStats
+from profiling import profile_scheduled
+from version_check import version_checker, DEFAULT_VERSION_CHECK_INTERVAL
+
+# 启动后多久第一次检查版本（秒），避开启动时的初始化；还没有缓存时立即检查
+VERSION_CHECK_STARTUP_DELAY = 30
+# 版本检查的最短间隔（秒）
+MIN_VERSION_CHECK_INTERVAL = 600
+
 
 class TaskScheduler:
     instance = None
@@ -24,6 +33,7 @@ class TaskScheduler:
         self.storage = storage or BaiduStorage()
         self.scheduler = None
         self.is_running = False
+        self._tasks_version = None  # 最近一次调度所基于的配置版本号
         
         # 初始化默认调度列表
         self.default_schedule = self.storage.config.get('cron', {}).get('default_schedule', [])
@@ -42,18 +52,21 @@ class TaskScheduler:
         self._notification_lock = Lock()
         self._notification_timer = None
         self._notification_delay = 30  # 延迟30秒发送通知
+
+        # 定时任务的触发延迟、合并和跳过统计，见 /api/scheduler/stats 和 /metrics
+        self.schedule_stats = ScheduleStats()
+        SCHEDULER_QUEUE_DEPTH.set_function(self.schedule_stats.pending)
         
         self._init_scheduler()
         self._init_notify()
         TaskScheduler.instance = self
         
     def _get_current_tasks(self):
-        """获取当前的任务列表"""
+        """获取当前的任务列表（直接读取存储的内存模型，不再重新解析配置文件）"""
         try:
-            # 重新加载配置以获取最新任务
-            with open('config/config.json', 'r', encoding='utf-8') as f:
-                config = json.load(f)
-            return config['baidu']['tasks']
+            tasks = self.storage.list_tasks()
+            self._tasks_version = self.storage.version
+            return tasks
         except Exception as e:
             logger.error(f"获取任务列表失败: {str(e)}")
             return []
@@ -61,11 +74,13 @@ class TaskScheduler:
     def update_tasks(self):
         """更新所有任务的调度"""
         try:
-            # 清除现有的任务调度
-            self.scheduler.remove_all_jobs()
+            # 清除现有的任务调度，保留容量检查、版本检查等非任务作业
+            for job in self.scheduler.get_jobs():
+                if job.id.startswith('task_'):
+                    job.remove()
             
             # 获取任务列表
-            tasks = self.storage.list_tasks()
+            tasks = self._get_current_tasks()
             if not tasks:
                 logger.info("没有任务需要调度")
                 return
@@ -96,7 +111,7 @@ class TaskScheduler:
                             self.add_single_task(task, schedule)
                             default_count += 1
             
-            logger.info(f"任务调度更新完成: {custom_count} 个自定义定时任务, {default_count} 个默认定时任务")
+            logger.info(f"任务调度更新完成: {custom_count} 个自定义定时任务, {default_count} 个默认定时任务 (配置版本: {self._tasks_version})")
             
         except Exception as e:
             logger.error(f"更新任务调度失败: {str(e)}")
@@ -129,9 +144,10 @@ class TaskScheduler:
             # 从 storage 获取调度器配置
             scheduler_config = self.storage.config.get('scheduler', {})
             
-            # 使用单线程执行器
+            # 使用单线程执行器；版本检查等后台作业使用单独的执行器，不占用任务的线程
             executors = {
-                'default': ThreadPoolExecutor(max_workers=scheduler_config.get('max_workers', 1))
+                'default': ThreadPoolExecutor(max_workers=scheduler_config.get('max_workers', 1)),
+                'background': ThreadPoolExecutor(max_workers=1)
             }
             
             # 配置作业存储
@@ -152,8 +168,13 @@ class TaskScheduler:
                 jobstores=jobstores,
                 job_defaults=job_defaults
             )
+            self.scheduler.add_listener(
+                self._on_job_event, EVENT_JOB_SUBMITTED | EVENT_JOB_MAX_INSTANCES | EVENT_JOB_MISSED)
             self.is_running = False  # 初始化时设置为未运行状态
             
+            # 添加版本检查任务
+            self._add_version_check_job()
+            
             # 获取任务列表
             tasks = self._get_current_tasks()
             if not tasks:
@@ -203,6 +224,7 @@ class TaskScheduler:
                         self._execute_single_task,
                         CronTrigger.from_crontab(convert_cron_weekday(task['cron']), timezone=pytz.timezone('Asia/Shanghai')),
                         args=[task],
+                        kwargs={'job_id': f'task_{task_order - 1}'},
                         id=f'task_{task_order - 1}',
                         replace_existing=True
                     )
@@ -226,6 +248,7 @@ class TaskScheduler:
                                 self._execute_single_task,
                                 CronTrigger.from_crontab(convert_cron_weekday(cron_exp), timezone=pytz.timezone('Asia/Shanghai')),
                                 args=[task],
+                                kwargs={'job_id': f'task_{task_order - 1}_{i}'},
                                 id=f'task_{task_order - 1}_{i}',
                                 replace_existing=True
                             )
@@ -240,20 +263,10 @@ class TaskScheduler:
             logger.error(f"初始化调度器失败: {str(e)}")
             raise
 
-    def _load_config(self):
-        """加载配置文件"""
-        try:
-            with open('config/config.json', 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"加载配置文件失败: {str(e)}")
-            return None
-            
     def _save_config(self):
-        """保存配置文件"""
+        """保存配置，统一交给存储模块写入，避免两处独立写文件导致更新丢失"""
         try:
-            with open('config/config.json', 'w', encoding='utf-8') as f:
-                json.dump(self.storage.config, f, ensure_ascii=False, indent=4)
+            self.storage._save_config(update_scheduler=False)
         except Exception as e:
             logger.error(f"保存配置文件失败: {str(e)}")
 
@@ -302,6 +315,9 @@ class TaskScheduler:
                         progress_callback,
                         task  # 传入完整的任务配置
                     )
+                    if result.get('metrics'):
+                        with self.storage.task_mutation(task) as draft:
+                            draft['last_run_metrics'] = result['metrics']
 
                     if result.get('success'):
                         if result.get('skipped'):
@@ -333,7 +349,8 @@ class TaskScheduler:
 
                 except Exception as e:
                     logger.error(f"执行任务 {task_name} 时发生错误: {str(e)}")
-                    task['error'] = str(e)
+                    with self.storage.task_mutation(task) as draft:
+                        draft['error'] = str(e)
                     results['failed'].append(task)
             
             # 将结果添加到通知缓冲区，而不是立即发送通知
@@ -377,22 +394,20 @@ class TaskScheduler:
         """
         try:
             # 更新配置文件
-            tasks = self.storage.config.get('baidu', {}).get('tasks', [])
-            for task in tasks:
-                if task.get('url') == task_url:
-                    task['cron'] = cron_exp
-                    task_order = task.get('order')
-                    if task_order:
-                        # 使用统一的任务ID格式
-                        job_id = f"task_{task_order - 1}"
-                        if self.scheduler.get_job(job_id):
-                            self.scheduler.reschedule_job(
-                                job_id,
-                                trigger=CronTrigger.from_crontab(convert_cron_weekday(cron_exp), timezone=pytz.timezone('Asia/Shanghai'))
-                            )
-                            logger.success(f"已更新任务调度: {task_url} -> {cron_exp}")
-                    break
-            self._save_config()
+            task = self.storage.get_task_by_url(task_url)
+            if task is not None:
+                with self.storage.task_mutation(task) as draft:
+                    draft['cron'] = cron_exp
+                task_order = task.get('order')
+                if task_order:
+                    # 使用统一的任务ID格式
+                    job_id = f"task_{task_order - 1}"
+                    if self.scheduler.get_job(job_id):
+                        self.scheduler.reschedule_job(
+                            job_id,
+                            trigger=CronTrigger.from_crontab(convert_cron_weekday(cron_exp), timezone=pytz.timezone('Asia/Shanghai'))
+                        )
+                        logger.success(f"已更新任务调度: {task_url} -> {cron_exp}")
             
         except Exception as e:
             logger.error(f"更新任务调度失败: {str(e)}")
@@ -430,8 +445,7 @@ class TaskScheduler:
         """
         try:
             # 先查找任务的order
-            tasks = self.storage.config.get('baidu', {}).get('tasks', [])
-            task = next((t for t in tasks if t.get('url') == task_url), None)
+            task = self.storage.get_task_by_url(task_url)
             
             if task and task.get('order'):
                 task_order = task.get('order')
@@ -497,9 +511,7 @@ class TaskScheduler:
 
     def update_notify_config(self, notify_config):
         """更新通知配置"""
-        if not self.config:
-            self.config = {}
-        self.config['notify'] = notify_config
+        self.storage.config['notify'] = notify_config
         self._save_config()
         self._init_notify()
         logger.info("通知配置已更新")
@@ -512,41 +524,83 @@ class TaskScheduler:
             error_msg: 错误信息
         """
         try:
-            tasks = self.config.get('baidu', {}).get('tasks', [])
-            for task in tasks:
-                if task['url'] == task_url:
-                    task['status'] = status
+            task = self.storage.get_task_by_url(task_url)
+            if task is not None:
+                with self.storage.task_mutation(task) as draft:
+                    draft['status'] = status
                     if error_msg:
-                        task['error'] = error_msg
-                    elif 'error' in task:
-                        del task['error']
-                    break
-            self._save_config()
+                        draft['error'] = error_msg
+                    elif 'error' in draft:
+                        del draft['error']
         except Exception as e:
             logger.error(f"更新任务状态失败: {str(e)}")
 
-    def _execute_single_task(self, task):
+    def _on_job_event(self, event):
+        """记录定时任务的提交、因上次未结束被跳过和错过执行"""
+        try:
+            if not event.job_id.startswith('task_'):
+                return
+            if event.code == EVENT_JOB_MISSED:
+                self.schedule_stats.missed(event.job_id, event.scheduled_run_time.timestamp())
+                return
+            run_times = event.scheduled_run_times
+            coalesced = self._count_coalesced(event.job_id, run_times[0]) if run_times else 0
+            fire_times = [run_time.timestamp() for run_time in run_times]
+            if event.code == EVENT_JOB_SUBMITTED:
+                self.schedule_stats.submitted(event.job_id, fire_times, coalesced)
+            else:
+                logger.warning(f"定时任务上一次执行尚未结束，跳过此次触发: {event.job_id}")
+                self.schedule_stats.rejected(event.job_id, fire_times, coalesced)
+        except Exception as e:
+            logger.error(f"记录调度统计失败: {str(e)}")
+
+    def _count_coalesced(self, job_id, first_run_time, limit=1000):
+        """统计上一次触发与本次之间被合并掉的触发次数
+        APScheduler 合并堆积的触发时只提交最后一次，需要按触发器重新推算中间的触发时间
+        """
+        previous = self.schedule_stats.last_fire(job_id)
+        job = self.scheduler.get_job(job_id) if self.scheduler else None
+        if previous is None or job is None:
+            return 0
+        tz = first_run_time.tzinfo
+        fire_time = datetime.datetime.fromtimestamp(previous, tz)
+        count = 0
+        while count < limit:
+            fire_time = job.trigger.get_next_fire_time(fire_time, fire_time + datetime.timedelta(seconds=1))
+            if fire_time is None or fire_time >= first_run_time:
+                break
+            count += 1
+        return count
+
+    @profile_scheduled
+    def _execute_single_task(self, task, job_id=None):
         """执行单个任务
         Args:
             task: 任务配置
+            job_id: 由调度器触发时的作业ID，用于统计触发延迟
         """
+        if job_id:
+            self.schedule_stats.started(job_id, time.time())
         # 使用锁防止同一任务被并发执行
         if not self._execution_lock.acquire(blocking=False):
             logger.warning(f"任务已在执行中，跳过此次执行: {task.get('name', task.get('url', '未知任务'))}")
+            if job_id:
+                self.schedule_stats.skipped(job_id, 'busy')
             return False
             
         try:
             # 获取最新的任务信息
-            tasks = self.storage.config['baidu']['tasks']
             task_order = task.get('order')
             if not task_order:
                 logger.error(f"任务缺少order: {task.get('name', task.get('url', '未知任务'))}")
                 return False
                 
-            current_task = next((t for t in tasks if t.get('order') == task_order), None)
+            current_task = self.storage.get_task_by_order(task_order)
             
             if not current_task:
                 logger.error(f"未找到任务: order={task_order}")
+                if job_id:
+                    self.schedule_stats.skipped(job_id, 'task_missing')
                 return False
             
             task_id = task_order - 1  # 转换为前端使用的task_id
@@ -562,6 +616,8 @@ class TaskScheduler:
                 logger.warning("存储实例状态异常，尝试刷新登录状态")
                 if not self.storage.refresh_login():
                     logger.error("刷新登录状态失败")
+                    if job_id:
+                        self.schedule_stats.skipped(job_id, 'login_invalid')
                     return False
 
             # 更新结果字典的结构
@@ -604,14 +660,16 @@ class TaskScheduler:
                         self.storage.update_task_status_by_order(
                             task_order,
                             'skipped',
-                            '没有新文件需要转存'
+                            '没有新文件需要转存',
+                            metrics=result.get('metrics')
                         )
                     else:
                         self.storage.update_task_status_by_order(
                             task_order,
                             'success',
                             '转存成功',
-                            transferred_files=result.get('transferred_files', [])
+                            transferred_files=result.get('transferred_files', []),
+                            metrics=result.get('metrics')
                         )
                         # 添加到成功列表
                         results['success'].append(current_task)
@@ -622,9 +680,10 @@ class TaskScheduler:
                     self.storage.update_task_status_by_order(
                         task_order,
                         'failed',
-                        result.get('error', '转存失败')
+                        result.get('error', '转存失败'),
+                        error=result.get('error'),
+                        metrics=result.get('metrics')
                     )
-                    current_task['error'] = result.get('error')
                     results['failed'].append(current_task)
                 
                 # 将结果添加到通知缓冲区，而不是立即发送通知
@@ -717,8 +776,7 @@ class TaskScheduler:
     def update_task_schedule(self, task_url, cron_exp=None):
         """更新任务调度"""
         try:
-            tasks = self.storage.config['baidu']['tasks']
-            current_task = next((task for task in tasks if task['url'] == task_url), None)
+            current_task = self.storage.get_task_by_url(task_url)
             
             if not current_task:
                 logger.error(f"未找到任务: {task_url}")
@@ -744,6 +802,7 @@ class TaskScheduler:
                         self._execute_single_task,
                         CronTrigger.from_crontab(convert_cron_weekday(final_cron)),
                         args=[current_task],
+                        kwargs={'job_id': task_id},
                         id=task_id,
                         replace_existing=True
                     )
@@ -770,8 +829,7 @@ class TaskScheduler:
         """
         try:
             # 获取最新的任务信息
-            tasks = self.storage.config['baidu']['tasks']
-            current_task = next((task for task in tasks if task['url'] == task_url), None)
+            current_task = self.storage.get_task_by_url(task_url)
             
             if not current_task:
                 logger.error(f"未找到任务: {task_url}")
@@ -819,6 +877,7 @@ class TaskScheduler:
                     self._execute_single_task,
                     trigger,
                     args=[task],
+                    kwargs={'job_id': job_id},
                     id=job_id,
                     replace_existing=True
                 )
@@ -854,6 +913,31 @@ class TaskScheduler:
         except Exception as e:
             logger.error(f"添加网盘容量检查任务失败: {str(e)}")
 
+    def _add_version_check_job(self):
+        """添加版本检查任务，定时刷新 /api/version/check 返回的缓存"""
+        try:
+            version_config = self.storage.config.get('version_check', {})
+            if not version_config.get('enabled', True):
+                logger.info("定时版本检查未启用")
+                return
+            
+            interval = max(int(version_config.get('interval', DEFAULT_VERSION_CHECK_INTERVAL)),
+                           MIN_VERSION_CHECK_INTERVAL)
+            version_checker.ttl = interval
+            # 冷启动时缓存为空，/api/version/check 只能返回 pending，立即在后台预热默认来源
+            delay = VERSION_CHECK_STARTUP_DELAY if version_checker.has_result() else 0
+            self.scheduler.add_job(
+                version_checker.refresh_all,
+                IntervalTrigger(seconds=interval),
+                id='version_check',
+                executor='background',
+                next_run_time=datetime.datetime.now() + datetime.timedelta(seconds=delay),
+                replace_existing=True
+            )
+            logger.info(f"已添加版本检查任务: 每 {interval} 秒")
+        except Exception as e:
+            logger.error(f"添加版本检查任务失败: {str(e)}")
+
     def _check_disk_quota(self):
         """检查网盘容量并发送通知"""
         try:
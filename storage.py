@@ -1,19 +1,23 @@
-from baidupcs_py.baidupcs import BaiduPCSApi
-from baidupcs_py.baidupcs.errors import BaiduPCSError
 from loguru import logger
 import json
 import os
 import time
 import re
-from notify import send as notify_send
 import posixpath
-from threading import Lock
+from threading import Event, Lock, RLock, Thread
 import traceback
 import subprocess
 import shutil
 import json
 import random
+import copy
+from collections import deque, namedtuple
+from contextlib import contextmanager
 from functools import wraps
+from config_store import create_config_store
+from transfer_metrics import TransferMetrics, MeteredClient
+from metrics import (TASK_RUNS, TRANSFER_DURATION, RATE_LIMIT_WAITS, RATE_LIMIT_WAIT_SECONDS,
+                     CONFIG_SAVE_DURATION)
 
 def _format_transfer_error(error_str):
     """格式化转存错误信息，将百度API返回的模糊错误信息转换为更清晰的提示"""
@@ -57,7 +61,10 @@ def api_retry(max_retries=1, delay_range=(2, 3), exclude_errors=None):
                             logger.debug(f"API调用失败，错误不需要重试: {error_str}")
                         raise e
 
-                    # 记录重试信息
+                    # 记录重试信息，经 MeteredClient 调用时计入本次转存的重试次数
+                    metrics = getattr(kwargs.get('client'), 'metrics', None)
+                    if metrics is not None:
+                        metrics.retries += 1
                     delay = random.uniform(delay_range[0], delay_range[1])
                     logger.warning(f"API调用失败，{delay:.1f}秒后进行第{attempt + 1}次重试: {error_str}")
                     time.sleep(delay)
@@ -68,53 +75,106 @@ def api_retry(max_retries=1, delay_range=(2, 3), exclude_errors=None):
         return wrapper
     return decorator
 
+# 只读任务快照: version 为生成时的配置版本号，tasks 为按 order 排好序的任务元组，
+# categories 为 分类 -> 任务元组（None 对应未分类）。快照内容不得修改。
+TaskSnapshot = namedtuple('TaskSnapshot', ['version', 'tasks', 'categories'])
+
+# 变更日志保留的版本数，增量查询的游标早于此范围时需要拉取完整任务列表
+TASK_CHANGE_LOG_SIZE = 1000
+
+# 客户端初始化状态: pending 未开始，initializing 进行中，ready 可用，
+# unconfigured 未设置用户或 cookies 无效，failed 连接网盘失败
+CLIENT_STATES = ('pending', 'initializing', 'ready', 'unconfigured', 'failed')
+# refresh_login 等待后台初始化完成的最长时间（秒）
+CLIENT_INIT_WAIT_TIMEOUT = 60
+# 用户信息（含配额）缓存的默认有效期（秒），可通过配置 user_info_cache.ttl 修改
+DEFAULT_USER_INFO_CACHE_TTL = 30
+
 class BaiduStorage:
-    def __init__(self):
+    # 创建网盘客户端的工厂，参数为 cookies 字典。基准测试中替换为本地模拟服务的客户端
+    # （见 benchmarks/fake_pcs.py），替换为函数时需用 staticmethod 包装。
+    # 为 None 时使用 BaiduPCSApi，baidupcs_py 在首次创建客户端时才导入（通常在后台初始化线程中）
+    api_factory = None
+
+    def __init__(self, lazy_client=False):
+        """
+        Args:
+            lazy_client: 为 True 时在后台线程初始化客户端，构造函数不等待网盘接口，
+                         初始化进度通过 client_status / wait_client_ready 获取
+        """
         self._client_lock = Lock()  # 添加客户端初始化锁
+        self._client_ready = Event()  # 客户端初始化（成功或失败）完成时置位
+        self._client_state = {'state': 'pending', 'error': None, 'updated_at': None}
+        # _lock 保护任务列表结构、索引和版本号，只在内存操作期间短暂持有
+        # task_locks 为每个任务一把锁，串行化同一任务的"修改+保存"
+        # _save_lock 保证快照和写盘的先后顺序一致
+        # 结构性修改（增删、重排）持有 _save_lock 直到整体写盘完成
+        # 加锁顺序: 任务锁 -> _save_lock -> _lock，持有 _lock 时不做任何IO
+        self._lock = RLock()
+        self._save_lock = RLock()
+        self.task_locks = {}  # 用于存储每个任务的锁，键为id(task)
+        self._store = create_config_store()  # 配置存储后端(json/sqlite)
         self.config = self._load_config()
+        orders_repaired = self._normalize_task_orders()
+        # 任务索引，按order和url直接定位任务
+        self._tasks_by_order = {}
+        self._tasks_by_url = {}
+        self._rebuild_task_index()
+        # 配置版本号，每次修改递增，供调度器和Web层判断数据是否变化
+        self._version = 0
+        self._full_saved_version = 0  # 最近一次整体写盘对应的版本号
+        self._change_listeners = []
+        self._snapshot = None  # 按需重建的任务快照，见 get_task_snapshot
+        # 每个版本对应的变更: (version, order)，order 为 None 表示整体变更，见 get_task_changes
+        self._change_log = deque(maxlen=TASK_CHANGE_LOG_SIZE)
+        if orders_repaired:
+            self._write_config()
         self.client = None
-        self._init_client()
         self.last_request_time = 0
         self.min_request_interval = 2
         # 添加错误跟踪
         self.last_error = None
-        self.task_locks = {}  # 用于存储每个任务的锁
-        # 添加用户信息缓存
-        self._user_info_cache = None
-        self._user_info_cache_time = 0
-        self._cache_ttl = 30  # 缓存有效期（秒）
+        # 按账号缓存的用户信息: 用户名 -> {'value': 用户信息, 'time': 获取时间}，见 get_user_info
+        self._user_info_cache = {}
+        # 用户名 -> 清除次数，清除前开始的刷新不写回缓存
+        self._user_info_generation = {}
+        self._user_info_refreshing = set()  # 正在后台刷新的账号
+        self._user_info_lock = Lock()
+        if lazy_client:
+            self.start_client_init()
+        else:
+            self._init_client()
         
     def _load_config(self):
         try:
             # 检查配置文件是否存在且不为空
-            if not os.path.exists('config/config.json') or os.path.getsize('config/config.json') == 0:
+            if not self._store.exists():
                 logger.warning("配置文件不存在或为空，将从模板创建")
                 self._create_config_from_template()
             
-            with open('config/config.json', 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                # 确保配置文件结构完整
-                if 'baidu' not in config:
-                    config['baidu'] = {}
-                if 'users' not in config['baidu']:
-                    config['baidu']['users'] = {}
-                if 'current_user' not in config['baidu']:
-                    config['baidu']['current_user'] = None
-                if 'tasks' not in config['baidu']:
-                    config['baidu']['tasks'] = []
-                if 'cron' not in config:
-                    config['cron'] = {
-                        'default_schedule': '*/5 * * * *',
-                        'auto_install': True
-                    }
-                # 添加 auth 配置结构
-                if 'auth' not in config:
-                    config['auth'] = {
-                        'users': 'admin',
-                        'password': 'admin123',
-                        'session_timeout': 3600
-                    }
-                return config
+            config = self._store.load()
+            # 确保配置文件结构完整
+            if 'baidu' not in config:
+                config['baidu'] = {}
+            if 'users' not in config['baidu']:
+                config['baidu']['users'] = {}
+            if 'current_user' not in config['baidu']:
+                config['baidu']['current_user'] = None
+            if 'tasks' not in config['baidu']:
+                config['baidu']['tasks'] = []
+            if 'cron' not in config:
+                config['cron'] = {
+                    'default_schedule': '*/5 * * * *',
+                    'auto_install': True
+                }
+            # 添加 auth 配置结构
+            if 'auth' not in config:
+                config['auth'] = {
+                    'users': 'admin',
+                    'password': 'admin123',
+                    'session_timeout': 3600
+                }
+            return config
         except FileNotFoundError:
             return {
                 'baidu': {
@@ -173,77 +233,316 @@ class BaiduStorage:
     def _save_config(self, update_scheduler=True):
         """保存配置到文件"""
         try:
-            # 在保存前清理 None 值的 cron 字段
-            for task in self.config.get('baidu', {}).get('tasks', []):
-                if 'cron' in task and task['cron'] is None:
-                    del task['cron']
-                    
-            with open('config/config.json', 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, ensure_ascii=False, indent=4)
-            
+            version = self._write_config()
+            self._notify_change(version)
+
             logger.debug("配置保存成功")
-            
-            # 确保配置已经写入文件
-            with open('config/config.json', 'r', encoding='utf-8') as f:
-                saved_config = json.load(f)
-                if saved_config != self.config:
-                    logger.error("配置保存验证失败")
-                    raise Exception("配置保存验证失败")
-            
+
             # 通知调度器更新任务
             if update_scheduler:
-                from scheduler import TaskScheduler
-                if hasattr(TaskScheduler, 'instance') and TaskScheduler.instance:
-                    TaskScheduler.instance.update_tasks()
+                self._update_scheduler()
             
         except Exception as e:
             logger.error(f"保存配置失败: {str(e)}")
             raise
-            
+
+    def _update_scheduler(self):
+        """通知调度器按当前任务列表重建作业
+        重建会移除并重新添加所有任务作业，不能在持有 _save_lock 时调用，否则单任务保存会一直等待重建完成
+        """
+        from scheduler import TaskScheduler
+        if hasattr(TaskScheduler, 'instance') and TaskScheduler.instance:
+            TaskScheduler.instance.update_tasks()
+
+    def _write_config(self, task_order=None):
+        """在 _save_lock 内对配置做一致快照并整体写盘
+        Args:
+            task_order: 本次只修改了单个任务时传入其order，记入变更日志
+        Returns:
+            int: 快照对应的版本号
+        """
+        with self._save_lock:
+            with self._lock:
+                # 在保存前清理 None 值的 cron 字段
+                for task in self.config.get('baidu', {}).get('tasks', []):
+                    if 'cron' in task and task['cron'] is None:
+                        del task['cron']
+                snapshot = copy.deepcopy(self.config)
+                # 任务的增删、重排和url修改都会经过这里，保存前同步刷新索引
+                self._rebuild_task_index()
+                version = self._bump_version(task_order)
+            with CONFIG_SAVE_DURATION.time(mode='full'):
+                self._store.save(snapshot)
+            self._full_saved_version = version
+        return version
+
+    @property
+    def version(self):
+        """当前配置版本号"""
+        return self._version
+
+    def add_change_listener(self, callback):
+        """注册配置变更回调
+        Args:
+            callback: 回调函数 callback(version, task)，task为None表示整体配置变更
+        """
+        with self._lock:
+            if callback not in self._change_listeners:
+                self._change_listeners = self._change_listeners + [callback]
+
+    def remove_change_listener(self, callback):
+        """移除配置变更回调"""
+        with self._lock:
+            if callback in self._change_listeners:
+                self._change_listeners = [cb for cb in self._change_listeners if cb != callback]
+
+    def _bump_version(self, task_order=None):
+        """递增版本号并记入变更日志，调用方需持有 _lock
+        Args:
+            task_order: 只修改了单个任务时为其order，None表示整体变更
+        """
+        self._version += 1
+        self._change_log.append((self._version, task_order))
+        return self._version
+
+    def get_task_changes(self, since):
+        """获取指定版本之后状态有变化的任务
+        Args:
+            since: 客户端持有的版本号
+        Returns:
+            tuple: (version, tasks)，tasks 为变化任务的副本（按 order 排序）；
+                   期间有任务增删、重排等整体变更，或版本已超出变更日志范围时 tasks 为 None，
+                   需要重新获取完整任务列表
+        """
+        with self._lock:
+            version = self._version
+            orders = self._changed_orders_locked(since)
+            if orders is None:
+                return version, None
+            tasks = []
+            for task_order in sorted(orders):
+                task = self._tasks_by_order.get(task_order)
+                if task is not None:
+                    tasks.append(copy.deepcopy(task))
+            return version, tasks
+
+    def _changed_orders_locked(self, since):
+        """根据变更日志计算指定版本之后修改过的任务order，调用方需持有 _lock
+        Returns:
+            set: 变化任务的order集合；有整体变更或超出日志范围时返回 None
+        """
+        version = self._version
+        if since == version:
+            return set()
+        log = self._change_log
+        if since > version or not log or log[0][0] > since + 1:
+            return None
+        orders = set()
+        for change_version, task_order in reversed(log):
+            if change_version <= since:
+                break
+            if task_order is None:
+                return None
+            orders.add(task_order)
+        return orders
+
+    def _notify_change(self, version, task=None):
+        """通知所有监听者，在锁外调用
+        Args:
+            version: 变更对应的版本号
+            task: 发生变更的单个任务，None表示整体配置变更
+        """
+        for callback in self._change_listeners:
+            try:
+                callback(version, task)
+            except Exception as e:
+                logger.error(f"配置变更回调执行失败: {str(e)}")
+
+    def _rebuild_task_index(self):
+        """根据当前任务列表重建order/url索引"""
+        with self._lock:
+            tasks = self.config.get('baidu', {}).get('tasks', [])
+            by_order = {}
+            by_url = {}
+            for task in tasks:
+                order = task.get('order')
+                if order and order not in by_order:
+                    by_order[order] = task
+                url = task.get('url')
+                if url and url not in by_url:
+                    by_url[url] = task
+            self._tasks_by_order = by_order
+            self._tasks_by_url = by_url
+            # 清理已删除任务的锁
+            live = {id(task) for task in tasks}
+            self.task_locks = {key: lock for key, lock in self.task_locks.items() if key in live}
+
+    def get_task_by_order(self, order):
+        """按order获取任务，不存在返回None"""
+        return self._tasks_by_order.get(order)
+
+    def get_task_by_url(self, url):
+        """按分享链接获取任务，不存在返回None"""
+        return self._tasks_by_url.get(url)
+
+    def _get_task_lock(self, task):
+        """获取单个任务的锁，不存在时创建"""
+        with self._lock:
+            lock = self.task_locks.get(id(task))
+            if lock is None:
+                lock = self.task_locks[id(task)] = RLock()
+            return lock
+
+    @contextmanager
+    def task_mutation(self, task):
+        """修改单个任务并保存
+        调用方修改的是任务的浅拷贝，期间只持有该任务的锁，不同任务之间、以及读取快照和整体变更都不会被阻塞；
+        退出时在 _lock 内一次性写回任务，再只保存该任务。嵌套的列表/字典应整体替换而不是原地修改:
+            with storage.task_mutation(task) as draft:
+                draft['status'] = 'normal'
+        """
+        with self._get_task_lock(task):
+            with self._lock:
+                draft = dict(task)
+            yield draft
+            with self._lock:
+                task.clear()
+                task.update(draft)
+            self._save_task(task)
+
+    def _save_task(self, task):
+        """只保存单个任务的变更（状态、消息等），不触发调度器更新
+        调用方应持有该任务的锁（见 task_mutation）
+        Args:
+            task: 已修改的任务字典
+        """
+        try:
+            if not self._store.row_writes or not task.get('order'):
+                # 后端不支持按行写入，或任务无法定位到行，退化为整体保存
+                version = self._write_config(task.get('order'))
+            else:
+                with self._lock:
+                    if self._tasks_by_order.get(task['order']) is not task:
+                        # 任务已被删除，不能再写回
+                        logger.debug(f"任务已不在列表中，跳过保存: order={task.get('order')}")
+                        return
+                    if 'cron' in task and task['cron'] is None:
+                        del task['cron']
+                    payload = copy.deepcopy(task)
+                    version = self._bump_version(task['order'])
+                with self._save_lock:
+                    # 更新的整体快照已包含本次修改（快照晚于拷贝），无需再写这一行
+                    if version > self._full_saved_version:
+                        with CONFIG_SAVE_DURATION.time(mode='task'):
+                            self._store.save_task(payload)
+            self._notify_change(version, task)
+            logger.debug(f"任务保存成功: order={task.get('order')}")
+        except Exception as e:
+            logger.error(f"保存任务失败: {str(e)}")
+            raise
+
     def _init_client(self):
-        """初始化客户端"""
+        """初始化客户端，结果记录到 client_status
+        Returns:
+            bool: 是否成功
+        """
         with self._client_lock:  # 使用锁保护初始化过程
+            self._set_client_state('initializing')
             try:
-                current_user = self.config['baidu'].get('current_user')
-                if not current_user:
-                    logger.error("未设置当前用户")
-                    return False
-                    
-                user_info = self.config['baidu']['users'].get(current_user)
-                if not user_info or not user_info.get('cookies'):
-                    logger.error(f"用户 {current_user} 配置无效")
-                    return False
-                    
-                cookies = self._parse_cookies(user_info['cookies'])
-                if not self._validate_cookies(cookies):
-                    logger.error("cookies 无效")
-                    return False
-                    
-                # 清除用户信息缓存
-                self._clear_user_info_cache()
-                
-                # 使用重试机制初始化客户端
-                for retry in range(3):
-                    try:
-                        self.client = BaiduPCSApi(cookies=cookies)
-                        # 验证客户端
-                        quota = self.client.quota()
-                        total_gb = round(quota[0] / (1024**3), 2)
-                        used_gb = round(quota[1] / (1024**3), 2)
-                        logger.info(f"客户端初始化成功，网盘总空间: {total_gb}GB, 已使用: {used_gb}GB")
-                        return True
-                    except Exception as e:
-                        if retry < 2:
-                            logger.warning(f"客户端初始化失败，等待重试: {str(e)}")
-                            time.sleep(3)
-                        else:
-                            logger.error(f"客户端初始化失败: {str(e)}")
-                            return False
-                            
+                state, error = self._connect_client()
             except Exception as e:
                 logger.error(f"初始化客户端失败: {str(e)}")
-                return False
-            
+                state, error = 'failed', str(e)
+            self._set_client_state(state, error)
+            self._client_ready.set()
+            return state == 'ready'
+
+    def _connect_client(self):
+        """按当前用户的 cookies 创建客户端并验证
+        Returns:
+            tuple: (状态, 错误信息)，状态见 CLIENT_STATES
+        """
+        current_user = self.config['baidu'].get('current_user')
+        if not current_user:
+            logger.error("未设置当前用户")
+            return 'unconfigured', '未设置当前用户'
+
+        user_info = self.config['baidu']['users'].get(current_user)
+        if not user_info or not user_info.get('cookies'):
+            logger.error(f"用户 {current_user} 配置无效")
+            return 'unconfigured', f'用户 {current_user} 配置无效'
+
+        cookies = self._parse_cookies(user_info['cookies'])
+        if not self._validate_cookies(cookies):
+            logger.error("cookies 无效")
+            return 'unconfigured', 'cookies 无效'
+
+        # 清除用户信息缓存
+        self._clear_user_info_cache()
+
+        # 使用重试机制初始化客户端
+        for retry in range(3):
+            try:
+                self.client = self._create_api(cookies)
+                # 验证客户端
+                quota = self.client.quota()
+                total_gb = round(quota[0] / (1024**3), 2)
+                used_gb = round(quota[1] / (1024**3), 2)
+                logger.info(f"客户端初始化成功，网盘总空间: {total_gb}GB, 已使用: {used_gb}GB")
+                # 预先获取用户信息，之后的调用直接使用缓存
+                self._refresh_user_info_async(current_user, self.client)
+                return 'ready', None
+            except Exception as e:
+                if retry < 2:
+                    logger.warning(f"客户端初始化失败，等待重试: {str(e)}")
+                    time.sleep(3)
+                else:
+                    logger.error(f"客户端初始化失败: {str(e)}")
+                    return 'failed', str(e)
+
+    def _set_client_state(self, state, error=None):
+        self._client_state = {'state': state, 'error': error, 'updated_at': int(time.time())}
+
+    def start_client_init(self):
+        """在后台线程初始化客户端，立即返回"""
+        self._client_ready.clear()
+        self._set_client_state('initializing')
+        Thread(target=self._init_client, name='client-init', daemon=True).start()
+
+    def wait_client_ready(self, timeout=None):
+        """等待客户端初始化完成（不论成功与否），超时返回 False"""
+        return self._client_ready.wait(timeout)
+
+    def client_status(self):
+        """客户端初始化状态
+        Returns:
+            dict: state 见 CLIENT_STATES，ready 表示客户端可用，error 为失败原因
+        """
+        status = dict(self._client_state)
+        status['ready'] = status['state'] == 'ready'
+        return status
+
+    def refresh_login(self):
+        """重新初始化客户端，返回是否成功；后台初始化尚未完成时先等待其结果"""
+        if not self._client_ready.is_set():
+            logger.info("等待客户端初始化完成...")
+            self.wait_client_ready(CLIENT_INIT_WAIT_TIMEOUT)
+            if self.client_status()['ready']:
+                return True
+        return self._init_client()
+
+    def _create_api(self, cookies, metrics=None):
+        """创建网盘客户端，接口调用计入 /metrics
+        Args:
+            cookies: cookies字典
+            metrics: 可选的 TransferMetrics，同时记录到本次转存的统计
+        """
+        factory = self.api_factory
+        if factory is None:
+            from baidupcs_py.baidupcs import BaiduPCSApi
+            factory = BaiduPCSApi
+        return MeteredClient(factory(cookies=cookies), metrics)
+
     def _validate_cookies(self, cookies):
         """验证cookies是否有效
         Args:
@@ -296,31 +595,32 @@ class BaiduStorage:
                 raise ValueError("无效的 cookies 格式")
                 
             # 验证 cookies 是否有效
-            temp_api = BaiduPCSApi(cookies=cookies_dict)
+            temp_api = self._create_api(cookies_dict)
             user_info = temp_api.user_info()
             
             if not user_info:
                 raise ValueError("Cookies 无效")
                 
-            # 使用指定用户名或生成唯一用户名
-            if not username:
-                username = "user"
-            if username in self.config['baidu']['users']:
-                i = 1
-                while f"{username}_{i}" in self.config['baidu']['users']:
-                    i += 1
-                username = f"{username}_{i}"
-                
-            # 保存用户信息
-            self.config['baidu']['users'][username] = {
-                "cookies": cookies_str,
-                "name": username,
-                "user_id": username
-            }
-            
-            # 如果是第一个用户,设为当前用户
-            if not self.config['baidu']['current_user']:
-                self.config['baidu']['current_user'] = username
+            with self._lock:
+                # 使用指定用户名或生成唯一用户名
+                if not username:
+                    username = "user"
+                if username in self.config['baidu']['users']:
+                    i = 1
+                    while f"{username}_{i}" in self.config['baidu']['users']:
+                        i += 1
+                    username = f"{username}_{i}"
+                    
+                # 保存用户信息
+                self.config['baidu']['users'][username] = {
+                    "cookies": cookies_str,
+                    "name": username,
+                    "user_id": username
+                }
+                
+                # 如果是第一个用户,设为当前用户
+                if not self.config['baidu']['current_user']:
+                    self.config['baidu']['current_user'] = username
                 
             self._save_config()
             
@@ -361,11 +661,18 @@ class BaiduStorage:
             logger.error(f"添加用户失败: {str(e)}")
             return False
             
-    def _clear_user_info_cache(self):
-        """清除用户信息缓存"""
-        self._user_info_cache = None
-        self._user_info_cache_time = 0
-        logger.debug("已清除用户信息缓存")
+    def _clear_user_info_cache(self, username=None):
+        """清除用户信息缓存，默认为当前用户"""
+        username = username or self.config['baidu'].get('current_user')
+        with self._user_info_lock:
+            self._user_info_cache.pop(username, None)
+            self._user_info_generation[username] = self._user_info_generation.get(username, 0) + 1
+        logger.debug(f"已清除用户信息缓存: {username}")
+
+    @property
+    def user_info_cache_ttl(self):
+        """用户信息缓存的有效期（秒）"""
+        return self.config.get('user_info_cache', {}).get('ttl', DEFAULT_USER_INFO_CACHE_TTL)
         
     def switch_user(self, username):
         """切换当前用户"""
@@ -373,11 +680,11 @@ class BaiduStorage:
             if username not in self.config['baidu']['users']:
                 raise ValueError(f"用户 {username} 不存在")
                 
-            self.config['baidu']['current_user'] = username
+            with self._lock:
+                self.config['baidu']['current_user'] = username
             self._save_config()
+            # 用户信息按账号缓存，初始化客户端时会清除并重新获取
             self._init_client()
-            # 清除用户信息缓存
-            self._clear_user_info_cache()
             
             logger.success(f"已切换到用户: {username}")
             return True
@@ -396,7 +703,8 @@ class BaiduStorage:
             if username == self.config['baidu']['current_user']:
                 raise ValueError("不能删除当前使用的用户")
                 
-            del self.config['baidu']['users'][username]
+            with self._lock:
+                del self.config['baidu']['users'][username]
             self._save_config()
             
             logger.success(f"已删除用户: {username}")
@@ -406,6 +714,47 @@ class BaiduStorage:
             logger.error(f"删除用户失败: {str(e)}")
             return False
             
+    def rename_user(self, old_username, new_username):
+        """重命名用户（cookies 不变），是当前用户时一并更新 current_user
+        Returns:
+            bool: 是否成功
+        """
+        try:
+            with self._lock:
+                users = self.config['baidu']['users']
+                if old_username not in users:
+                    raise ValueError(f"用户 {old_username} 不存在")
+                if new_username in users:
+                    raise ValueError(f"用户名 {new_username} 已存在")
+                users[new_username] = users.pop(old_username)
+                if self.config['baidu'].get('current_user') == old_username:
+                    self.config['baidu']['current_user'] = new_username
+            self._clear_user_info_cache(old_username)
+            self._save_config()
+
+            logger.success(f"已重命名用户: {old_username} -> {new_username}")
+            return True
+
+        except Exception as e:
+            logger.error(f"重命名用户失败: {str(e)}")
+            return False
+
+    def get_settings(self, section, default=None):
+        """获取配置段（notify、auth、share 等）的副本，修改后通过 update_settings 写回"""
+        with self._lock:
+            return copy.deepcopy(self.config.get(section, {} if default is None else default))
+
+    def update_settings(self, updates, update_scheduler=True):
+        """在锁内整体替换配置段并保存
+        Args:
+            updates: {配置段: 新值}
+            update_scheduler: 是否通知调度器更新任务
+        """
+        with self._lock:
+            for section, value in updates.items():
+                self.config[section] = copy.deepcopy(value)
+        self._save_config(update_scheduler=update_scheduler)
+
     def list_users(self):
         """获取用户列表"""
         users = []
@@ -421,75 +770,97 @@ class BaiduStorage:
         return users
             
     def get_user_info(self):
-        """获取当前用户信息"""
+        """获取当前用户信息（含配额），按账号缓存
+        缓存过期后仍直接返回缓存的值，同时在后台刷新（stale-while-revalidate）。
+        只有没有缓存时（首次获取、切换账号或上次刷新失败后）才等待接口返回。
+        """
         try:
-            if not self.client:
+            client = self.client
+            username = self.config['baidu'].get('current_user')
+            if not client or not username:
                 return None
-            
-            # 检查缓存是否有效
-            current_time = time.time()
-            if (self._user_info_cache is not None and 
-                current_time - self._user_info_cache_time < self._cache_ttl):
+
+            with self._user_info_lock:
+                entry = self._user_info_cache.get(username)
+            if entry is None:
+                return self._refresh_user_info(username, client)
+
+            if time.time() - entry['time'] >= self.user_info_cache_ttl:
+                self._refresh_user_info_async(username, client)
+            else:
                 logger.debug("使用缓存的用户信息，跳过API调用")
-                return self._user_info_cache
-            
-            # 首先尝试获取配额信息
-            try:
-                quota_info = self.client.quota()
-                if isinstance(quota_info, (tuple, list)):
-                    quota = {
-                        'total': quota_info[0],
-                        'used': quota_info[1]
-                    }
-                else:
-                    quota = quota_info
-                logger.debug("成功获取网盘配额信息")
-                
-                # 分步获取用户信息
-                try:
-                    # 1. 先获取网盘用户信息
-                    logger.debug("开始获取网盘用户信息...")
-                    pan_info = self.client._baidupcs.user_info()
-                    logger.debug(f"网盘用户信息: {pan_info}")
-                    
-                    user_id = int(pan_info["user"]["id"])
-                    user_name = pan_info["user"]["name"]
-                    
-                    # 构建并缓存用户信息
-                    user_info = {
-                        'user_name': user_name,
-                        'user_id': user_id,
-                        'quota': quota
-                    }
-                    
-                    # 更新缓存
-                    self._user_info_cache = user_info
-                    self._user_info_cache_time = current_time
-                    
-                    return user_info
-                    
-                except Exception as e:
-                    logger.warning(f"获取用户详细信息失败: {str(e)}")
-                    
-                    # 即使获取详细信息失败，也缓存基本配额信息
-                    user_info = {
-                        'user_name': '未知用户',
-                        'user_id': None,
-                        'quota': quota
-                    }
-                    self._user_info_cache = user_info
-                    self._user_info_cache_time = current_time
-                    
-                    return user_info
-                    
-            except Exception as e:
-                logger.error(f"获取网盘信息失败: {str(e)}")
-                return None
-                
+            return entry['value']
+
         except Exception as e:
             logger.error(f"获取用户信息失败: {str(e)}")
             return None
-            
+
+    def _refresh_user_info(self, username, client):
+        """获取用户信息并写入缓存，获取失败时清除该账号的缓存"""
+        with self._user_info_lock:
+            generation = self._user_info_generation.get(username, 0)
+        user_info = self._fetch_user_info(client)
+        with self._user_info_lock:
+            # 期间缓存被清除过（如更新了 cookies），结果不再写回
+            if self._user_info_generation.get(username, 0) == generation:
+                if user_info is None:
+                    self._user_info_cache.pop(username, None)
+                else:
+                    self._user_info_cache[username] = {'value': user_info, 'time': time.time()}
+        return user_info
+
+    def _refresh_user_info_async(self, username, client):
+        """在后台线程刷新用户信息，同一账号同时只有一个刷新"""
+        with self._user_info_lock:
+            if username in self._user_info_refreshing:
+                return
+            self._user_info_refreshing.add(username)
+
+        def refresh():
+            try:
+                self._refresh_user_info(username, client)
+            finally:
+                with self._user_info_lock:
+                    self._user_info_refreshing.discard(username)
+
+        Thread(target=refresh, name='user-info-refresh', daemon=True).start()
+
+    def _fetch_user_info(self, client):
+        """调用接口获取配额和网盘用户信息，获取配额失败时返回 None"""
+        # 首先尝试获取配额信息
+        try:
+            quota_info = client.quota()
+            if isinstance(quota_info, (tuple, list)):
+                quota = {
+                    'total': quota_info[0],
+                    'used': quota_info[1]
+                }
+            else:
+                quota = quota_info
+            logger.debug("成功获取网盘配额信息")
+        except Exception as e:
+            logger.error(f"获取网盘信息失败: {str(e)}")
+            return None
+
+        # 分步获取用户信息
+        try:
+            logger.debug("开始获取网盘用户信息...")
+            pan_info = client._baidupcs.user_info()
+            logger.debug(f"网盘用户信息: {pan_info}")
+            return {
+                'user_name': pan_info["user"]["name"],
+                'user_id': int(pan_info["user"]["id"]),
+                'quota': quota
+            }
+        except Exception as e:
+            logger.warning(f"获取用户详细信息失败: {str(e)}")
+            # 即使获取详细信息失败，也缓存基本配额信息
+            return {
+                'user_name': '未知用户',
+                'user_id': None,
+                'quota': quota
+            }
+
     def _save_record(self, share_url, status):
         """保存转存记录
         Args:
@@ -526,25 +897,49 @@ class BaiduStorage:
     def get_max_order(self):
         """获取当前最大的任务顺序值"""
         try:
-            tasks = self.config['baidu'].get('tasks', [])
-            if not tasks:
-                return 0
-            return max((task.get('order', 0) for task in tasks), default=0)
+            with self._lock:
+                tasks = self.config['baidu'].get('tasks', [])
+                return max((task.get('order', 0) for task in tasks), default=0)
         except Exception as e:
             logger.error(f"获取最大顺序值失败: {str(e)}")
             return 0
 
-    def _update_task_orders(self):
-        """重新整理所有任务的顺序"""
+    def _normalize_task_orders(self):
+        """修复重复或缺失的任务order
+        旧版配置允许这种情况，但按order定位任务（索引、单行写入）要求order唯一。
+        按现有order排序（没有order的排在最后，相同order保持原有先后）后从1重新编号
+        Returns:
+            bool: 是否做了修改
+        """
+        tasks = self.config['baidu'].get('tasks', [])
+        orders = [task.get('order') for task in tasks]
+        if all(isinstance(order, int) and order > 0 for order in orders) and len(set(orders)) == len(orders):
+            return False
+        tasks = sorted(tasks, key=lambda x: x.get('order') or float('inf'))
+        for i, task in enumerate(tasks, 1):
+            task['order'] = i
+        self.config['baidu']['tasks'] = tasks
+        logger.warning(f"任务顺序存在重复或缺失，已重新编号: 共 {len(tasks)} 个任务")
+        return True
+
+    def _update_task_orders(self, update_scheduler=True):
+        """重新整理所有任务的顺序
+        Args:
+            update_scheduler: 是否通知调度器，调用方持有 _save_lock 时应传 False，释放后再通知
+        """
         try:
-            tasks = self.config['baidu'].get('tasks', [])
-            # 按现有order排序，没有order的排在最后
-            tasks.sort(key=lambda x: x.get('order', float('inf')))
-            # 重新分配order，从1开始
-            for i, task in enumerate(tasks, 1):
-                task['order'] = i
-            self.config['baidu']['tasks'] = tasks
-            self._save_config()
+            with self._save_lock:
+                with self._lock:
+                    # 按现有order排序，没有order的排在最后
+                    tasks = sorted(self.config['baidu'].get('tasks', []),
+                                   key=lambda x: x.get('order') or float('inf'))
+                    # 重新分配order，从1开始
+                    for i, task in enumerate(tasks, 1):
+                        task['order'] = i
+                    self.config['baidu']['tasks'] = tasks
+                self._save_config(update_scheduler=False)
+            if update_scheduler:
+                self._update_scheduler()
             return True
         except Exception as e:
             logger.error(f"更新任务顺序失败: {str(e)}")
@@ -559,39 +954,41 @@ class BaiduStorage:
             bool: 是否成功
         """
         try:
-            tasks = self.config['baidu'].get('tasks', [])
-            
-            # 查找要移动的任务
-            task = next((t for t in tasks if t.get('order') == task_order), None)
-            if not task:
-                logger.error(f"未找到任务: order={task_order}")
-                return False
-            
-            # 如果新顺序无效，返回失败
-            max_order = len(tasks)
-            if not (1 <= new_order <= max_order):
-                logger.error(f"无效的新顺序: {new_order}, 最大值: {max_order}")
-                return False
-            
-            # 调整其他任务的顺序
-            if new_order < task_order:
-                # 向前移动：中间的任务顺序+1
-                for t in tasks:
-                    if new_order <= t.get('order', 0) < task_order:
-                        t['order'] = t.get('order', 0) + 1
-            else:
-                # 向后移动：中间的任务顺序-1
-                for t in tasks:
-                    if task_order < t.get('order', 0) <= new_order:
-                        t['order'] = t.get('order', 0) - 1
-            
-            # 设置新顺序
-            task['order'] = new_order
-            
-            # 重新排序任务列表
-            tasks.sort(key=lambda x: x.get('order', float('inf')))
-            self.config['baidu']['tasks'] = tasks
-            self._save_config()
+            with self._save_lock:
+                with self._lock:
+                    tasks = self.config['baidu'].get('tasks', [])
+                    
+                    # 查找要移动的任务
+                    task = self.get_task_by_order(task_order)
+                    if not task:
+                        logger.error(f"未找到任务: order={task_order}")
+                        return False
+                    
+                    # 如果新顺序无效，返回失败
+                    max_order = len(tasks)
+                    if not (1 <= new_order <= max_order):
+                        logger.error(f"无效的新顺序: {new_order}, 最大值: {max_order}")
+                        return False
+                    
+                    # 调整其他任务的顺序
+                    if new_order < task_order:
+                        # 向前移动：中间的任务顺序+1
+                        for t in tasks:
+                            if new_order <= t.get('order', 0) < task_order:
+                                t['order'] = t.get('order', 0) + 1
+                    else:
+                        # 向后移动：中间的任务顺序-1
+                        for t in tasks:
+                            if task_order < t.get('order', 0) <= new_order:
+                                t['order'] = t.get('order', 0) - 1
+                    
+                    # 设置新顺序
+                    task['order'] = new_order
+                    
+                    # 重新排序任务列表（替换为新列表，不影响正在遍历旧列表的读者）
+                    self.config['baidu']['tasks'] = sorted(tasks, key=lambda x: x.get('order', float('inf')))
+                self._save_config(update_scheduler=False)
+            self._update_scheduler()
             
             logger.success(f"任务重排序成功: {task_order} -> {new_order}")
             return True
@@ -627,10 +1024,7 @@ class BaiduStorage:
             if not re.match(r'^https?://pan\.baidu\.com/s/[a-zA-Z0-9_-]+(?:\?pwd=[a-zA-Z0-9]+)?$', url):
                 raise ValueError("无效的百度网盘分享链接格式")
             
-            # 获取新任务的顺序值
-            new_order = self.get_max_order() + 1
-            
-            # 创建新任务
+            # 创建新任务，order在加入列表时分配
             new_task = {
                 'url': url,
                 'save_dir': save_dir,
@@ -638,7 +1032,7 @@ class BaiduStorage:
                 'name': name or url,
                 'status': 'pending',
                 'transferred_files': [],
-                'order': new_order
+                'order': None
             }
             
             # 添加可选字段
@@ -650,13 +1044,15 @@ class BaiduStorage:
                 new_task['regex_pattern'] = regex_pattern.strip()
                 new_task['regex_replace'] = regex_replace.strip() if regex_replace else ''
             
-            # 添加任务
-            tasks = self.config['baidu'].get('tasks', [])
-            tasks.append(new_task)
-            self.config['baidu']['tasks'] = tasks
-            
-            # 保存配置
-            self._save_config()
+            with self._save_lock:
+                with self._lock:
+                    # 获取新任务的顺序值并添加任务
+                    new_task['order'] = self.get_max_order() + 1
+                    tasks = self.config['baidu'].get('tasks', [])
+                    self.config['baidu']['tasks'] = tasks + [new_task]
+                
+                # 保存配置，调度器只需添加新任务的作业，在锁外进行
+                self._save_config(update_scheduler=False)
             
             # 通知调度器更新任务
             from scheduler import TaskScheduler
@@ -678,23 +1074,65 @@ class BaiduStorage:
             bool: 是否删除成功
         """
         try:
-            tasks = self.config['baidu']['tasks']
-            for i, task in enumerate(tasks):
-                if task['url'] == share_url:
-                    tasks.pop(i)
-                    # 确保更新调度器
-                    self._save_config(update_scheduler=True)
-                    logger.success(f"删除任务成功: {share_url}")
-                    return True
-            logger.warning(f"未找到任务: {share_url}")
-            return False
+            with self._save_lock:
+                with self._lock:
+                    task = self.get_task_by_url(share_url)
+                    if task is not None:
+                        self._remove_task_locked(task)
+                if task is None:
+                    logger.warning(f"未找到任务: {share_url}")
+                    return False
+                self._save_config(update_scheduler=False)
+            # 释放 _save_lock 后再更新调度器
+            self._update_scheduler()
+            logger.success(f"删除任务成功: {share_url}")
+            return True
         except Exception as e:
             logger.error(f"删除任务失败: {str(e)}")
             return False
             
+    def get_task_snapshot(self):
+        """获取只读任务快照
+        快照在版本号变化后首次读取时重建，同一版本的所有读者共享同一份快照，
+        无需加锁和排序即可直接序列化。期间只有单个任务的状态变化时，
+        只重新拷贝变化的任务，其余任务沿用上一份快照中的副本
+        Returns:
+            TaskSnapshot: 当前版本的任务快照
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == self._version:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.version != self._version:
+                # 按 order 排序，没有 order 的排在最后
+                tasks = sorted(self.config['baidu'].get('tasks', []),
+                               key=lambda x: x.get('order') or float('inf'))
+                changed = self._changed_orders_locked(snapshot.version) if snapshot is not None else None
+                reusable = {}
+                if changed is not None:
+                    reusable = {task.get('order'): task for task in snapshot.tasks
+                                if task.get('order') and task.get('order') not in changed}
+                tasks = tuple(reusable.get(task.get('order')) or copy.deepcopy(task) for task in tasks)
+                categories = {}
+                for task in tasks:
+                    # 与 get_tasks_by_category 及 SQLite 后端一致：空分类视为未分类
+                    categories.setdefault(task.get('category') or None, []).append(task)
+                categories = {key: tuple(value) for key, value in categories.items()}
+                snapshot = self._snapshot = TaskSnapshot(self._version, tasks, categories)
+            return snapshot
+
+    def _remove_task_locked(self, task):
+        """从任务列表中移除任务，调用方需持有 _lock"""
+        tasks = self.config['baidu']['tasks']
+        self.config['baidu']['tasks'] = [t for t in tasks if t is not task]
+
     def list_tasks(self):
-        """列出所有转存任务"""
-        return self.config['baidu']['tasks']
+        """列出所有转存任务
+        返回列表的浅拷贝，调用方排序或增删不会影响存储中的任务列表
+        """
+        with self._lock:
+            return list(self.config['baidu']['tasks'])
             
     def _normalize_path(self, path, file_only=False):
         """标准化路径
@@ -979,9 +1417,32 @@ class BaiduStorage:
                 'message': str,   # 成功时的消息
                 'error': str,     # 失败时的错误信息
                 'skipped': bool,  # 是否跳过（没有新文件）
-                'transferred_files': list  # 成功转存的文件列表
+                'transferred_files': list,  # 成功转存的文件列表
+                'metrics': dict   # 本次执行的各阶段耗时和接口调用统计
             }
         """
+        metrics = TransferMetrics()
+        result = None
+        try:
+            result = self._transfer_share(share_url, pwd, new_files, save_dir, progress_callback, task_config, metrics)
+        finally:
+            # 实现中未捕获的异常同样按失败计入指标，并结束进行中的计时，异常继续向上抛出
+            stats = metrics.finish()
+            if result is None:
+                outcome = 'failed'
+            else:
+                result['metrics'] = stats
+                outcome = ('skipped' if result.get('skipped') else 'success') if result.get('success') else 'failed'
+            TASK_RUNS.inc(outcome=outcome)
+            TRANSFER_DURATION.observe(stats['duration'], outcome=outcome)
+            steps = ', '.join(f"{name} {elapsed:.2f}s" for name, elapsed in stats['steps'].items())
+            logger.info(f"转存统计: 总耗时 {stats['duration']:.2f}s ({steps}), "
+                        f"接口调用 {sum(stats['api_calls'].values())} 次, 分页 {stats['pages']} 次, "
+                        f"重试 {stats['retries']} 次, 频率限制 {stats['rate_limited']} 次")
+        return result
+
+    def _transfer_share(self, share_url, pwd, new_files, save_dir, progress_callback, task_config, metrics):
+        """transfer_share 的实现，metrics 为 TransferMetrics，记录各阶段耗时"""
         try:
             # 创建临时客户端用于本次任务执行
             logger.info("创建临时客户端用于任务执行")
@@ -998,7 +1459,7 @@ class BaiduStorage:
                 return {'success': False, 'error': 'cookies 无效'}
 
             # 创建临时客户端
-            temp_client = BaiduPCSApi(cookies=cookies)
+            temp_client = self._create_api(cookies, metrics)
             logger.info("临时客户端创建成功")
 
             # 规范化保存路径
@@ -1006,6 +1467,7 @@ class BaiduStorage:
                 save_dir = '/' + save_dir
             
             # 步骤1：访问分享链接并获取文件列表
+            metrics.step('list_share')
             logger.info(f"正在访问分享链接: {share_url}")
             if progress_callback:
                 progress_callback('info', f'【步骤1/4】访问分享链接: {share_url}')
@@ -1056,10 +1518,13 @@ class BaiduStorage:
                         })
                 
                 logger.info(f"共记录 {len(shared_files_info)} 个共享文件")
+                # 用于统计转存的字节数
+                file_sizes = {info['fs_id']: info.get('size') or 0 for info in shared_files_info}
                 if progress_callback:
                     progress_callback('info', f'获取到 {len(shared_files_info)} 个共享文件')
                 
                 # 步骤2：扫描本地目录中的文件
+                metrics.step('scan_local')
                 logger.info(f"【步骤2/4】扫描本地目录: {save_dir}")
                 if progress_callback:
                     progress_callback('info', f'【步骤2/4】扫描本地目录: {save_dir}')
@@ -1072,6 +1537,7 @@ class BaiduStorage:
                         progress_callback('info', f'本地目录中有 {len(local_files)} 个文件')
                 
                 # 步骤3：准备转存（对比文件、准备目录）
+                metrics.step('prepare')
                 target_dir = save_dir
                 is_single_folder = (
                     len(shared_paths) == 1 
@@ -1199,6 +1665,7 @@ class BaiduStorage:
                             except Exception as e:
                                 retry_count += 1
                                 if retry_count <= max_retries:
+                                    metrics.retries += 1
                                     # 重试前延长延迟时间
                                     retry_delay = delay_seconds * 2
                                     logger.warning(f"重命名失败，将在 {retry_delay} 秒后重试: {str(e)}")
@@ -1243,6 +1710,7 @@ class BaiduStorage:
                         created_dirs.add(dir_path)
                 
                 # 步骤4：执行文件转存
+                metrics.step('transfer')
                 logger.info(f"=== 【步骤4/4】开始执行转存操作 ===")
                 logger.info(f"共需转存 {len(transfer_list)} 个文件")
                 if progress_callback:
@@ -1284,6 +1752,7 @@ class BaiduStorage:
                             raise ValueError(error_msg)
                         success_count += len(fs_ids)
                         current_file += len(fs_ids)
+                        metrics.add_transferred(len(fs_ids), sum(file_sizes.get(fs_id, 0) for fs_id in fs_ids))
                         logger.success(f"转存操作成功完成: {len(fs_ids)} 个文件已转存到 {dir_path}")
                         if progress_callback:
                             progress_callback('success', f'成功转存到 {dir_path}')
@@ -1293,6 +1762,9 @@ class BaiduStorage:
                                 progress_callback('warning', '触发频率限制，等待10秒后重试...')
                             logger.warning(f"转存操作受到频率限制，等待10秒后重试: {dir_path}")
                             time.sleep(10)
+                            RATE_LIMIT_WAITS.inc()
+                            RATE_LIMIT_WAIT_SECONDS.inc(10)
+                            metrics.retries += 1
                             try:
                                 logger.info(f"重试转存操作: 正在将 {len(fs_ids)} 个文件转存到 {dir_path}")
                                 # 确保客户端和参数都有效
@@ -1311,6 +1783,7 @@ class BaiduStorage:
                                     logger.error(error_msg)
                                     raise ValueError(error_msg)
                                 success_count += len(fs_ids)
+                                metrics.add_transferred(len(fs_ids), sum(file_sizes.get(fs_id, 0) for fs_id in fs_ids))
                                 logger.success(f"重试转存成功: {len(fs_ids)} 个文件已转存到 {dir_path}")
                                 if progress_callback:
                                     progress_callback('success', f'重试成功: {dir_path}')
@@ -1330,6 +1803,7 @@ class BaiduStorage:
                     time.sleep(1)  # 避免频率限制
                 
                 # 步骤5：执行重命名操作（如果需要）
+                metrics.step('rename')
                 logger.info("=== 【步骤5/5】检查是否需要重命名文件 ===")
                 renamed_files = []
                 rename_errors = []
@@ -1373,6 +1847,7 @@ class BaiduStorage:
                             except Exception as e:
                                 retry_count += 1
                                 if retry_count <= max_retries:
+                                    metrics.retries += 1
                                     # 重试前延长延迟时间
                                     retry_delay = delay_seconds * 2
                                     logger.warning(f"重命名失败，将在 {retry_delay} 秒后重试: {str(e)}")
@@ -1402,6 +1877,7 @@ class BaiduStorage:
                     
                     batch_retry_success = []
                     batch_retry_failed = []
+                    metrics.retries += len(all_failed_files)
                     delay_seconds = self.config.get('file_operations', {}).get('rename_delay_seconds', 0.5)
                     
                     for dir_path, clean_path, final_path, original_error in all_failed_files:
@@ -1638,7 +2114,32 @@ class BaiduStorage:
             logger.error("异常详情:", exc_info=True)
             raise
 
-    def update_task_status(self, task_url, status, message=None, error=None, transferred_files=None):
+    def _apply_task_status(self, task, status, message=None, error=None, transferred_files=None, metrics=None):
+        """按状态转换规则修改任务字段，调用方需在 task_mutation 内调用"""
+        # 状态转换逻辑
+        if message and ('成功' in message or '没有新文件需要转存' in message):
+            task['status'] = 'normal'
+        elif status in ['success', 'skipped', 'pending', 'running']:
+            task['status'] = 'normal'
+        else:
+            task['status'] = 'error'
+                
+        if message:
+            task['message'] = message
+        if error:
+            task['error'] = error
+            task['status'] = 'error'  # 如果有错误信息，强制设置为错误状态
+        elif status == 'error' and message:
+            task['error'] = message
+        if transferred_files:
+            task['transferred_files'] = transferred_files
+        if metrics:
+            task['last_run_metrics'] = metrics
+            
+        # 添加最后执行时间
+        task['last_execute_time'] = int(time.time())
+
+    def update_task_status(self, task_url, status, message=None, error=None, transferred_files=None, metrics=None):
         """更新任务状态
         Args:
             task_url: 任务URL
@@ -1646,35 +2147,15 @@ class BaiduStorage:
             message: 状态消息
             error: 错误信息（如果有）
             transferred_files: 成功转存的文件列表
+            metrics: transfer_share 返回的执行统计，保存为任务的 last_run_metrics
         """
         try:
-            tasks = self.config['baidu']['tasks']
-            for task in tasks:
-                if task['url'] == task_url:
-                    # 状态转换逻辑
-                    if message and ('成功' in message or '没有新文件需要转存' in message):
-                        task['status'] = 'normal'
-                    elif status in ['success', 'skipped', 'pending', 'running']:
-                        task['status'] = 'normal'
-                    else:
-                        task['status'] = 'error'
-                        
-                    if message:
-                        task['message'] = message
-                    if error:
-                        task['error'] = error
-                        task['status'] = 'error'  # 如果有错误信息，强制设置为错误状态
-                    elif status == 'error' and message:
-                        task['error'] = message
-                    if transferred_files:
-                        task['transferred_files'] = transferred_files
-                    
-                    # 添加最后执行时间
-                    task['last_execute_time'] = int(time.time())
-                    
-                    self._save_config()
-                    logger.info(f"已更新任务状态: {task_url} -> {task['status']} ({message})")
-                    return True
+            task = self.get_task_by_url(task_url)
+            if task is not None:
+                with self.task_mutation(task) as draft:
+                    self._apply_task_status(draft, status, message, error, transferred_files, metrics)
+                logger.info(f"已更新任务状态: {task_url} -> {task['status']} ({message})")
+                return True
             return False
         except Exception as e:
             logger.error(f"更新任务状态失败: {str(e)}")
@@ -1892,7 +2373,7 @@ class BaiduStorage:
             
             # 验证cookies是否可用
             try:
-                temp_api = BaiduPCSApi(cookies=cookies_dict)
+                temp_api = self._create_api(cookies_dict)
                 user_info = temp_api.user_info()
                 if not user_info:
                     raise ValueError("Cookies无效")
@@ -1900,19 +2381,20 @@ class BaiduStorage:
                 raise ValueError(f"验证cookies失败: {str(e)}")
             
             # 更新用户信息
-            self.config['baidu']['users'][username].update({
-                'cookies': cookies,
-                'name': username,
-                'user_id': username
-            })
+            with self._lock:
+                self.config['baidu']['users'][username].update({
+                    'cookies': cookies,
+                    'name': username,
+                    'user_id': username
+                })
             
             self._save_config()
             
             # 如果更新的是当前用户,重新初始化客户端
             if username == self.config['baidu']['current_user']:
-                self._init_client()
-                # 清除用户信息缓存
+                # 先清除用户信息缓存，cookies 无效导致初始化提前返回时也不再使用旧的信息
                 self._clear_user_info_cache()
+                self._init_client()
             
             logger.success(f"更新用户成功: {username}")
             return True
@@ -1950,12 +2432,13 @@ class BaiduStorage:
     def update_task(self, index, task_data):
         """更新任务信息"""
         try:
-            tasks = self.config['baidu']['tasks']
+            tasks = self.list_tasks()
             if not (0 <= index < len(tasks)):
                 raise ValueError("任务索引无效")
+            task = tasks[index]
             
             # 保存旧任务配置用于比较
-            old_task = tasks[index].copy()
+            old_task = task.copy()
             
             # 验证和清理数据
             url = task_data.get('url', '').strip()
@@ -1969,43 +2452,45 @@ class BaiduStorage:
             if not re.match(r'^https?://pan\.baidu\.com/s/[a-zA-Z0-9_-]+(\?pwd=[a-zA-Z0-9]+)?$', url):
                 raise ValueError("无效的百度网盘分享链接格式")
             
-            # 更新任务信息
-            tasks[index].update({
-                'name': task_data.get('name', '').strip() or old_task.get('name', ''),
-                'url': url,
-                'save_dir': task_data.get('save_dir', '').strip() or old_task.get('save_dir', ''),
-                'pwd': task_data.get('pwd') if task_data.get('pwd') is not None else old_task.get('pwd'),
-                'status': 'pending',  # 重置任务状态
-                'last_update': int(time.time())  # 添加更新时间戳
-            })
-            
-            # 处理分类字段
-            if 'category' in task_data:
-                category = task_data['category'].strip()
-                if category:  # 如果有新分类
-                    tasks[index]['category'] = category
-                else:  # 如果分类为空，删除分类字段
-                    tasks[index].pop('category', None)
-            
-            # 处理cron字段
-            new_cron = task_data.get('cron')
-            if new_cron is not None:
-                if isinstance(new_cron, str) and new_cron.strip():
-                    tasks[index]['cron'] = new_cron.strip()
-                else:
-                    # 如果新cron为空或无效,删除cron字段
-                    tasks[index].pop('cron', None)
+            with self._get_task_lock(task), self._save_lock:
+                with self._lock:
+                    # 更新任务信息
+                    task.update({
+                        'name': task_data.get('name', '').strip() or old_task.get('name', ''),
+                        'url': url,
+                        'save_dir': task_data.get('save_dir', '').strip() or old_task.get('save_dir', ''),
+                        'pwd': task_data.get('pwd') if task_data.get('pwd') is not None else old_task.get('pwd'),
+                        'status': 'pending',  # 重置任务状态
+                        'last_update': int(time.time())  # 添加更新时间戳
+                    })
+            
+                    # 处理分类字段
+                    if 'category' in task_data:
+                        category = task_data['category'].strip()
+                        if category:  # 如果有新分类
+                            task['category'] = category
+                        else:  # 如果分类为空，删除分类字段
+                            task.pop('category', None)
+            
+                    # 处理cron字段
+                    new_cron = task_data.get('cron')
+                    if new_cron is not None:
+                        if isinstance(new_cron, str) and new_cron.strip():
+                            task['cron'] = new_cron.strip()
+                        else:
+                            # 如果新cron为空或无效,删除cron字段
+                            task.pop('cron', None)
             
-            # 保存配置并更新调度器
-            self._save_config()
+                self._save_config(update_scheduler=False)
             
-            # 更新调度器
+            # 释放任务锁和 _save_lock 后再更新调度器
+            self._update_scheduler()
             from scheduler import TaskScheduler
             if hasattr(TaskScheduler, 'instance') and TaskScheduler.instance:
-                TaskScheduler.instance.update_task_schedule(url, tasks[index].get('cron'))
+                TaskScheduler.instance.update_task_schedule(url, task.get('cron'))
                 logger.info(f"已更新任务调度: {url}")
             
-            logger.success(f"更新任务成功: {tasks[index]}")
+            logger.success(f"更新任务成功: {task}")
             return True, True  # 第二个True表示调度器已更新
             
         except Exception as e:
@@ -2036,12 +2521,8 @@ class BaiduStorage:
         """
         try:
             tasks = self.config['baidu'].get('tasks', [])
-            if category is None:
-                # 返回未分类的任务
-                return [task for task in tasks if 'category' not in task]
-            else:
-                # 返回指定分类的任务
-                return [task for task in tasks if task.get('category') == category]
+            # 未分类：没有 category 字段或分类为空（与任务快照、SQLite 后端的规则一致）
+            return [task for task in tasks if (task.get('category') or None) == (category or None)]
         except Exception as e:
             logger.error(f"获取分类任务失败: {str(e)}")
             return []
@@ -2057,23 +2538,29 @@ class BaiduStorage:
             if not orders:
                 return 0
             
-            tasks = self.config['baidu']['tasks']
-            original_count = len(tasks)
-            
-            # 使用列表推导式过滤掉要删除的任务
-            self.config['baidu']['tasks'] = [
-                task for task in tasks 
-                if task.get('order') not in orders
-            ]
-            
-            # 计算实际删除的任务数
-            deleted_count = original_count - len(self.config['baidu']['tasks'])
+            orders = set(orders)
             
+            with self._save_lock:
+                with self._lock:
+                    tasks = self.config['baidu']['tasks']
+                    original_count = len(tasks)
+                    
+                    # 使用列表推导式过滤掉要删除的任务
+                    self.config['baidu']['tasks'] = [
+                        task for task in tasks 
+                        if task.get('order') not in orders
+                    ]
+                    
+                    # 计算实际删除的任务数
+                    deleted_count = original_count - len(self.config['baidu']['tasks'])
+                
+                if deleted_count > 0:
+                    self._save_config(update_scheduler=False)
+                    # 重新整理剩余任务的顺序
+                    self._update_task_orders(update_scheduler=False)
             if deleted_count > 0:
-                # 保存配置并更新调度器
-                self._save_config(update_scheduler=True)
-                # 重新整理剩余任务的顺序
-                self._update_task_orders()
+                # 释放 _save_lock 后再更新调度器
+                self._update_scheduler()
                 logger.success(f"批量删除任务成功: 删除了{deleted_count}个任务")
             
             return deleted_count
@@ -2082,7 +2569,7 @@ class BaiduStorage:
             logger.error(f"批量删除任务失败: {str(e)}")
             raise
 
-    def update_task_status_by_order(self, order, status, message=None, error=None, transferred_files=None):
+    def update_task_status_by_order(self, order, status, message=None, error=None, transferred_files=None, metrics=None):
         """基于order更新任务状态
         Args:
             order: 任务顺序号
@@ -2090,35 +2577,15 @@ class BaiduStorage:
             message: 状态消息
             error: 错误信息（如果有）
             transferred_files: 成功转存的文件列表
+            metrics: transfer_share 返回的执行统计，保存为任务的 last_run_metrics
         """
         try:
-            tasks = self.config['baidu']['tasks']
-            for task in tasks:
-                if task.get('order') == order:
-                    # 状态转换逻辑
-                    if message and ('成功' in message or '没有新文件需要转存' in message):
-                        task['status'] = 'normal'
-                    elif status in ['success', 'skipped', 'pending', 'running']:
-                        task['status'] = 'normal'
-                    else:
-                        task['status'] = 'error'
-                        
-                    if message:
-                        task['message'] = message
-                    if error:
-                        task['error'] = error
-                        task['status'] = 'error'  # 如果有错误信息，强制设置为错误状态
-                    elif status == 'error' and message:
-                        task['error'] = message
-                    if transferred_files:
-                        task['transferred_files'] = transferred_files
-                    
-                    # 添加最后执行时间
-                    task['last_execute_time'] = int(time.time())
-                    
-                    self._save_config()
-                    logger.info(f"已更新任务状态: order={order} -> {task['status']} ({message})")
-                    return True
+            task = self.get_task_by_order(order)
+            if task is not None:
+                with self.task_mutation(task) as draft:
+                    self._apply_task_status(draft, status, message, error, transferred_files, metrics)
+                logger.info(f"已更新任务状态: order={order} -> {task['status']} ({message})")
+                return True
             return False
         except Exception as e:
             logger.error(f"更新任务状态失败: {str(e)}")
@@ -2132,18 +2599,21 @@ class BaiduStorage:
             bool: 是否删除成功
         """
         try:
-            tasks = self.config['baidu']['tasks']
-            for i, task in enumerate(tasks):
-                if task.get('order') == order:
-                    tasks.pop(i)
-                    # 确保更新调度器
-                    self._save_config(update_scheduler=True)
-                    # 重新整理剩余任务的顺序
-                    self._update_task_orders()
-                    logger.success(f"删除任务成功: order={order}")
-                    return True
-            logger.warning(f"未找到任务: order={order}")
-            return False
+            with self._save_lock:
+                with self._lock:
+                    task = self.get_task_by_order(order)
+                    if task is not None:
+                        self._remove_task_locked(task)
+                if task is None:
+                    logger.warning(f"未找到任务: order={order}")
+                    return False
+                self._save_config(update_scheduler=False)
+                # 重新整理剩余任务的顺序
+                self._update_task_orders(update_scheduler=False)
+            # 释放 _save_lock 后再更新调度器
+            self._update_scheduler()
+            logger.success(f"删除任务成功: order={order}")
+            return True
         except Exception as e:
             logger.error(f"删除任务失败: {str(e)}")
             return False
@@ -2157,18 +2627,12 @@ class BaiduStorage:
             bool: 是否更新成功
         """
         try:
-            tasks = self.config['baidu']['tasks']
-            task_index = None
-            for i, task in enumerate(tasks):
-                if task.get('order') == order:
-                    task_index = i
-                    break
-                    
-            if task_index is None:
+            task = self.get_task_by_order(order)
+            if task is None:
                 raise ValueError(f"未找到任务: order={order}")
             
             # 保存旧任务配置用于比较
-            old_task = tasks[task_index].copy()
+            old_task = task.copy()
             
             # 验证和清理数据
             url = task_data.get('url', '').strip()
@@ -2182,57 +2646,59 @@ class BaiduStorage:
             if not re.match(r'^https?://pan\.baidu\.com/s/[a-zA-Z0-9_-]+(\?pwd=[a-zA-Z0-9]+)?$', url):
                 raise ValueError("无效的百度网盘分享链接格式")
             
-            # 更新任务信息
-            tasks[task_index].update({
-                'name': task_data.get('name', '').strip() or old_task.get('name', ''),
-                'url': url,
-                'save_dir': task_data.get('save_dir', '').strip() or old_task.get('save_dir', ''),
-                'pwd': task_data.get('pwd') if task_data.get('pwd') is not None else old_task.get('pwd'),
-                'status': task_data.get('status', old_task.get('status', 'normal')),  # 保持原有状态
-                'message': task_data.get('message', old_task.get('message', '')),  # 保持原有消息
-                'last_update': int(time.time())  # 添加更新时间戳
-            })
-            
-            # 处理分类字段
-            if 'category' in task_data:
-                category = task_data['category'].strip()
-                if category:  # 如果有新分类
-                    tasks[task_index]['category'] = category
-                else:  # 如果分类为空，删除分类字段
-                    tasks[task_index].pop('category', None)
-            
-            # 处理cron字段
-            new_cron = task_data.get('cron')
-            if new_cron is not None:
-                if isinstance(new_cron, str) and new_cron.strip():
-                    tasks[task_index]['cron'] = new_cron.strip()
-                else:
-                    # 如果新cron为空或无效,删除cron字段
-                    tasks[task_index].pop('cron', None)
-            
-            # 处理正则表达式字段
-            if 'regex_pattern' in task_data:
-                regex_pattern = task_data['regex_pattern']
-                if regex_pattern and regex_pattern.strip():
-                    tasks[task_index]['regex_pattern'] = regex_pattern.strip()
-                    # 处理替换表达式，可以为空
-                    regex_replace = task_data.get('regex_replace', '')
-                    tasks[task_index]['regex_replace'] = regex_replace.strip() if regex_replace else ''
-                else:
-                    # 如果过滤表达式为空，删除相关字段
-                    tasks[task_index].pop('regex_pattern', None)
-                    tasks[task_index].pop('regex_replace', None)
+            with self._get_task_lock(task), self._save_lock:
+                with self._lock:
+                    # 更新任务信息
+                    task.update({
+                        'name': task_data.get('name', '').strip() or old_task.get('name', ''),
+                        'url': url,
+                        'save_dir': task_data.get('save_dir', '').strip() or old_task.get('save_dir', ''),
+                        'pwd': task_data.get('pwd') if task_data.get('pwd') is not None else old_task.get('pwd'),
+                        'status': task_data.get('status', old_task.get('status', 'normal')),  # 保持原有状态
+                        'message': task_data.get('message', old_task.get('message', '')),  # 保持原有消息
+                        'last_update': int(time.time())  # 添加更新时间戳
+                    })
+            
+                    # 处理分类字段
+                    if 'category' in task_data:
+                        category = task_data['category'].strip()
+                        if category:  # 如果有新分类
+                            task['category'] = category
+                        else:  # 如果分类为空，删除分类字段
+                            task.pop('category', None)
+            
+                    # 处理cron字段
+                    new_cron = task_data.get('cron')
+                    if new_cron is not None:
+                        if isinstance(new_cron, str) and new_cron.strip():
+                            task['cron'] = new_cron.strip()
+                        else:
+                            # 如果新cron为空或无效,删除cron字段
+                            task.pop('cron', None)
+            
+                    # 处理正则表达式字段
+                    if 'regex_pattern' in task_data:
+                        regex_pattern = task_data['regex_pattern']
+                        if regex_pattern and regex_pattern.strip():
+                            task['regex_pattern'] = regex_pattern.strip()
+                            # 处理替换表达式，可以为空
+                            regex_replace = task_data.get('regex_replace', '')
+                            task['regex_replace'] = regex_replace.strip() if regex_replace else ''
+                        else:
+                            # 如果过滤表达式为空，删除相关字段
+                            task.pop('regex_pattern', None)
+                            task.pop('regex_replace', None)
             
-            # 保存配置并更新调度器
-            self._save_config()
+                self._save_config(update_scheduler=False)
             
-            # 更新调度器
+            # 释放任务锁和 _save_lock 后再更新调度器
+            self._update_scheduler()
             from scheduler import TaskScheduler
             if hasattr(TaskScheduler, 'instance') and TaskScheduler.instance:
-                TaskScheduler.instance.update_task_schedule(url, tasks[task_index].get('cron'))
+                TaskScheduler.instance.update_task_schedule(url, task.get('cron'))
                 logger.info(f"已更新任务调度: {url}")
             
-            logger.success(f"更新任务成功: {tasks[task_index]}")
+            logger.success(f"更新任务成功: {task}")
             return True
             
         except Exception as e:
@@ -2331,12 +2797,11 @@ class BaiduStorage:
             share_info: 分享信息字典
         """
         try:
-            tasks = self.list_tasks()
-            for task in tasks:
-                if task.get('order') == task_order:
-                    task['share_info'] = share_info
-                    self._save_config()
-                    return True
+            task = self.get_task_by_order(task_order)
+            if task is not None:
+                with self.task_mutation(task) as draft:
+                    draft['share_info'] = share_info
+                return True
             return False
         except Exception as e:
             logger.error(f"更新任务分享信息失败: {str(e)}")
@@ -0,0 +1,75 @@
+"""测试公共夹具
+
+存储使用相对路径 config/config.json，每个测试切换到独立的临时目录，
+写入一份不含账号的最小配置，网盘客户端不会真正初始化。
+"""
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_task(order, **fields):
+    task = {
+        'url': f'https://pan.baidu.com/s/t{order}',
+        'save_dir': '/test',
+        'name': f'任务{order}',
+        'status': 'normal',
+        'order': order,
+    }
+    task.update(fields)
+    return task
+
+
+def make_config(tasks):
+    return {
+        'baidu': {'users': {}, 'current_user': None, 'tasks': tasks},
+        'cron': {'default_schedule': []},
+        'notify': {},
+        'auth': {'users': 'admin', 'password': 'password', 'session_timeout': 3600},
+    }
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """切换到临时目录并使用 json 后端"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('CONFIG_BACKEND', 'json')
+    (tmp_path / 'config').mkdir()
+    return tmp_path
+
+
+@pytest.fixture
+def write_config(workdir):
+    """写入 config/config.json，默认包含3个任务"""
+    def write(tasks=None):
+        if tasks is None:
+            tasks = [make_task(order) for order in (1, 2, 3)]
+        path = workdir / 'config' / 'config.json'
+        path.write_text(json.dumps(make_config(tasks), ensure_ascii=False), encoding='utf-8')
+        return path
+    return write
+
+
+@pytest.fixture
+def storage(write_config):
+    from storage import BaiduStorage
+    write_config()
+    return BaiduStorage(lazy_client=True)
+
+
+@pytest.fixture
+def client(storage, monkeypatch):
+    """已登录的 Flask 测试客户端，web_app 使用上面的 storage，不启动调度器"""
+    from types import SimpleNamespace
+    import web_app
+    from schedule_stats import ScheduleStats
+    monkeypatch.setattr(web_app, 'storage', storage)
+    monkeypatch.setattr(web_app, 'scheduler', SimpleNamespace(schedule_stats=ScheduleStats()))
+    client = web_app.app.test_client()
+    response = client.post('/api/auth/login', json={'username': 'admin', 'password': 'password'})
+    assert response.get_json()['success']
+    return client
@@ -0,0 +1,110 @@
+"""配置存储后端：SQLite 迁移、表结构升级与单任务写入"""
+import json
+import sqlite3
+
+import pytest
+
+from config_store import JsonConfigStore, SqliteConfigStore, create_config_store
+from conftest import make_config, make_task
+
+
+@pytest.fixture
+def sqlite_env(workdir, monkeypatch):
+    monkeypatch.setenv('CONFIG_BACKEND', 'sqlite')
+    monkeypatch.setenv('CONFIG_DB_PATH', str(workdir / 'config' / 'config.db'))
+    return workdir
+
+
+def test_create_config_store_by_env(sqlite_env, monkeypatch):
+    store = create_config_store()
+    assert isinstance(store, SqliteConfigStore)
+    store.close()
+    monkeypatch.setenv('CONFIG_BACKEND', 'unknown')
+    assert isinstance(create_config_store(), JsonConfigStore)
+
+
+def test_migrate_from_json_round_trip(sqlite_env, write_config):
+    json_path = write_config([make_task(1, category='电影'), make_task(2), make_task(3, category='剧集')])
+    expected = json.loads(json_path.read_text(encoding='utf-8'))
+
+    store = create_config_store()
+    assert store.exists()
+    assert store.load() == expected
+    store.close()
+
+    # 原文件改名备份，之后只从数据库加载
+    assert not json_path.exists()
+    assert list((sqlite_env / 'config').glob('config.json.migrated.*'))
+    store = create_config_store()
+    assert store.load() == expected
+    store.close()
+
+
+def test_save_task_updates_single_row(sqlite_env, write_config):
+    write_config()
+    store = create_config_store()
+    config = store.load()
+    task = config['baidu']['tasks'][1]
+    task['status'] = 'error'
+    task['category'] = '电影'
+    store.save_task(task)
+    store.close()
+
+    store = create_config_store()
+    tasks = store.load()['baidu']['tasks']
+    assert [t['order'] for t in tasks] == [1, 2, 3]
+    assert tasks[1]['status'] == 'error'
+    assert tasks[1]['category'] == '电影'
+    store.close()
+
+
+def test_save_keeps_duplicate_and_missing_orders(sqlite_env):
+    store = create_config_store()
+    tasks = [make_task(2), make_task(2, url='https://pan.baidu.com/s/dup'), make_task(None)]
+    store.save(make_config(tasks))
+    assert store.load()['baidu']['tasks'] == tasks
+    store.close()
+
+
+def test_upgrade_old_schema(sqlite_env):
+    db_path = sqlite_env / 'config' / 'config.db'
+    conn = sqlite3.connect(db_path)
+    conn.executescript('''
+        CREATE TABLE settings (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        CREATE TABLE tasks (task_order INTEGER PRIMARY KEY, url TEXT NOT NULL, category TEXT, data TEXT NOT NULL);
+        CREATE INDEX idx_tasks_category ON tasks(category);
+    ''')
+    config = make_config([])
+    for key, value in config.items():
+        if key == 'baidu':
+            value = {k: v for k, v in value.items() if k != 'tasks'}
+        conn.execute('INSERT INTO settings VALUES (?, ?)', (key, json.dumps(value)))
+    for order in (3, 1, 2):
+        task = make_task(order)
+        conn.execute('INSERT INTO tasks VALUES (?, ?, ?, ?)', (order, task['url'], None, json.dumps(task)))
+    conn.commit()
+    conn.close()
+
+    store = create_config_store()
+    assert [t['order'] for t in store.load()['baidu']['tasks']] == [1, 2, 3]
+    columns = [row[1] for row in store._conn.execute('PRAGMA table_info(tasks)')]
+    assert columns[0] == 'id'
+    store.close()
+
+
+def test_storage_repairs_duplicate_orders(sqlite_env, write_config):
+    from storage import BaiduStorage
+    write_config([make_task(2, url='https://pan.baidu.com/s/a'), make_task(2, url='https://pan.baidu.com/s/b'),
+                  make_task(None, url='https://pan.baidu.com/s/c'), make_task(1, url='https://pan.baidu.com/s/d')])
+    storage = BaiduStorage(lazy_client=True)
+    orders = sorted((t['order'], t['url'][-1]) for t in storage.list_tasks())
+    assert orders == [(1, 'd'), (2, 'a'), (3, 'b'), (4, 'c')]
+    assert storage.update_task_status_by_order(3, 'error', 'x')
+    storage._store.close()
+
+    # 重新编号和单任务更新都已写入数据库
+    storage = BaiduStorage(lazy_client=True)
+    assert storage.get_task_by_order(3)['url'].endswith('/b')
+    assert storage.get_task_by_order(3)['status'] == 'error'
+    assert storage.get_task_by_order(2)['status'] == 'normal'
+    storage._store.close()
@@ -0,0 +1,51 @@
+"""事件中心：按 Last-Event-ID 增量读取与 SSE 编码"""
+from events import EventBroker, format_sse
+
+
+def publish(broker, count):
+    return [broker.publish('task', {'i': i}) for i in range(count)]
+
+
+def test_since_returns_later_events():
+    broker = EventBroker(maxlen=10)
+    ids = publish(broker, 5)
+    assert ids == [1, 2, 3, 4, 5]
+    events, missed = broker.since(2)
+    assert [event.id for event in events] == [3, 4, 5]
+    assert [event.data['i'] for event in events] == [2, 3, 4]
+    assert not missed
+    assert broker.since(5) == ([], False)
+
+
+def test_since_from_start():
+    broker = EventBroker(maxlen=10)
+    assert broker.since(0) == ([], False)
+    publish(broker, 3)
+    events, missed = broker.since(0)
+    assert [event.id for event in events] == [1, 2, 3]
+    assert not missed
+
+
+def test_since_missed_cursor():
+    broker = EventBroker(maxlen=3)
+    publish(broker, 6)
+    # 4 之前的事件已被挤出缓冲区
+    events, missed = broker.since(1)
+    assert missed
+    assert [event.id for event in events] == [4, 5, 6]
+    # 刚好接上缓冲区第一条时没有遗漏
+    events, missed = broker.since(3)
+    assert not missed
+    assert [event.id for event in events] == [4, 5, 6]
+
+
+def test_since_after_restart():
+    broker = EventBroker(maxlen=3)
+    publish(broker, 2)
+    # 服务重启后客户端持有的 id 比当前的大
+    assert broker.since(100) == ([], True)
+
+
+def test_format_sse():
+    assert format_sse('task', {'name': '任务'}, event_id=7) == 'id: 7\nevent: task\ndata: {"name": "任务"}\n\n'
+    assert format_sse('ping', None) == 'event: ping\ndata: null\n\n'
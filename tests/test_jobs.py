@@ -0,0 +1,120 @@
+"""批量作业：执行结果汇总、取消与已结束作业的清理"""
+import threading
+
+import pytest
+
+import jobs
+from jobs import JobManager
+
+
+class Recorder:
+    """记录结束的作业，供测试等待"""
+
+    def __init__(self):
+        self.finished = []
+        self._cond = threading.Condition()
+
+    def __call__(self, job):
+        with self._cond:
+            self.finished.append(job)
+            self._cond.notify_all()
+
+    def wait(self, count, timeout=5):
+        with self._cond:
+            assert self._cond.wait_for(lambda: len(self.finished) >= count, timeout)
+
+
+@pytest.fixture
+def make_manager():
+    managers = []
+
+    def make(run_task, max_workers=1):
+        recorder = Recorder()
+        manager = JobManager(run_task, on_finished=recorder, max_workers=max_workers)
+        managers.append(manager)
+        return manager, recorder
+    yield make
+    for manager in managers:
+        manager.shutdown()
+
+
+def test_job_collects_results(make_manager):
+    def run_task(order, job):
+        if order == 2:
+            raise RuntimeError('boom')
+        task = {'order': order, 'url': f'u{order}'}
+        if order == 3:
+            return {'status': 'skipped', 'task': task}
+        return {'status': 'success', 'task': task, 'transferred_files': ['a.mp4']}
+
+    manager, recorder = make_manager(run_task, max_workers=2)
+    job = manager.submit([1, 2, 3], names={1: '任务1'})
+    recorder.wait(1)
+
+    summary = job.to_dict()
+    assert summary['status'] == 'completed'
+    assert summary['counts'] == {'success': 1, 'failed': 1, 'skipped': 1}
+    assert summary['tasks'][0]['name'] == '任务1'
+    assert summary['tasks'][1]['message'] == 'boom'
+    assert [task['order'] for task in job.results['success']] == [1]
+    assert job.results['transferred_files'] == {'u1': ['a.mp4']}
+
+
+def test_empty_job_completes_immediately(make_manager):
+    manager, recorder = make_manager(lambda order, job: {'status': 'success'})
+    job = manager.submit([])
+    assert recorder.finished == [job]
+    assert job.status == 'completed'
+
+
+def test_cancel_skips_queued_tasks(make_manager):
+    started = threading.Event()
+    release = threading.Event()
+    executed = []
+
+    def run_task(order, job):
+        executed.append(order)
+        started.set()
+        release.wait(5)
+        return {'status': 'success'}
+
+    manager, recorder = make_manager(run_task, max_workers=1)
+    job = manager.submit([1, 2, 3])
+    assert started.wait(5)
+    assert manager.cancel(job.id)
+    release.set()
+    recorder.wait(1)
+
+    # 正在执行的任务正常结束，排队中的任务不再执行
+    assert executed == [1]
+    assert job.status == 'cancelled'
+    assert [item['status'] for item in job.to_dict()['tasks']] == ['success', 'cancelled', 'cancelled']
+    assert recorder.finished == [job]
+    # 已结束或不存在的作业不能再取消
+    assert not manager.cancel(job.id)
+    assert not manager.cancel('missing')
+
+
+def test_prune_keeps_recent_finished_jobs(make_manager, monkeypatch):
+    monkeypatch.setattr(jobs, 'MAX_FINISHED_JOBS', 2)
+    release = threading.Event()
+
+    def run_task(order, job):
+        if order == 0:
+            release.wait(5)
+        return {'status': 'success'}
+
+    manager, recorder = make_manager(run_task, max_workers=2)
+    running = manager.submit([0])
+    finished = []
+    for i in range(4):
+        finished.append(manager.submit([i + 1]))
+        recorder.wait(i + 1)
+    manager.submit([])
+
+    job_ids = [job.id for job in manager.list_jobs()]
+    # 进行中的作业不会被清理，已结束的只保留最近的
+    assert running.id in job_ids
+    assert [job.id in job_ids for job in finished] == [False, False, True, True]
+    assert manager.get(finished[0].id) is None
+    release.set()
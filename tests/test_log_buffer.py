@@ -0,0 +1,84 @@
+"""任务日志缓冲区：行数上限、闲置清理、任务数上限与执行编号"""
+from log_buffer import TaskLogStore
+
+
+def test_append_requires_reset():
+    store = TaskLogStore()
+    assert store.append(1, 'INFO', 'ignored') is None
+    assert store.get(1) == []
+    assert store.get_run(1) == (None, [])
+
+
+def test_max_lines_keeps_latest():
+    store = TaskLogStore(max_lines=3)
+    store.reset(1)
+    for i in range(5):
+        store.append(1, 'INFO', f'line {i}')
+    assert [entry['message'] for entry in store.get(1)] == ['line 2', 'line 3', 'line 4']
+
+
+def test_evict_expired_skips_running_tasks():
+    store = TaskLogStore(ttl=0)
+    store.reset(1)
+    store.append(1, 'INFO', 'done')
+    store.finish(1)
+    store.reset(2)
+    store.append(2, 'INFO', 'running')
+
+    assert store.evict_expired() == 1
+    assert store.get(1) == []
+    assert [entry['message'] for entry in store.get(2)] == ['running']
+    store.finish(2)
+    assert store.evict_expired() == 1
+    assert store.get(2) == []
+
+
+def test_evict_expired_keeps_recent():
+    store = TaskLogStore(ttl=3600)
+    store.reset(1)
+    store.finish(1)
+    assert store.evict_expired() == 0
+    assert store.get_run(1)[0] is not None
+
+
+def test_max_tasks_evicts_least_recently_written():
+    store = TaskLogStore(max_tasks=2)
+    for order in (1, 2):
+        store.reset(order)
+        store.append(order, 'INFO', f'task {order}')
+        store.finish(order)
+    store.append(1, 'INFO', 'again')
+    store.reset(3)
+
+    assert store.get(2) == []
+    assert len(store.get(1)) == 2
+    assert store.get_run(3)[0] is not None
+
+
+def test_max_tasks_keeps_running_tasks():
+    store = TaskLogStore(max_tasks=1)
+    store.reset(1)
+    store.reset(2)
+    # 两个任务都在执行，暂时超出上限
+    assert store.get_run(1)[0] is not None
+    store.finish(1)
+    store.reset(3)
+    assert store.get_run(1) == (None, [])
+    assert store.get_run(2)[0] is not None
+
+
+def test_run_changes_on_reset():
+    store = TaskLogStore()
+    store.reset(1)
+    first = store.append(1, 'INFO', 'first run')
+    run, logs = store.get_run(1)
+    assert logs == [first]
+    store.finish(1)
+
+    store.reset(1)
+    second = store.append(1, 'INFO', 'second run')
+    new_run, logs = store.get_run(1)
+    # seq 连续也能通过执行编号识别出重新执行
+    assert second['seq'] == first['seq'] + 1
+    assert new_run != run
+    assert logs == [second]
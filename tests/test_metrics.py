@@ -0,0 +1,82 @@
+"""Prometheus 指标：文本格式输出与 /metrics 访问控制"""
+import pytest
+
+import metrics
+from metrics import Counter, Gauge, Histogram, Registry, error_code
+
+
+def render(metric):
+    registry = Registry()
+    registry.register(metric)
+    return registry.render()
+
+
+def test_counter_with_labels():
+    counter = Counter('test_total', '测试', ['outcome'])
+    counter.inc(outcome='success')
+    counter.inc(2, outcome='success')
+    counter.inc(outcome='fail"ed')
+    assert render(counter) == (
+        '# HELP test_total 测试\n'
+        '# TYPE test_total counter\n'
+        'test_total{outcome="success"} 3\n'
+        'test_total{outcome="fail\\"ed"} 1\n'
+    )
+    with pytest.raises(ValueError):
+        counter.inc(other='x')
+
+
+def test_gauge_function():
+    gauge = Gauge('test_depth', '测试')
+    gauge.set(2)
+    assert 'test_depth 2\n' in render(gauge)
+    gauge.set_function(lambda: 5)
+    assert 'test_depth 5\n' in render(gauge)
+    gauge.set_function(lambda: 1 / 0)
+    assert render(gauge).endswith('# TYPE test_depth gauge\n')
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram('test_seconds', '测试', buckets=(1, 5))
+    for value in (0.5, 1, 3, 10):
+        histogram.observe(value)
+    lines = render(histogram).splitlines()[2:]
+    assert lines == [
+        'test_seconds_bucket{le="1"} 2',
+        'test_seconds_bucket{le="5"} 3',
+        'test_seconds_bucket{le="+Inf"} 4',
+        'test_seconds_sum 14.5',
+        'test_seconds_count 4',
+    ]
+
+
+def test_registry_rejects_invalid_and_duplicate_names():
+    registry = Registry()
+    registry.register(Counter('a_total', 'a'))
+    with pytest.raises(ValueError):
+        registry.register(Counter('a_total', 'a'))
+    with pytest.raises(ValueError):
+        registry.register(Counter('bad-name', 'a'))
+
+
+def test_error_code():
+    assert error_code(None) == 'none'
+    assert error_code(Exception('error_code: -65, message: 频率限制')) == '-65'
+    assert error_code(Exception('errno: 2')) == '2'
+    assert error_code(Exception('timeout')) == 'unknown'
+
+
+def test_metrics_endpoint_requires_token_or_login(client, monkeypatch):
+    import web_app
+    anonymous = web_app.app.test_client()
+    monkeypatch.delenv('METRICS_TOKEN', raising=False)
+    assert anonymous.get('/metrics').status_code == 401
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type == metrics.CONTENT_TYPE
+    assert '# TYPE baidu_autosave_task_runs_total counter' in response.get_data(as_text=True)
+
+    monkeypatch.setenv('METRICS_TOKEN', 'secret')
+    assert anonymous.get('/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    assert anonymous.get('/metrics', headers={'Authorization': 'Bearer secret'}).status_code == 200
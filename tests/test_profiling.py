@@ -0,0 +1,98 @@
+"""任务剖析：cProfile / 采样报告、定时执行剖析与报告数上限"""
+import marshal
+import threading
+import time
+
+import pytest
+
+from profiling import TaskProfiler
+
+
+def busy_work(seconds=0.05):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(100))
+    return total
+
+
+def wait_report(profiler, report_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        report = profiler.get(report_id)
+        if report['status'] != 'running':
+            return report
+        time.sleep(0.01)
+    raise AssertionError(f'剖析报告 {report_id} 未完成')
+
+
+def test_cprofile_report():
+    profiler = TaskProfiler()
+    report_id = profiler.start(busy_work, task_order=3, sort='tottime', limit=5)
+    report = wait_report(profiler, report_id)
+
+    assert report['status'] == 'done'
+    assert report['task_order'] == 3
+    assert report['trigger'] == 'manual'
+    assert 'busy_work' in report['report']
+    stats = marshal.loads(report['raw'])
+    assert any(func[2] == 'busy_work' for func in stats)
+    assert 'report' not in profiler.list()[0]
+
+
+def test_sampling_report():
+    profiler = TaskProfiler()
+    report_id = profiler.start(busy_work, 0.1, mode='sampling', interval=0.001)
+    report = wait_report(profiler, report_id)
+
+    assert report['status'] == 'done'
+    assert report['samples'] > 0
+    assert 'busy_work' in report['report']
+
+
+def test_only_one_profile_at_a_time():
+    profiler = TaskProfiler()
+    release = threading.Event()
+    report_id = profiler.start(release.wait, 5)
+    assert profiler.start(busy_work) is None
+    release.set()
+    assert wait_report(profiler, report_id)['status'] == 'done'
+    # 报告完成后剖析线程才释放占用
+    deadline = time.monotonic() + 5
+    while profiler.start(busy_work) is None:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_failed_run_is_recorded():
+    profiler = TaskProfiler()
+    report_id = profiler.start(lambda: 1 / 0)
+    report = wait_report(profiler, report_id)
+    assert report['status'] == 'error'
+    assert 'division by zero' in report['error']
+
+
+def test_run_if_armed():
+    profiler = TaskProfiler()
+    assert profiler.run_if_armed(busy_work, 0.01, task_order=1) > 0
+    assert profiler.list() == []
+
+    profiler.arm(1, mode='cprofile')
+    assert profiler.run_if_armed(busy_work, 0.01, task_order=1) > 0
+    assert profiler.run_if_armed(busy_work, 0.01, task_order=2) > 0
+    reports = profiler.list()
+    assert [(report['task_order'], report['trigger']) for report in reports] == [(1, 'scheduled')]
+    assert profiler.scheduled()['remaining'] == 0
+
+    profiler.arm(1)
+    with pytest.raises(ZeroDivisionError):
+        profiler.run_if_armed(lambda: 1 / 0, task_order=1)
+    assert profiler.list()[0]['status'] == 'error'
+
+
+def test_max_reports():
+    profiler = TaskProfiler(max_reports=2)
+    profiler.arm(3)
+    for order in (1, 2, 3):
+        profiler.run_if_armed(busy_work, 0.001, task_order=order)
+    assert [report['task_order'] for report in profiler.list()] == [3, 2]
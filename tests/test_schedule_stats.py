@@ -0,0 +1,81 @@
+"""调度统计：触发与开始的配对、合并、跳过和版本号"""
+from schedule_stats import ScheduleStats, task_order_from_job_id
+
+
+def test_task_order_from_job_id():
+    assert task_order_from_job_id('task_0') == 1
+    assert task_order_from_job_id('task_4_2') == 5
+    assert task_order_from_job_id('version_check') is None
+    assert task_order_from_job_id(None) is None
+
+
+def test_lag_when_submitted_first():
+    stats = ScheduleStats()
+    stats.submitted('task_0', [100.0])
+    assert stats.pending() == 1
+    stats.started('task_0', 102.5)
+
+    assert stats.pending() == 0
+    task = stats.get(1)
+    assert task['started'] == 1
+    assert task['lag'] == {'last': 2.5, 'avg': 2.5, 'max': 2.5}
+    assert task['recent'][-1]['event'] == 'started'
+
+
+def test_lag_when_started_first():
+    stats = ScheduleStats()
+    # 作业可能在提交事件发出前就开始执行
+    stats.started('task_1', 101.0)
+    stats.submitted('task_1', [100.0])
+    assert stats.pending() == 0
+    assert stats.get(2)['lag']['last'] == 1.0
+
+
+def test_missed_before_and_after_submit():
+    stats = ScheduleStats()
+    stats.submitted('task_0', [100.0])
+    stats.missed('task_0', 100.0)
+    assert stats.pending() == 0
+
+    stats.missed('task_0', 200.0)
+    stats.submitted('task_0', [200.0])
+    assert stats.pending() == 0
+    assert stats.get(1)['skipped'] == {'missed': 2}
+    assert stats.get(1)['started'] == 0
+
+
+def test_coalesced_and_rejected():
+    stats = ScheduleStats()
+    stats.submitted('task_0', [100.0], coalesced=2)
+    stats.rejected('task_0', [200.0])
+    summary = stats.summary()
+    assert summary['fires'] == 4
+    assert summary['coalesced'] == 2
+    assert summary['skipped'] == {'max_instances': 1}
+    assert summary['pending'] == 1
+    assert summary['avg_lag'] is None
+
+
+def test_version_changes_only_with_stats():
+    stats = ScheduleStats()
+    version = stats.version
+    # 未配对的开始事件不改变统计
+    stats.started('task_0', 100.0)
+    assert stats.version == version
+    assert stats.get(1) is None
+
+    stats.submitted('task_0', [99.0])
+    assert stats.version > version
+    version = stats.version
+    stats.skipped('task_0', 'busy')
+    assert stats.version == version + 1
+    assert stats.last_fire('task_0') == 99.0
+
+
+def test_history_is_bounded():
+    stats = ScheduleStats(history_size=3)
+    for i in range(5):
+        stats.skipped('task_0', 'busy')
+    task = stats.get(1)
+    assert len(task['recent']) == 3
+    assert task['skipped'] == {'busy': 5}
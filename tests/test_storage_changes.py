@@ -0,0 +1,98 @@
+"""BaiduStorage 的增量变更（get_task_changes）与任务快照（get_task_snapshot）"""
+import storage as storage_module
+from storage import BaiduStorage
+
+
+def test_changes_since_current_version_is_empty(storage):
+    version = storage.version
+    assert storage.get_task_changes(version) == (version, [])
+
+
+def test_changes_return_only_modified_tasks(storage):
+    since = storage.version
+    storage.update_task_status_by_order(3, 'error', 'x')
+    storage.update_task_status_by_order(2, 'running', 'y')
+    storage.update_task_status_by_order(3, 'success', 'z')
+
+    version, tasks = storage.get_task_changes(since)
+    assert version == storage.version == since + 3
+    assert [task['order'] for task in tasks] == [2, 3]
+    assert tasks[1]['message'] == 'z'
+    # 返回的是副本
+    tasks[0]['message'] = 'changed'
+    assert storage.get_task_by_order(2)['message'] == 'y'
+
+
+def test_structural_change_requires_full_reload(storage):
+    since = storage.version
+    storage.update_task_status_by_order(1, 'error', 'x')
+    assert storage.add_task('https://pan.baidu.com/s/new', '/test')
+    version, tasks = storage.get_task_changes(since)
+    assert tasks is None
+    assert version == storage.version
+    # 整体变更之后的版本仍可增量获取
+    storage.update_task_status_by_order(4, 'error', 'x')
+    assert [task['order'] for task in storage.get_task_changes(version)[1]] == [4]
+
+
+def test_unknown_version_requires_full_reload(storage):
+    storage.update_task_status_by_order(1, 'error', 'x')
+    assert storage.get_task_changes(storage.version + 10)[1] is None
+
+
+def test_change_log_overflow_requires_full_reload(write_config, monkeypatch):
+    monkeypatch.setattr(storage_module, 'TASK_CHANGE_LOG_SIZE', 3)
+    write_config()
+    storage = BaiduStorage(lazy_client=True)
+    since = storage.version
+    for status in ('error', 'success', 'error', 'success'):
+        storage.update_task_status_by_order(1, status, 'x')
+
+    # since+1 已被挤出变更日志
+    assert storage.get_task_changes(since)[1] is None
+    # 仍在日志范围内的版本可以增量获取
+    assert [task['order'] for task in storage.get_task_changes(since + 1)[1]] == [1]
+
+
+def test_snapshot_is_shared_within_a_version(storage):
+    first = storage.get_task_snapshot()
+    assert storage.get_task_snapshot() is first
+    assert [task['order'] for task in first.tasks] == [1, 2, 3]
+    assert first.version == storage.version
+
+
+def test_snapshot_reuses_unchanged_task_copies(storage):
+    first = storage.get_task_snapshot()
+    storage.update_task_status_by_order(2, 'error', 'x')
+    second = storage.get_task_snapshot()
+
+    assert second.version == storage.version
+    assert second.tasks[0] is first.tasks[0]
+    assert second.tasks[2] is first.tasks[2]
+    assert second.tasks[1] is not first.tasks[1]
+    assert second.tasks[1]['status'] == 'error'
+    assert first.tasks[1]['status'] == 'normal'
+
+
+def test_snapshot_rebuilds_after_change_log_overflow(write_config, monkeypatch):
+    monkeypatch.setattr(storage_module, 'TASK_CHANGE_LOG_SIZE', 2)
+    write_config()
+    storage = BaiduStorage(lazy_client=True)
+    first = storage.get_task_snapshot()
+    storage.update_task_status_by_order(1, 'error', 'x')
+    storage.update_task_status_by_order(1, 'success', 'x')
+    storage.update_task_status_by_order(2, 'error', 'x')
+
+    second = storage.get_task_snapshot()
+    # 变更日志已无法覆盖上一份快照，所有任务重新拷贝
+    assert all(new is not old for new, old in zip(second.tasks, first.tasks))
+    assert [task['status'] for task in second.tasks] == ['normal', 'error', 'normal']
+
+
+def test_snapshot_categories(write_config):
+    from conftest import make_task
+    write_config([make_task(1, category='电影'), make_task(2, category=''), make_task(3)])
+    storage = BaiduStorage(lazy_client=True)
+    categories = storage.get_task_snapshot().categories
+    assert [task['order'] for task in categories['电影']] == [1]
+    assert [task['order'] for task in categories[None]] == [2, 3]
@@ -0,0 +1,35 @@
+"""BaiduStorage 按 order / url 的任务索引"""
+
+
+def test_lookup_by_order_and_url(storage):
+    task = storage.get_task_by_order(2)
+    assert task['url'] == 'https://pan.baidu.com/s/t2'
+    assert storage.get_task_by_url('https://pan.baidu.com/s/t2') is task
+    assert storage.get_task_by_order(99) is None
+    assert storage.get_task_by_url('https://pan.baidu.com/s/none') is None
+
+
+def test_index_follows_add_and_remove(storage):
+    assert storage.add_task('https://pan.baidu.com/s/new', '/test')
+    assert storage.get_task_by_order(4)['url'] == 'https://pan.baidu.com/s/new'
+
+    assert storage.remove_task_by_order(2)
+    assert storage.get_task_by_url('https://pan.baidu.com/s/t2') is None
+    # 删除后剩余任务重新编号
+    assert [storage.get_task_by_order(order)['url'][-2:] for order in (1, 2, 3)] == ['t1', 't3', 'ew']
+    assert storage.get_task_by_order(4) is None
+
+    assert storage.remove_tasks([1, 3]) == 2
+    assert storage.get_task_by_order(1)['url'].endswith('/t3')
+    assert storage.get_task_by_url('https://pan.baidu.com/s/new') is None
+
+
+def test_index_follows_reorder(storage):
+    assert storage.reorder_task(3, 1)
+    assert [storage.get_task_by_order(order)['url'][-2:] for order in (1, 2, 3)] == ['t3', 't1', 't2']
+
+
+def test_index_follows_url_change(storage):
+    assert storage.update_task_by_order(1, {'url': 'https://pan.baidu.com/s/changed'})
+    assert storage.get_task_by_url('https://pan.baidu.com/s/t1') is None
+    assert storage.get_task_by_url('https://pan.baidu.com/s/changed') is storage.get_task_by_order(1)
@@ -0,0 +1,96 @@
+"""BaiduStorage 的任务锁：task_mutation 的可见性、并发修改与配置段读写"""
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+
+@pytest.fixture
+def held_mutation(storage):
+    """在后台线程中打开 task 1 的 task_mutation 并保持，返回结束修改的函数"""
+    entered = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with storage.task_mutation(storage.get_task_by_order(1)) as draft:
+            draft['message'] = 'draft'
+            entered.set()
+            release.wait(5)
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    assert entered.wait(5)
+
+    def finish():
+        release.set()
+        thread.join(5)
+    yield finish
+    finish()
+
+
+def test_mutation_commits_on_exit(storage):
+    task = storage.get_task_by_order(1)
+    version = storage.version
+    with storage.task_mutation(task) as draft:
+        draft['message'] = 'changed'
+        assert task.get('message') is None
+        assert storage.version == version
+    assert task['message'] == 'changed'
+    assert storage.version == version + 1
+    assert storage.get_task_changes(version)[1][0]['message'] == 'changed'
+
+
+def test_held_mutation_does_not_block_other_writers(storage, held_mutation):
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [
+            executor.submit(storage.update_task_status_by_order, 2, 'error', 'x'),
+            executor.submit(storage.add_task, 'https://pan.baidu.com/s/new', '/test'),
+        ]
+        assert [future.result(timeout=5) for future in futures] == [True, True]
+    # 未提交的修改对读者不可见
+    assert storage.get_task_by_order(1).get('message') is None
+    assert all(task.get('message') != 'draft' for task in storage.get_task_snapshot().tasks)
+
+    held_mutation()
+    assert storage.get_task_by_order(1)['message'] == 'draft'
+    assert storage.get_task_by_order(4)['url'] == 'https://pan.baidu.com/s/new'
+
+
+def test_concurrent_status_updates(storage, workdir):
+    version = storage.version
+    updates = [(order, f'message {i}') for i in range(20) for order in (1, 2, 3)]
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        results = list(executor.map(lambda args: storage.update_task_status_by_order(args[0], 'error', args[1]),
+                                    updates))
+    assert all(results)
+    assert storage.version == version + len(updates)
+    # 写盘顺序与内存一致，最后保存的是每个任务最终的状态
+    saved = json.loads((workdir / 'config' / 'config.json').read_text(encoding='utf-8'))
+    assert saved['baidu']['tasks'] == storage.list_tasks()
+
+
+def test_settings_are_copied(storage):
+    auth = storage.get_settings('auth')
+    auth['password'] = 'changed'
+    assert storage.get_settings('auth')['password'] == 'password'
+
+    storage.update_settings({'auth': auth}, update_scheduler=False)
+    auth['password'] = 'again'
+    assert storage.get_settings('auth')['password'] == 'changed'
+    assert storage.get_settings('missing', default=[]) == []
+
+
+def test_rename_user(workdir):
+    from conftest import make_config
+    from storage import BaiduStorage
+    config = make_config([])
+    config['baidu'].update(users={'a': {'cookies': 'x'}}, current_user='a')
+    (workdir / 'config' / 'config.json').write_text(json.dumps(config), encoding='utf-8')
+    storage = BaiduStorage(lazy_client=True)
+
+    assert storage.rename_user('a', 'b')
+    assert storage.get_user('b') is not None
+    assert storage.get_user('a') is None
+    assert storage.config['baidu']['current_user'] == 'b'
+    assert not storage.rename_user('missing', 'c')
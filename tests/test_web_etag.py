@@ -0,0 +1,69 @@
+"""任务查询接口的 ETag / If-None-Match"""
+
+
+def revalidate(client, url, etag):
+    return client.get(url, headers={'If-None-Match': etag})
+
+
+def test_unchanged_tasks_return_304(client):
+    response = client.get('/api/tasks')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+    assert response.headers['Cache-Control'] == 'no-cache'
+
+    response = revalidate(client, '/api/tasks', etag)
+    assert response.status_code == 304
+    assert response.data == b''
+    assert response.headers['ETag'] == etag
+
+
+def test_task_change_invalidates_etag(client, storage):
+    etag = client.get('/api/tasks').headers['ETag']
+    storage.update_task_status_by_order(2, 'error', 'x')
+
+    response = revalidate(client, '/api/tasks', etag)
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.get_json()['tasks'][1]['status'] == 'error'
+    assert revalidate(client, '/api/tasks', response.headers['ETag']).status_code == 304
+
+
+def test_category_and_status_endpoints(client):
+    response = client.get('/api/tasks/category/uncategorized')
+    assert response.status_code == 200
+    assert revalidate(client, '/api/tasks/category/uncategorized', response.headers['ETag']).status_code == 304
+
+    response = client.get('/api/tasks/status')
+    assert response.get_json()['full']
+    assert revalidate(client, '/api/tasks/status', response.headers['ETag']).status_code == 304
+
+
+def test_schedule_stats_only_invalidate_status_endpoint(client):
+    import web_app
+    tasks_etag = client.get('/api/tasks').headers['ETag']
+    status_etag = client.get('/api/tasks/status').headers['ETag']
+
+    stats = web_app.scheduler.schedule_stats
+    stats.submitted('task_0', [1000.0])
+    stats.started('task_0', 1001.0)
+
+    assert revalidate(client, '/api/tasks', tasks_etag).status_code == 304
+    response = revalidate(client, '/api/tasks/status', status_etag)
+    assert response.status_code == 200
+    assert response.get_json()['schedule'] is not None
+
+
+def test_etag_includes_boot_id(client, monkeypatch):
+    import web_app
+    etag = client.get('/api/tasks').headers['ETag']
+    # 服务重启后版本号重新计数，旧的 ETag 不能匹配
+    monkeypatch.setattr(web_app, 'ETAG_BOOT_ID', 'restarted')
+    assert revalidate(client, '/api/tasks', etag).status_code == 200
+
+
+def test_error_response_has_no_etag(client, storage, monkeypatch):
+    monkeypatch.setattr(storage, 'get_task_snapshot', lambda: 1 / 0)
+    response = client.get('/api/tasks')
+    assert not response.get_json()['success']
+    assert 'ETag' not in response.headers
@@ -0,0 +1,67 @@
+"""任务日志轮询：since 游标与执行编号"""
+import pytest
+
+from log_buffer import TaskLogStore
+
+
+@pytest.fixture
+def task_logs(client, monkeypatch):
+    import web_app
+    store = TaskLogStore(max_lines=3)
+    monkeypatch.setattr(web_app, 'task_logs', store)
+    return store
+
+
+def run_task(task_logs, order, *messages):
+    task_logs.reset(order)
+    for message in messages:
+        task_logs.append(order, 'INFO', message)
+    task_logs.finish(order)
+
+
+def messages(data):
+    return [entry['message'] for entry in data['logs']]
+
+
+def test_incremental_fetch(client, task_logs):
+    run_task(task_logs, 2, 'a', 'b')
+    data = client.get('/api/task/log/1').get_json()
+    assert messages(data) == ['a', 'b']
+
+    task_logs.append(2, 'INFO', 'c')
+    data = client.get(f"/api/task/log/1?since={data['last_seq']}&run={data['run']}").get_json()
+    assert messages(data) == ['c']
+    assert 'reset' not in data
+
+    data = client.get(f"/api/task/log/1?since={data['last_seq']}&run={data['run']}").get_json()
+    assert data['logs'] == []
+
+
+def test_rerun_with_contiguous_seq_resets(client, task_logs):
+    run_task(task_logs, 1, 'first')
+    data = client.get('/api/task/log/0').get_json()
+    # 重新执行后的第一条日志 seq 紧接着客户端的游标
+    run_task(task_logs, 1, 'second')
+
+    data = client.get(f"/api/task/log/0?since={data['last_seq']}&run={data['run']}").get_json()
+    assert data['reset']
+    assert messages(data) == ['second']
+
+
+def test_cursor_before_buffer_resets(client, task_logs):
+    run_task(task_logs, 1, 'a')
+    data = client.get('/api/task/log/0').get_json()
+    for message in ('b', 'c', 'd', 'e'):
+        task_logs.append(1, 'INFO', message)
+
+    data = client.get(f"/api/task/log/0?since={data['last_seq']}&run={data['run']}").get_json()
+    assert data['reset']
+    assert messages(data) == ['c', 'd', 'e']
+
+
+def test_task_without_logs(client, task_logs):
+    data = client.get('/api/task/log/0?since=5').get_json()
+    assert data['logs'] == []
+    assert data['last_seq'] == 5
+    assert data['run'] is None
+    assert client.get('/api/task/log/99').get_json()['logs'] == []
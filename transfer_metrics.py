@@ -0,0 +1,118 @@
+import time
+from metrics import API_CALLS, API_DURATION, error_code
+
+# transfer_share 的阶段，与日志中的【步骤N】对应
+TRANSFER_STEPS = ('list_share', 'scan_local', 'prepare', 'transfer', 'rename')
+
+# 计入分页次数的接口
+PAGED_METHODS = ('list_shared_paths',)
+
+
+class TransferMetrics:
+    """记录单次转存的各阶段耗时和接口调用情况
+
+    阶段耗时通过 step() 切换：调用时结束上一个阶段并开始新阶段，finish() 结束最后一个阶段。
+    接口调用由 MeteredClient 记录，重试次数和转存字节数由 transfer_share 记录。
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self._current = None
+        self._current_start = None
+        self.steps = {}
+        self.api_calls = {}
+        self.api_errors = {}
+        self.api_time = {}
+        self.retries = 0
+        self.rate_limited = 0
+        self.files_transferred = 0
+        self.bytes_transferred = 0
+        self.duration = None
+
+    def step(self, name):
+        """结束当前阶段并开始新阶段"""
+        now = time.perf_counter()
+        self._close_step(now)
+        self._current = name
+        self._current_start = now
+
+    def _close_step(self, now):
+        if self._current is not None:
+            elapsed = now - self._current_start
+            self.steps[self._current] = self.steps.get(self._current, 0.0) + elapsed
+            self._current = None
+
+    def record_call(self, method, elapsed, error=None):
+        """记录一次接口调用"""
+        self.api_calls[method] = self.api_calls.get(method, 0) + 1
+        self.api_time[method] = self.api_time.get(method, 0.0) + elapsed
+        if error is not None:
+            self.api_errors[method] = self.api_errors.get(method, 0) + 1
+            if 'error_code: -65' in str(error):
+                self.rate_limited += 1
+
+    def add_transferred(self, count, size):
+        """记录成功转存的文件数和字节数"""
+        self.files_transferred += count
+        self.bytes_transferred += size
+
+    def finish(self):
+        """结束计时，返回可序列化的统计结果"""
+        if self.duration is None:
+            now = time.perf_counter()
+            self._close_step(now)
+            self.duration = now - self._start
+        return self.to_dict()
+
+    def to_dict(self):
+        duration = self.duration if self.duration is not None else time.perf_counter() - self._start
+        return {
+            'started_at': int(self.started_at),
+            'duration': round(duration, 3),
+            'steps': {name: round(self.steps[name], 3) for name in TRANSFER_STEPS if name in self.steps},
+            'api_calls': dict(self.api_calls),
+            'api_errors': dict(self.api_errors),
+            'api_time': {method: round(elapsed, 3) for method, elapsed in self.api_time.items()},
+            'pages': sum(self.api_calls.get(method, 0) for method in PAGED_METHODS),
+            'files_transferred': self.files_transferred,
+            'bytes_transferred': self.bytes_transferred,
+            'retries': self.retries,
+            'rate_limited': self.rate_limited,
+        }
+
+
+class MeteredClient:
+    """包装 BaiduPCSApi，记录每个方法的调用次数、耗时和错误
+
+    调用都计入 /metrics 的接口指标，传入 metrics 时同时计入本次转存的统计。
+    非方法属性（如 _baidupcs）原样返回。
+    """
+
+    def __init__(self, client, metrics=None):
+        self._client = client
+        self.metrics = metrics
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr) or name.startswith('_'):
+            return attr
+        metrics = self.metrics
+
+        def record(elapsed, error=None):
+            API_CALLS.inc(operation=name, error_code=error_code(error))
+            API_DURATION.observe(elapsed, operation=name)
+            if metrics is not None:
+                metrics.record_call(name, elapsed, error)
+
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = attr(*args, **kwargs)
+            except Exception as e:
+                record(time.perf_counter() - start, e)
+                raise
+            record(time.perf_counter() - start)
+            return result
+
+        return call
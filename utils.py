@@ -1,6 +1,14 @@
 import os
+import re
 from loguru import logger
 
+def notify_send(title, content, **kwargs):
+    """发送通知
+    notify 模块包含所有推送渠道并依赖 requests，首次发送时才导入，不影响启动
+    """
+    from notify import send
+    return send(title, content, **kwargs)
+
 def generate_transfer_notification(tasks_results):
     """生成转存通知内容"""
     try:
@@ -61,4 +69,72 @@ def generate_transfer_notification(tasks_results):
         return "\n".join(content)
     except Exception as e:
         logger.error(f"生成通知内容失败: {str(e)}")
-        return "生成通知内容失败" 
\ No newline at end of file
+        return "生成通知内容失败" 
+
+
+def tail_lines(path, limit, match=None, block_size=64 * 1024, max_bytes=16 * 1024 * 1024):
+    """从文件末尾按块倒序读取，返回最后 limit 行（保持原有顺序）
+    读取量与 limit 成正比，不会把整个文件读入内存
+    Args:
+        path: 文件路径
+        limit: 返回的最大行数
+        match: 可选的过滤函数 match(line) -> bool，只保留匹配的行
+        block_size: 每次向前读取的字节数
+        max_bytes: 最多向前扫描的字节数，避免过滤条件很少命中时扫描整个文件
+    Returns:
+        list: 行内容（不含换行符）
+    """
+    lines = []
+    if limit <= 0:
+        return lines
+
+    def collect(raw):
+        line = raw.decode('utf-8', errors='replace').rstrip('\r')
+        if line and (match is None or match(line)):
+            lines.append(line)
+        return len(lines) >= limit
+
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        remainder = b''
+        scanned = 0
+        done = False
+        while pos > 0 and not done and scanned < max_bytes:
+            size = min(block_size, pos)
+            pos -= size
+            f.seek(pos)
+            chunk = f.read(size) + remainder
+            scanned += size
+            parts = chunk.split(b'\n')
+            # 第一段可能是被块边界截断的行，留到下一轮拼接
+            remainder = parts[0]
+            for raw in reversed(parts[1:]):
+                if collect(raw):
+                    done = True
+                    break
+        if pos == 0 and not done and remainder:
+            # 文件的第一行
+            collect(remainder)
+
+    lines.reverse()
+    return lines
+
+
+# 日志中的敏感信息，匹配 "BDUSS: xxx"、"'cookies': 'xxx'" 等形式
+SENSITIVE_PATTERNS = (
+    (re.compile(r"BDUSS['\"]?\s*:\s*['\"]?([^'\"]+)['\"]?"), "BDUSS: [已隐藏]"),
+    (re.compile(r"cookies['\"]?\s*:\s*['\"]?([^'\"]+)['\"]?"), "cookies: [已隐藏]"),
+)
+
+
+def redact_sensitive_info(record):
+    """loguru patcher：隐藏日志中的BDUSS和cookies
+    绝大多数日志不含这两个关键字，先做子串判断，只对可能含有敏感信息的日志执行正则替换
+    """
+    message = record["message"]
+    if 'BDUSS' not in message and 'cookies' not in message:
+        return
+    for pattern, replacement in SENSITIVE_PATTERNS:
+        message = pattern.sub(replacement, message)
+    record["message"] = message
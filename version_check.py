@@ -0,0 +1,306 @@
+import re
+import time
+from threading import Lock, Thread
+from loguru import logger
+
+# GitHub 仓库信息
+GITHUB_REPO = 'kokojacket/baidu-autosave'
+# Docker Hub 信息
+DOCKER_HUB_RSS = 'https://rsshub.rssforever.com/dockerhub/tag/kokojacket/baidu-autosave'
+# 备用 Docker Hub RSS 源
+DOCKER_HUB_RSS_ALT = 'https://rss.kuaisouxia.com/dockerhub/tag/kokojacket/baidu-autosave'
+# 1ms.run API 源
+MS_RUN_API = 'https://1ms.run/api/v1/registry/get_tags'
+
+# 版本检查来源，1ms 为 msrun 的别名
+VERSION_SOURCES = ('github', 'dockerhub', 'dockerhub_alt', 'msrun')
+DEFAULT_VERSION_SOURCE = 'github'
+# 缓存有效期（秒），也是定时刷新的间隔，可通过配置 version_check.interval 修改
+DEFAULT_VERSION_CHECK_INTERVAL = 6 * 3600
+# 获取失败后至少间隔多久才由接口请求再次触发刷新（秒）
+FAILED_RETRY_INTERVAL = 300
+
+
+def fetch_latest_version(source='github'):
+    """从指定源获取最新版本
+    requests、feedparser 只在这里用到，调用时才导入，不影响启动
+    Args:
+        source: github（默认）、dockerhub、dockerhub_alt 或 msrun/1ms
+    Returns:
+        dict: 成功时包含 version、published、link、source，失败时包含 message
+    """
+    try:
+        import feedparser
+        import requests
+        from requests.exceptions import RequestException
+        
+        if source == 'dockerhub':
+            # 使用 Docker Hub RSS 检查更新
+            feed_url = DOCKER_HUB_RSS
+        elif source == 'dockerhub_alt':
+            # 使用备用 Docker Hub RSS 源
+            feed_url = DOCKER_HUB_RSS_ALT
+        elif source in ['msrun', '1ms']:
+            # 使用 1ms.run API 获取版本信息
+            try:
+                params = {
+                    "repositories": "kokojacket/baidu-autosave",
+                    "page": 1,
+                    "page_size": 10,
+                    "search": ""
+                }
+                response = requests.get(MS_RUN_API, params=params, timeout=5)
+                response.raise_for_status()
+                data = response.json()
+                
+                if data.get('code') == 0 and data.get('data', {}).get('list'):
+                    # 查找最新的正式版本（格式为vX.Y.Z）
+                    version_tags = []
+                    latest_tag = None
+                    
+                    # 首先找到latest标签
+                    for tag_info in data['data']['list']:
+                        if tag_info['tag_name'] == 'latest':
+                            latest_tag = tag_info
+                            break
+                    
+                    if latest_tag:
+                        # 找到与latest标签具有相同digest的版本标签
+                        latest_digest = latest_tag.get('digest')
+                        for tag_info in data['data']['list']:
+                            if re.match(r'^v\d+\.\d+\.\d+$', tag_info['tag_name']) and tag_info.get('digest') == latest_digest:
+                                version_tags.append(tag_info)
+                    
+                    # 如果没有找到与latest相同digest的版本标签，则收集所有版本标签
+                    if not version_tags:
+                        for tag_info in data['data']['list']:
+                            if re.match(r'^v\d+\.\d+\.\d+$', tag_info['tag_name']):
+                                version_tags.append(tag_info)
+                    
+                    if version_tags:
+                        # 按更新时间排序，选择最新的
+                        version_tags.sort(key=lambda x: x.get('tag_last_pushed', ''), reverse=True)
+                        latest_version = version_tags[0]['tag_name']
+                        published = version_tags[0].get('tag_last_pushed')
+                        link = f"https://hub.docker.com/layers/kokojacket/baidu-autosave/{latest_version}/images/{version_tags[0].get('digest', '').split(':')[-1]}"
+                        
+                        logger.info(f"从1ms.run API获取到最新版本: {latest_version}")
+                        return {
+                            'success': True,
+                            'version': latest_version,
+                            'published': published,
+                            'link': link,
+                            'source': '1ms'
+                        }
+                
+                # 如果没有找到有效的版本信息，返回错误
+                logger.warning("1ms.run API未返回有效的版本信息")
+                return {
+                    'success': False,
+                    'message': '1ms.run API未返回有效的版本信息',
+                    'source': '1ms'
+                }
+                
+            except Exception as e:
+                logger.warning(f"从1ms.run API获取版本信息失败: {str(e)}")
+                return {
+                    'success': False,
+                    'message': f'从1ms.run API获取版本信息失败: {str(e)}',
+                    'source': '1ms'
+                }
+        else:
+            # 默认使用 GitHub releases feed
+            feed_url = f'https://github.com/{GITHUB_REPO}/releases.atom'
+        
+        # 如果是使用RSS源，则执行以下代码
+        if source in ['github', 'dockerhub', 'dockerhub_alt']:
+            try:
+                # 设置超时，避免长时间等待
+                response = requests.get(feed_url, timeout=5)
+                response.raise_for_status()  # 如果响应状态码不是200，抛出异常
+            except RequestException as e:
+                logger.warning(f"获取{source}版本信息失败: {str(e)}")
+                return {
+                    'success': False,
+                    'message': f'无法获取{source}版本信息: {str(e)}',
+                    'source': source
+                }
+                
+            # 解析 feed
+            feed = feedparser.parse(response.content)
+            if not feed.entries:
+                logger.warning(f"{source}未找到版本信息")
+                return {
+                    'success': False,
+                    'message': f'{source}未找到版本信息',
+                    'source': source
+                }
+                
+            # 获取最新版本信息
+            if source in ['dockerhub', 'dockerhub_alt']:
+                # 首先查找latest标签的条目
+                latest_entry = None
+                latest_guid = None
+                version_entry = None
+                
+                for entry in feed.entries:
+                    if ':latest' in entry.title:
+                        latest_entry = entry
+                        # 提取镜像ID（guid的@后面部分）
+                        guid_match = re.search(r'@([a-f0-9]+)$', entry.guid)
+                        if guid_match:
+                            latest_guid = guid_match.group(1)
+                        break
+                
+                if not latest_entry:
+                    logger.warning("Docker Hub中未找到latest标签")
+                    # 如果没有找到latest标签，使用第一个条目
+                    latest_entry = feed.entries[0]
+                
+                # 如果找到了latest的guid，查找对应的版本号条目
+                if latest_guid:
+                    for entry in feed.entries:
+                        # 检查是否是版本号标签（如v1.0.8）并且与latest有相同的guid
+                        if re.search(r':v\d+\.\d+\.\d+', entry.title) and latest_guid in entry.guid:
+                            version_entry = entry
+                            break
+                
+                # 如果找到了版本号条目，使用它；否则使用latest条目
+                entry_to_use = version_entry if version_entry else latest_entry
+                
+                # 提取版本号
+                title = entry_to_use.title
+                version_match = re.search(r':(?:v?\d+\.\d+\.\d+|latest)', title)
+                latest_version = version_match.group(0)[1:] if version_match else title
+                
+                # 添加发布日期
+                pub_date = entry_to_use.pubDate if hasattr(entry_to_use, 'pubDate') else entry_to_use.published
+                
+                logger.info(f"从Docker Hub ({source})获取到最新版本: {latest_version}")
+                return {
+                    'success': True,
+                    'version': latest_version,
+                    'published': pub_date,
+                    'link': entry_to_use.link,
+                    'source': source
+                }
+            else:
+                # GitHub 格式
+                title = feed.entries[0].title
+                
+                # 从标题中提取版本号，支持多种格式：
+                # 1. "Release v1.0.8" -> "v1.0.8"
+                # 2. "v1.0.8" -> "v1.0.8"
+                # 3. "1.0.8" -> "1.0.8"
+                version_match = re.search(r'(?:Release\s+)?(v?\d+\.\d+\.\d+)', title)
+                if version_match:
+                    latest_version = version_match.group(1)
+                    # 确保版本号以v开头
+                    if not latest_version.startswith('v'):
+                        latest_version = 'v' + latest_version
+                else:
+                    # 如果无法提取版本号，使用原始标题
+                    latest_version = title
+                
+                pub_date = feed.entries[0].published if hasattr(feed.entries[0], 'published') else None
+                link = feed.entries[0].link if hasattr(feed.entries[0], 'link') else f"https://github.com/{GITHUB_REPO}/releases/latest"
+                
+                logger.info(f"从GitHub获取到最新版本: {title} -> 提取版本号: {latest_version}")
+                return {
+                    'success': True,
+                    'version': latest_version,
+                    'published': pub_date,
+                    'link': link,
+                    'source': 'github'
+                }
+    except Exception as e:
+        logger.error(f"检查版本失败: {str(e)}")
+        return {
+            'success': False,
+            'message': f'检查版本失败: {str(e)}',
+            'source': source
+        }
+
+
+def normalize_source(source):
+    """统一来源名称，未知来源按 github 处理（与 fetch_latest_version 一致）"""
+    if source == '1ms':
+        return 'msrun'
+    return source if source in VERSION_SOURCES else DEFAULT_VERSION_SOURCE
+
+
+class VersionChecker:
+    """缓存各来源的最新版本
+
+    接口只读缓存，不发起网络请求：缓存由调度器中的定时作业调用 refresh_all 刷新，
+    没有缓存或已过期时在后台线程刷新，期间返回过期的结果。
+    获取失败时保留上一次成功的结果。
+    """
+
+    def __init__(self, ttl=DEFAULT_VERSION_CHECK_INTERVAL):
+        self.ttl = ttl
+        self._entries = {}  # 来源 -> {'result', 'checked_at', 'attempted_at'}
+        self._requested = {DEFAULT_VERSION_SOURCE}  # 定时刷新的来源：默认来源和接口请求过的来源
+        self._refreshing = set()
+        self._lock = Lock()
+
+    def get(self, source=DEFAULT_VERSION_SOURCE):
+        """返回缓存的结果，附带 checked_at（获取时间）和 stale（是否已过期）
+        没有缓存时返回 None，并在后台开始获取
+        """
+        source = normalize_source(source)
+        now = time.time()
+        with self._lock:
+            self._requested.add(source)
+            entry = self._entries.get(source)
+            expired = (entry is None or not entry['result'].get('success')
+                       or now - entry['checked_at'] >= self.ttl)
+            retry = entry is None or now - entry['attempted_at'] >= FAILED_RETRY_INTERVAL
+        if expired and retry:
+            self.refresh_async(source)
+        if entry is None:
+            return None
+        return dict(entry['result'], checked_at=int(entry['checked_at']), stale=expired)
+
+    def has_result(self, source=DEFAULT_VERSION_SOURCE):
+        """是否已有该来源的缓存（无论成功与否）"""
+        with self._lock:
+            return normalize_source(source) in self._entries
+
+    def refresh(self, source=DEFAULT_VERSION_SOURCE):
+        """获取最新版本并更新缓存，同一来源已在刷新时直接返回 None"""
+        source = normalize_source(source)
+        with self._lock:
+            if source in self._refreshing:
+                return None
+            self._refreshing.add(source)
+        try:
+            result = fetch_latest_version(source)
+            now = time.time()
+            with self._lock:
+                entry = self._entries.get(source)
+                if result.get('success') or entry is None or not entry['result'].get('success'):
+                    self._entries[source] = {'result': result, 'checked_at': now, 'attempted_at': now}
+                else:
+                    entry['attempted_at'] = now
+            return result
+        finally:
+            with self._lock:
+                self._refreshing.discard(source)
+
+    def refresh_async(self, source=DEFAULT_VERSION_SOURCE):
+        Thread(target=self.refresh, args=(source,), name=f'version-check-{source}', daemon=True).start()
+
+    def refresh_all(self):
+        """定时作业：按优先顺序刷新默认来源和接口请求过的来源，直到有一个成功
+        前端同样按顺序尝试各来源，使用第一个成功的结果
+        """
+        with self._lock:
+            sources = sorted(self._requested, key=VERSION_SOURCES.index)
+        for source in sources:
+            result = self.refresh(source)
+            if result and result.get('success'):
+                break
+
+
+version_checker = VersionChecker()
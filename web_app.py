@@ -1,32 +1,35 @@
-from flask import Flask, request, jsonify, render_template, send_from_directory, session, redirect, url_for
-from storage import BaiduStorage
+from flask import Flask, request, jsonify, render_template, send_from_directory, session, redirect, url_for, copy_current_request_context, Response, make_response
+from storage import BaiduStorage, CLIENT_INIT_WAIT_TIMEOUT
 from scheduler import TaskScheduler
 import json
 from loguru import logger
 import sys
 import os
 import atexit
-import re
+import hmac
 from functools import wraps
 import signal
-from utils import generate_transfer_notification
-from notify import send as notify_send
+from utils import generate_transfer_notification, tail_lines, redact_sensitive_info, notify_send
+from jobs import JobManager
+from events import EventBroker, format_sse
+from response_utils import FastJSONProvider, init_compression
+from log_buffer import (LogRingBuffer, TaskLogStore, DEFAULT_LOG_BUFFER_SIZE,
+                        DEFAULT_TASK_LOG_LINES, DEFAULT_TASK_LOG_TTL)
+import metrics
+from schedule_stats import SKIP_REASONS
+from version_check import version_checker
+from profiling import (task_profiler, PROFILE_MODES, PSTATS_SORT_KEYS, DEFAULT_PSTATS_LIMIT,
+                       DEFAULT_SAMPLE_INTERVAL)
 from datetime import datetime
 from flask_cors import CORS
 import time
 import socket
 import threading
+import bisect
 
+import gevent
 from gevent.pywsgi import WSGIServer
-
-# GitHub 仓库信息
-GITHUB_REPO = 'kokojacket/baidu-autosave'
-# Docker Hub 信息
-DOCKER_HUB_RSS = 'https://rsshub.rssforever.com/dockerhub/tag/kokojacket/baidu-autosave'
-# 备用 Docker Hub RSS 源
-DOCKER_HUB_RSS_ALT = 'https://rss.kuaisouxia.com/dockerhub/tag/kokojacket/baidu-autosave'
-# 1ms.run API 源
-MS_RUN_API = 'https://1ms.run/api/v1/registry/get_tags'
+from gevent.threadpool import ThreadPool
 
 # 创建日志目录
 os.makedirs('log', exist_ok=True)
@@ -36,18 +39,15 @@ logger.remove()  # 移除默认的控制台输出
 
 # 定义统一的日志格式和级别
 log_format = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
-log_level = "DEBUG"  # 使用DEBUG级别，可以看到所有日志
-
-# 过滤敏感信息
-def filter_sensitive_info(record):
-    """过滤敏感信息，如BDUSS和cookies"""
-    message = record["message"]
-    # 替换BDUSS
-    message = re.sub(r"BDUSS['\"]?\s*:\s*['\"]?([^'\"]+)['\"]?", "BDUSS: [已隐藏]", message)
-    # 替换cookies
-    message = re.sub(r"cookies['\"]?\s*:\s*['\"]?([^'\"]+)['\"]?", "cookies: [已隐藏]", message)
-    record["message"] = message
-    return True
+# 默认使用DEBUG级别，可以看到所有日志；控制台、文件和内存缓冲区可分别设置级别，
+# 所有输出都高于DEBUG时，逐文件的调试日志在调用处就会被跳过
+log_level = os.getenv('LOG_LEVEL', 'DEBUG').upper()
+console_log_level = os.getenv('LOG_CONSOLE_LEVEL', log_level).upper()
+file_log_level = os.getenv('LOG_FILE_LEVEL', log_level).upper()
+buffer_log_level = os.getenv('LOG_BUFFER_LEVEL', log_level).upper()
+# 控制台和文件输出改由后台线程写入，输出端可能卡住（如容器日志管道拥塞、网络存储）时开启。
+# 每条日志需要额外序列化，CPU开销高于直接写入，默认关闭
+log_enqueue = os.getenv('LOG_ENQUEUE', 'false').lower() in ('true', '1', 'yes')
 
 # 过滤轮询请求日志
 def filter_polling_requests(record):
@@ -61,11 +61,12 @@ def filter_polling_requests(record):
     return True  # 显示其他所有日志
 
 # 应用过滤器到所有日志处理器
-logger.configure(patcher=filter_sensitive_info)
+logger.configure(patcher=redact_sensitive_info)
 
 # 添加彩色的控制台输出（带轮询过滤）
 logger.add(sys.stdout, 
-          level=log_level, 
+          level=console_log_level, 
+          enqueue=log_enqueue,
           format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
           filter=filter_polling_requests)  # 添加轮询过滤器
 
@@ -73,17 +74,44 @@ logger.add(sys.stdout,
 logger.add("log/web_app_{time:YYYY-MM-DD}.log", 
           rotation="00:00",  # 每天零点创建新文件
           retention="7 days",  # 保留7天的日志
-          level=log_level,
+          level=file_log_level,
+          enqueue=log_enqueue,
           encoding="utf-8",
           format=log_format)
 
+# 事件中心：任务日志、任务状态变化和系统日志通过 /api/events 推送给前端
+event_broker = EventBroker()
+# SSE 连接检查新事件的间隔和心跳间隔（秒）
+SSE_POLL_INTERVAL = 0.5
+SSE_KEEPALIVE_INTERVAL = 15
+
+# 最近日志的内存环形缓冲区，/api/logs 直接从这里读取，不再解析日志文件
+log_buffer = LogRingBuffer(int(os.getenv('LOG_BUFFER_SIZE', DEFAULT_LOG_BUFFER_SIZE)))
+# 作为事件推送的最低日志级别（WARNING）
+# 事件中心的缓冲区由任务状态、任务日志共用，INFO 日志量大，会把状态事件挤出缓冲区导致订阅者频繁 reset；
+# 完整的系统日志通过 /api/logs?since=<seq> 增量获取
+LOG_EVENT_LEVEL_NO = 30
+
+def buffer_log_record(message):
+    """系统日志sink，写入环形缓冲区并将 WARNING 及以上的日志作为事件发布"""
+    entry = log_buffer.append(message.record)
+    if entry['level_no'] >= LOG_EVENT_LEVEL_NO:
+        event_broker.publish('log', entry)
+
+logger.add(buffer_log_record, level=buffer_log_level, filter=filter_polling_requests)
+
 app = Flask(__name__)
+# 安装了 orjson 时用其序列化 JSON 响应
+app.json = FastJSONProvider(app)
+# 按 Accept-Encoding 压缩 JSON 响应
+init_compression(app)
 app.secret_key = 'your-secret-key-here'  # 用于session加密
 CORS(app)
 
 # 全局变量声明
 storage = None
 scheduler = None
+job_manager = None
 
 
 # 登录装饰器
@@ -108,12 +136,12 @@ def login_required(f):
 
 def init_app():
     """初始化应用"""
-    global storage, scheduler
+    global storage, scheduler, job_manager
     try:
         logger.info("开始初始化应用...")
-        # 初始化存储
+        # 初始化存储，网盘客户端在后台初始化，不阻塞 Web 服务启动，进度见 /api/health
         logger.info("正在初始化存储...")
-        storage = BaiduStorage()
+        storage = BaiduStorage(lazy_client=True)
         
         # 使用已创建的 storage 实例初始化调度器
         try:
@@ -125,10 +153,18 @@ def init_app():
             logger.error(f"初始化调度器失败: {str(e)}")
             scheduler = None
         
-        if not storage.is_valid():
-            logger.warning("存储初始化成功，但未登录或未配置用户")
-            
-        logger.info("应用初始化完成")
+        # 批量执行作业管理器，添加、切换、更新用户时会重新调用 init_app，
+        # 作业通过全局 storage 执行，沿用已有的管理器即可，避免旧线程池泄漏
+        if job_manager is None:
+            job_manager = JobManager(run_batch_task, on_finished=notify_batch_results)
+        
+        # 任务变化时发布事件
+        storage.add_change_listener(publish_task_change)
+        
+        # 定期清理闲置的任务日志
+        task_logs.start()
+        
+        logger.info("应用初始化完成，网盘客户端正在后台初始化")
         return True, None
         
     except Exception as e:
@@ -138,7 +174,11 @@ def init_app():
 
 def cleanup():
     """清理资源"""
-    global scheduler
+    global scheduler, job_manager
+    task_logs.stop()
+    if job_manager:
+        job_manager.shutdown()
+        job_manager = None
     if scheduler:
         try:
             if hasattr(scheduler, 'is_running') and scheduler.is_running:
@@ -148,6 +188,19 @@ def cleanup():
         except Exception as e:
             logger.error(f"停止调度器失败: {str(e)}")
 
+# 阻塞操作线程池
+# 服务器没有使用 monkey patch（调度器依赖真实线程），请求中的阻塞IO会卡住整个事件循环。
+# 调用百度网盘接口、发送通知、访问外部源的接口放到真实线程中执行，
+# 当前greenlet让出等待，状态轮询等其他请求不受影响
+blocking_pool = ThreadPool(int(os.getenv('WEB_BLOCKING_THREADS', '10')))
+
+def run_blocking(f):
+    """在线程池中执行包含阻塞IO的处理函数"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        return blocking_pool.apply(copy_current_request_context(f), args, kwargs)
+    return decorated_function
+
 def handle_api_error(f):
     """API错误处理装饰器"""
     @wraps(f)
@@ -160,6 +213,39 @@ def handle_api_error(f):
             return jsonify({'success': False, 'message': error_msg})
     return decorated_function
 
+# ETag 中包含服务启动时间，避免重启后版本号重新计数时与旧的缓存误匹配
+ETAG_BOOT_ID = format(int(time.time()), 'x')
+
+def task_etag(f=None, include_schedule=False):
+    """任务查询接口的条件请求装饰器
+    以任务版本号作为弱 ETag，If-None-Match 匹配时直接返回 304，
+    任务没有变化时轮询不再序列化和传输完整的任务列表。
+    include_schedule=True 用于响应中带有调度统计的接口，统计变化时也让缓存失效；
+    其他接口不受定时触发影响
+    """
+    if f is None:
+        return lambda func: task_etag(func, include_schedule=include_schedule)
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not storage:
+            return f(*args, **kwargs)
+        # 先取版本号再生成响应：期间发生变更时 ETag 只会偏旧，下次请求会拿到新数据
+        etag = f'tasks-{ETAG_BOOT_ID}-{storage.version}'
+        if include_schedule:
+            etag += f'-{scheduler.schedule_stats.version if scheduler else 0}'
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag, weak=True)
+        # 浏览器每次都带 If-None-Match 重新验证
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return decorated_function
+
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     """登录处理"""
@@ -202,39 +288,56 @@ def index():
 @app.route('/api/tasks', methods=['GET'])
 @login_required
 @handle_api_error
+@task_etag
 def get_tasks():
     """获取所有任务"""
     if not storage:
         return jsonify({'success': False, 'message': '存储未初始化'})
-    tasks = storage.list_tasks()
-    # 按 order 排序，没有 order 的排在最后
-    tasks.sort(key=lambda x: x.get('order', float('inf')))
-    return jsonify({'success': True, 'tasks': tasks})
+    # 快照已按 order 排序，直接序列化
+    return jsonify({'success': True, 'tasks': storage.get_task_snapshot().tasks})
 
 @app.route('/api/tasks/<int:task_id>/status', methods=['GET'])
 @login_required
 @handle_api_error
+@task_etag
 def get_task_status(task_id):
     """获取单个任务状态"""
     if not storage:
         return jsonify({'success': False, 'message': '存储未初始化'})
-    tasks = storage.list_tasks()
-    # 按 order 排序，确保 task_id 对应正确的任务
-    tasks.sort(key=lambda x: x.get('order', float('inf')))
+    # 快照按 order 排序，确保 task_id 对应正确的任务
+    tasks = storage.get_task_snapshot().tasks
     if 0 <= task_id < len(tasks):
         return jsonify({'success': True, 'status': tasks[task_id]})
     return jsonify({'success': False, 'message': '任务不存在'})
 
+@app.route('/api/tasks/<int:task_id>/metrics', methods=['GET'])
+@login_required
+@handle_api_error
+@task_etag
+def get_task_metrics(task_id):
+    """获取任务最近一次执行的耗时和接口调用统计"""
+    if not storage:
+        return jsonify({'success': False, 'message': '存储未初始化'})
+    tasks = storage.get_task_snapshot().tasks
+    if 0 <= task_id < len(tasks):
+        task = tasks[task_id]
+        return jsonify({
+            'success': True,
+            'order': task.get('order'),
+            'last_execute_time': task.get('last_execute_time'),
+            'metrics': task.get('last_run_metrics')
+        })
+    return jsonify({'success': False, 'message': '任务不存在'})
+
 @app.route('/api/tasks/running', methods=['GET'])
 @login_required
 @handle_api_error
+@task_etag
 def get_running_tasks():
     """获取正在运行的任务"""
     if not storage:
         return jsonify({'success': False, 'message': '存储未初始化'})
-    tasks = storage.list_tasks()
-    # 按 order 排序后再筛选运行中的任务
-    tasks.sort(key=lambda x: x.get('order', float('inf')))
+    tasks = storage.get_task_snapshot().tasks
     running_tasks = [task for task in tasks if task.get('status') == 'running']
     return jsonify({'success': True, 'tasks': running_tasks})
 
@@ -307,17 +410,10 @@ def update_task():
     tasks = storage.list_tasks()
     if not tasks:
         return jsonify({'success': False, 'message': '任务列表为空'})
-        
-    # 按order排序
-    tasks.sort(key=lambda x: x.get('order', float('inf')))
     
     # 查找对应order的任务
     task_order = task_id + 1  # task_id 是从0开始的索引，而 order 是从1开始的
-    task = None
-    for t in tasks:
-        if t.get('order') == task_order:
-            task = t
-            break
+    task = storage.get_task_by_order(task_order)
             
     if not task:
         return jsonify({'success': False, 'message': f'未找到任务(order={task_order})'})
@@ -373,6 +469,7 @@ def update_task():
 @app.route('/api/share/info', methods=['POST'])
 @login_required
 @handle_api_error
+@run_blocking
 def get_share_info():
     """获取分享链接信息"""
     data = request.get_json()
@@ -435,9 +532,8 @@ def delete_task():
     
     if not storage:
         return jsonify({'success': False, 'message': '存储未初始化'})
-    tasks = storage.list_tasks()
-    # 按 order 排序，确保 task_id 对应正确的任务
-    tasks.sort(key=lambda x: x.get('order', float('inf')))
+    # 快照按 order 排序，确保 task_id 对应正确的任务
+    tasks = storage.get_task_snapshot().tasks
     if 0 <= task_id < len(tasks):
         task = tasks[task_id]
         task_order = task.get('order', task_id + 1)
@@ -464,21 +560,14 @@ def move_task():
         return jsonify({'success': False, 'message': '存储未初始化'})
     
     try:
-        tasks = storage.list_tasks()
-        # 按 order 排序
-        tasks.sort(key=lambda x: x.get('order', float('inf')))
+        tasks = storage.get_task_snapshot().tasks
         
         if not (0 <= task_id < len(tasks)) or not (0 <= new_index < len(tasks)):
             return jsonify({'success': False, 'message': '任务ID或位置无效'})
         
-        # 移动任务
-        task = tasks.pop(task_id)
-        tasks.insert(new_index, task)
-        
-        # 更新所有任务的order
-        for i, task in enumerate(tasks):
-            task['order'] = i + 1
-            storage.update_task(i, task)
+        # 快照只读，移动交由存储层在锁内完成
+        if not storage.reorder_task(tasks[task_id].get('order'), new_index + 1):
+            return jsonify({'success': False, 'message': '移动任务失败'})
         
         return jsonify({'success': True, 'message': '任务位置已更新'})
         
@@ -503,14 +592,11 @@ def execute_task():
     if not storage:
         return jsonify({'success': False, 'message': '存储未初始化'})
 
-    # 获取任务列表
-    tasks = storage.list_tasks()
+    # 获取按order排序的任务列表
+    tasks = storage.get_task_snapshot().tasks
     if not tasks:
         return jsonify({'success': False, 'message': '任务列表为空'})
     
-    # 按order排序
-    tasks.sort(key=lambda x: x.get('order', float('inf')))
-    
     # 根据task_id获取对应的任务（task_id是数组索引）
     if task_id >= len(tasks):
         return jsonify({'success': False, 'message': f'任务索引超出范围(task_id={task_id})'})
@@ -523,193 +609,241 @@ def execute_task():
     
     task_name = task.get('name') or f'任务{task_order}'
     
+    # 标记运行状态并初始化任务日志
+    start_task_log(task_order, task_name)
+    
+    # 启动异步任务并立即返回
+    thread = threading.Thread(target=execute_task_and_notify, args=(task_order,))
+    thread.daemon = True  # 设置为守护线程
+    thread.start()
+    
+    # 立即返回响应，表示任务已开始执行
+    return jsonify({'success': True, 'message': '任务已开始执行'})
+
+def execute_task_and_notify(task_order):
+    """执行单个任务，成功转存时发送通知（调用前需先调用 start_task_log）"""
+    result = run_task_with_logs(task_order)
+    if result['status'] == 'success':
+        task_results = {
+            'success': [result['task']],
+            'failed': [],
+            'transferred_files': {result['task']['url']: result['transferred_files']}
+        }
+        try:
+            # 发送转存成功通知
+            notify_send('百度自动追更', generate_transfer_notification(task_results))
+        except Exception as e:
+            logger.error(f"发送转存成功通知失败: {str(e)}")
+    return result
+
+@app.route('/api/task/profile', methods=['POST'])
+@login_required
+@handle_api_error
+def profile_task():
+    """在剖析器下执行指定任务（与 /api/task/execute 相同的流程），返回报告ID
+    mode 为 cprofile（默认，输出 pstats）或 sampling（采样，输出 collapsed stack）
+    """
+    data = request.get_json() or {}
+    try:
+        task_id = int(data.get('task_id', -1))
+        limit = int(data.get('limit', DEFAULT_PSTATS_LIMIT))
+        interval = float(data.get('interval', DEFAULT_SAMPLE_INTERVAL))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': '参数格式错误'})
+    mode = data.get('mode', 'cprofile')
+    sort = data.get('sort', 'cumulative')
+    if mode not in PROFILE_MODES or sort not in PSTATS_SORT_KEYS:
+        return jsonify({'success': False, 'message': f'mode 可选 {PROFILE_MODES}，sort 可选 {PSTATS_SORT_KEYS}'})
+    if not 0.001 <= interval <= 1:
+        return jsonify({'success': False, 'message': '采样间隔需在 0.001 到 1 秒之间'})
+
+    if not storage:
+        return jsonify({'success': False, 'message': '存储未初始化'})
+    tasks = storage.get_task_snapshot().tasks
+    if not 0 <= task_id < len(tasks) or not tasks[task_id].get('order'):
+        return jsonify({'success': False, 'message': f'任务不存在(task_id={task_id})'})
+    task_order = tasks[task_id]['order']
+    task_name = tasks[task_id].get('name') or f'任务{task_order}'
+
+    def run_profiled():
+        start_task_log(task_order, task_name)
+        return execute_task_and_notify(task_order)
+
+    report_id = task_profiler.start(run_profiled, task_order=task_order, mode=mode, sort=sort,
+                                    limit=limit, interval=interval)
+    if report_id is None:
+        return jsonify({'success': False, 'message': '已有剖析正在进行，请稍后再试'})
+    return jsonify({'success': True, 'message': '任务已开始执行', 'profile_id': report_id})
+
+@app.route('/api/profiles', methods=['GET'])
+@login_required
+@handle_api_error
+def list_profiles():
+    """最近的剖析报告（不含报告内容）和定时执行的剖析设置"""
+    return jsonify({'success': True, 'scheduled': task_profiler.scheduled(), 'profiles': task_profiler.list()})
+
+@app.route('/api/profiles/<int:profile_id>', methods=['GET'])
+@login_required
+@handle_api_error
+def get_profile(profile_id):
+    """获取剖析报告
+    format=text 以纯文本返回报告，format=raw 下载 cProfile 原始数据（可用 snakeviz 打开）
+    """
+    report = task_profiler.get(profile_id)
+    if not report:
+        return jsonify({'success': False, 'message': '报告不存在'})
+    output = request.args.get('format', 'json')
+    if output == 'raw':
+        if not report['raw']:
+            return jsonify({'success': False, 'message': '只有已完成的 cprofile 报告可以下载原始数据'})
+        return Response(report['raw'], mimetype='application/octet-stream', headers={
+            'Content-Disposition': f'attachment; filename=task{report["task_order"]}-{profile_id}.prof'})
+    if output == 'text':
+        return Response(report['report'] or '', mimetype='text/plain')
+    report.pop('raw')
+    return jsonify({'success': True, 'profile': report})
+
+@app.route('/api/profiles/scheduled', methods=['POST'])
+@login_required
+@handle_api_error
+def arm_scheduled_profiles():
+    """剖析接下来的 count 次定时执行，count 为 0 时取消"""
+    data = request.get_json() or {}
+    try:
+        count = int(data.get('count', 1))
+        limit = int(data.get('limit', DEFAULT_PSTATS_LIMIT))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'message': '参数格式错误'})
+    mode = data.get('mode', 'cprofile')
+    sort = data.get('sort', 'cumulative')
+    if mode not in PROFILE_MODES or sort not in PSTATS_SORT_KEYS:
+        return jsonify({'success': False, 'message': f'mode 可选 {PROFILE_MODES}，sort 可选 {PSTATS_SORT_KEYS}'})
+    scheduled = task_profiler.arm(count, mode=mode, sort=sort, limit=limit)
+    logger.info(f"剖析接下来的 {scheduled['remaining']} 次定时执行 (mode={mode})")
+    return jsonify({'success': True, 'scheduled': scheduled})
+
+# 任务执行日志，每个任务保留最近 TASK_LOG_MAX_LINES 条，闲置 TASK_LOG_TTL 秒后清理
+# 日志 seq 全局单调递增，前端用作增量获取的游标
+task_logs = TaskLogStore(
+    max_lines=int(os.getenv('TASK_LOG_MAX_LINES', DEFAULT_TASK_LOG_LINES)),
+    ttl=int(os.getenv('TASK_LOG_TTL', DEFAULT_TASK_LOG_TTL))
+)
+
+def append_task_log(task_order, level, message):
+    """向任务日志缓冲区追加一条日志，同时发布 task_log 事件"""
+    log_entry = task_logs.append(task_order, level, message)
+    if log_entry is not None:
+        event_broker.publish('task_log', log_entry)
+
+def start_task_log(task_order, task_name):
+    """将任务标记为运行中，并清空旧日志写入开始日志"""
     # 更新为运行状态
     storage.update_task_status_by_order(task_order, 'running', '正在执行任务')
     
-    # 初始化任务日志存储
-    if not hasattr(app, 'task_logs'):
-        app.task_logs = {}
-    
     # 清理旧的任务日志，避免显示历史日志
-    app.task_logs[task_order] = []
+    task_logs.reset(task_order)
     
     # 添加初始日志，确保前端立即能看到日志更新
-    initial_log = {
-        'timestamp': datetime.now().strftime('%H:%M:%S'),
-        'level': 'INFO',
-        'message': f'开始执行任务: {task_name}',
-        'task_order': task_order
-    }
-    app.task_logs[task_order].append(initial_log)
-    
-    # 立即返回响应，然后异步执行任务
-    def execute_task_async():
-        """异步执行任务"""
-        try:
-            # 添加任务启动日志
-            startup_log = {
-                'timestamp': datetime.now().strftime('%H:%M:%S'),
-                'level': 'INFO',
-                'message': '任务线程已启动，正在准备执行...',
-                'task_order': task_order
-            }
-            if hasattr(app, 'task_logs') and task_order in app.task_logs:
-                app.task_logs[task_order].append(startup_log)
-            
-            # 重新获取最新的任务数据，确保使用最新的密码等信息
-            latest_tasks = storage.list_tasks()
-            latest_tasks.sort(key=lambda x: x.get('order', float('inf')))
-            latest_task = None
-            for t in latest_tasks:
-                if t.get('order') == task_order:
-                    latest_task = t
-                    break
-            
-            if not latest_task:
-                logger.error(f'任务已不存在(order={task_order})')
-                storage.update_task_status_by_order(task_order, 'error', '任务已不存在')
-                # 添加错误日志
-                error_log = {
-                    'timestamp': datetime.now().strftime('%H:%M:%S'),
-                    'level': 'ERROR',
-                    'message': '任务已不存在，执行失败',
-                    'task_order': task_order
-                }
-                if hasattr(app, 'task_logs') and task_order in app.task_logs:
-                    app.task_logs[task_order].append(error_log)
-                return
-            
-            # 使用最新任务数据
-            task = latest_task
-            
-            # 添加任务开始执行日志
-            start_log = {
-                'timestamp': datetime.now().strftime('%H:%M:%S'),
-                'level': 'INFO',
-                'message': f'开始处理任务: {task.get("name", "未命名任务")}',
-                'task_order': task_order
-            }
-            if hasattr(app, 'task_logs') and task_order in app.task_logs:
-                app.task_logs[task_order].append(start_log)
+    append_task_log(task_order, 'INFO', f'开始执行任务: {task_name}')
+
+def run_task_with_logs(task_order):
+    """执行单个任务，进度实时写入任务日志缓冲区并同步任务状态
+    调用前需先调用 start_task_log，单任务执行和批量作业共用
+    Returns:
+        dict: {'status': 'success'|'skipped'|'failed', 'task': 任务, 'transferred_files': [...], 'message'/'error': ...}
+    """
+    task = None
+    try:
+        # 添加任务启动日志
+        append_task_log(task_order, 'INFO', '任务线程已启动，正在准备执行...')
+        
+        # 重新获取最新的任务数据，确保使用最新的密码等信息
+        task = storage.get_task_by_order(task_order)
+        
+        if not task:
+            logger.error(f'任务已不存在(order={task_order})')
+            storage.update_task_status_by_order(task_order, 'error', '任务已不存在')
+            # 添加错误日志
+            append_task_log(task_order, 'ERROR', '任务已不存在，执行失败')
+            return {'status': 'failed', 'task': None, 'error': '任务已不存在'}
+        
+        # 添加任务开始执行日志
+        append_task_log(task_order, 'INFO', f'开始处理任务: {task.get("name", "未命名任务")}')
+        
+        def progress_callback(status, message):
+            """实时记录任务执行进度"""
+            # 直接添加到全局日志存储
+            append_task_log(task_order, status.upper() if status in ['error', 'info', 'warning'] else 'INFO', message)
             
-            def progress_callback(status, message):
-                """实时记录任务执行进度"""
-                timestamp = datetime.now().strftime('%H:%M:%S')
-                log_entry = {
-                    'timestamp': timestamp,
-                    'level': status.upper() if status in ['error', 'info', 'warning'] else 'INFO',
-                    'message': message,
-                    'task_order': task_order
-                }
-                # 直接添加到全局日志存储
-                if hasattr(app, 'task_logs') and task_order in app.task_logs:
-                    app.task_logs[task_order].append(log_entry)
-                
-                # 同时更新任务状态消息
-                if status != 'error':
-                    storage.update_task_status_by_order(task_order, 'running', message)
-                
-                # 记录到系统日志
-                if status == 'error':
-                    logger.error(f"[任务{task_order}] {message}")
-                else:
-                    logger.info(f"[任务{task_order}] {message}")
-
-            result = storage.transfer_share(
-                task['url'],
-                task.get('pwd'),
-                None,
-                task.get('save_dir'),
-                progress_callback,
-                task  # 传入完整的任务配置
-            )
+            # 同时更新任务状态消息
+            if status != 'error':
+                storage.update_task_status_by_order(task_order, 'running', message)
             
-            if result.get('success'):
-                transferred_files = result.get('transferred_files', [])
-                if transferred_files:
-                    task_results = {
-                        'success': [task],
-                        'failed': [],
-                        'transferred_files': {task['url']: transferred_files}
-                    }
-                    
-                    try:
-                        # 发送转存成功通知
-                        notify_send('百度自动追更', generate_transfer_notification(task_results))
-                    except Exception as e:
-                        logger.error(f"发送转存成功通知失败: {str(e)}")
-                    
-                    storage.update_task_status_by_order(
-                        task_order, 
-                        'normal',
-                        '转存成功',
-                        transferred_files=transferred_files
-                    )
-                    
-                    # 添加完成日志
-                    if hasattr(app, 'task_logs') and task_order in app.task_logs:
-                        app.task_logs[task_order].append({
-                            'timestamp': datetime.now().strftime('%H:%M:%S'),
-                            'level': 'INFO',
-                            'message': '任务执行完成',
-                            'task_order': task_order
-                        })
-                else:
-                    storage.update_task_status_by_order(task_order, 'normal', '没有新文件需要转存')
-                    
-                    # 添加完成日志
-                    if hasattr(app, 'task_logs') and task_order in app.task_logs:
-                        app.task_logs[task_order].append({
-                            'timestamp': datetime.now().strftime('%H:%M:%S'),
-                            'level': 'INFO',
-                            'message': '没有新文件需要转存',
-                            'task_order': task_order
-                        })
+            # 记录到系统日志
+            if status == 'error':
+                logger.error(f"[任务{task_order}] {message}")
             else:
-                error_msg = result.get('error', '转存失败')
-                storage.update_task_status_by_order(task_order, 'error', error_msg)
-                
-                # 添加错误日志
-                if hasattr(app, 'task_logs') and task_order in app.task_logs:
-                    app.task_logs[task_order].append({
-                        'timestamp': datetime.now().strftime('%H:%M:%S'),
-                        'level': 'ERROR',
-                        'message': f'任务执行失败: {error_msg}',
-                        'task_order': task_order
-                    })
+                logger.info(f"[任务{task_order}] {message}")
+
+        result = storage.transfer_share(
+            task['url'],
+            task.get('pwd'),
+            None,
+            task.get('save_dir'),
+            progress_callback,
+            task  # 传入完整的任务配置
+        )
+        
+        if result.get('success'):
+            transferred_files = result.get('transferred_files', [])
+            if transferred_files:
+                storage.update_task_status_by_order(
+                    task_order, 
+                    'normal',
+                    '转存成功',
+                    transferred_files=transferred_files,
+                    metrics=result.get('metrics')
+                )
+                # 添加完成日志
+                append_task_log(task_order, 'INFO', '任务执行完成')
+                return {'status': 'success', 'task': task, 'transferred_files': transferred_files, 'message': '转存成功'}
+
+            storage.update_task_status_by_order(task_order, 'normal', '没有新文件需要转存',
+                                                metrics=result.get('metrics'))
+            # 添加完成日志
+            append_task_log(task_order, 'INFO', '没有新文件需要转存')
+            return {'status': 'skipped', 'task': task, 'message': '没有新文件需要转存'}
+
+        error_msg = result.get('error', '转存失败')
+        storage.update_task_status_by_order(task_order, 'error', error_msg, metrics=result.get('metrics'))
+        # 添加错误日志
+        append_task_log(task_order, 'ERROR', f'任务执行失败: {error_msg}')
+        return {'status': 'failed', 'task': task, 'error': error_msg}
 
-        except Exception as e:
-            error_msg = str(e)
-            # 使用存储模块的错误解析功能
-            parsed_error = storage._parse_share_error(error_msg) if storage else error_msg
-            
-            is_share_forbidden = "error_code: 115" in error_msg
-            
-            if is_share_forbidden:
-                try:
-                    storage.remove_task_by_order(task_order)
-                    storage._update_task_orders()
-                except Exception as del_err:
-                    pass  # 删除失效任务失败，继续执行
-            
-            storage.update_task_status_by_order(task_order, 'error', parsed_error)
-            
-            # 添加异常日志
-            if hasattr(app, 'task_logs') and task_order in app.task_logs:
-                app.task_logs[task_order].append({
-                    'timestamp': datetime.now().strftime('%H:%M:%S'),
-                    'level': 'ERROR',
-                    'message': f'任务执行异常: {parsed_error}',
-                    'task_order': task_order
-                })
-
-    # 启动异步任务并立即返回
-    thread = threading.Thread(target=execute_task_async)
-    thread.daemon = True  # 设置为守护线程
-    thread.start()
-    
-    # 立即返回响应，表示任务已开始执行
-    return jsonify({'success': True, 'message': '任务已开始执行'})
+    except Exception as e:
+        error_msg = str(e)
+        # 使用存储模块的错误解析功能
+        parsed_error = storage._parse_share_error(error_msg) if storage else error_msg
+        
+        is_share_forbidden = "error_code: 115" in error_msg
+        
+        if is_share_forbidden:
+            try:
+                storage.remove_task_by_order(task_order)
+                storage._update_task_orders()
+            except Exception as del_err:
+                pass  # 删除失效任务失败，继续执行
+        
+        storage.update_task_status_by_order(task_order, 'error', parsed_error)
+        
+        # 添加异常日志
+        append_task_log(task_order, 'ERROR', f'任务执行异常: {parsed_error}')
+        if task is not None:
+            task = dict(task, error=parsed_error)
+        return {'status': 'failed', 'task': task, 'error': parsed_error}
+    finally:
+        # 执行结束后日志才允许因闲置被清理
+        task_logs.finish(task_order)
 
 @app.route('/api/users', methods=['GET'])
 @login_required
@@ -735,6 +869,7 @@ def get_users():
 @app.route('/api/user/add', methods=['POST'])
 @login_required
 @handle_api_error
+@run_blocking
 def add_user():
     """添加用户"""
     data = request.get_json()
@@ -752,6 +887,7 @@ def add_user():
 @app.route('/api/user/switch', methods=['POST'])
 @login_required
 @handle_api_error
+@run_blocking
 def switch_user():
     """切换用户"""
     data = request.get_json()
@@ -767,8 +903,9 @@ def switch_user():
             if not user:
                 return jsonify({'success': False, 'message': f'用户 {username} 不存在'})
             
-            # 重新初始化应用
+            # 重新初始化应用，并等待后台的客户端初始化完成
             init_app()
+            storage.wait_client_ready(CLIENT_INIT_WAIT_TIMEOUT)
             
             # 切换用户后立即获取用户配额信息
             try:
@@ -825,6 +962,7 @@ def delete_user():
 @app.route('/api/user/update', methods=['POST'])
 @login_required
 @handle_api_error
+@run_blocking
 def update_user():
     """更新用户信息"""
     data = request.get_json()
@@ -838,7 +976,7 @@ def update_user():
     # 如果是重命名用户
     if original_username != username:
         # 检查新用户名是否已存在
-        if username in storage.config['baidu']['users']:
+        if storage.get_user(username):
             return jsonify({'success': False, 'message': f'用户名 {username} 已存在'})
         
         # 获取原用户信息
@@ -851,18 +989,9 @@ def update_user():
         
         # 如果仅重命名，无需验证cookies
         if not cookies_changed:
-            # 复制用户信息到新用户名
-            storage.config['baidu']['users'][username] = storage.config['baidu']['users'][original_username].copy()
-            
-            # 如果是当前用户，更新当前用户名
-            if storage.config['baidu']['current_user'] == original_username:
-                storage.config['baidu']['current_user'] = username
-            
-            # 删除原用户
-            storage.remove_user(original_username)
-            
-            # 保存配置
-            storage._save_config()
+            # 在存储内一次完成重命名（是当前用户时一并更新当前用户名）
+            if not storage.rename_user(original_username, username):
+                return jsonify({'success': False, 'message': '用户更新失败'})
             
             return jsonify({'success': True, 'message': '用户更新成功'})
         else:
@@ -899,6 +1028,7 @@ def get_user_cookies(username):
 @app.route('/api/user/quota', methods=['GET'])
 @login_required
 @handle_api_error
+@run_blocking
 def get_user_quota():
     """获取当前用户的网盘配额信息"""
     if not storage:
@@ -990,6 +1120,7 @@ def update_config():
     data = request.get_json()
     
     # 处理通知配置：完全替换notify配置，清除旧字段
+    updates = dict(data)
     if 'notify' in data:
         # 格式化WEBHOOK_BODY字段
         if 'direct_fields' in data['notify'] and 'WEBHOOK_BODY' in data['notify']['direct_fields']:
@@ -997,18 +1128,14 @@ def update_config():
         
         # 完全替换整个notify对象，而不是合并
         # 这样可以清除旧的字段（push_plus_token、webhook_url等）
-        storage.config['notify'] = {
+        updates['notify'] = {
             'enabled': data['notify'].get('enabled', False),
             'notification_delay': data['notify'].get('notification_delay', 30),
             'direct_fields': data['notify'].get('direct_fields', {})
         }
-        
-        # 从data中移除notify，避免后续update重复处理
-        del data['notify']
     
-    # 更新其他配置
-    storage.config.update(data)
-    storage._save_config()
+    # 在存储的锁内替换各配置段并保存
+    storage.update_settings(updates)
     
     # 处理调度器配置更新
     if scheduler and ('cron' in data or 'scheduler' in data):
@@ -1053,6 +1180,7 @@ def update_config():
 @app.route('/api/notify/test', methods=['POST'])
 @login_required
 @handle_api_error
+@run_blocking
 def test_notify():
     """测试通知功能"""
     if not storage or not storage.config.get('notify', {}).get('enabled'):
@@ -1100,8 +1228,10 @@ def test_notify():
 @login_required
 @handle_api_error
 def execute_all_tasks():
-    """批量执行任务"""
-    if not storage:
+    """批量执行任务
+    提交为后台作业后立即返回作业ID，进度通过 /api/jobs/<job_id> 查询
+    """
+    if not storage or not job_manager:
         return jsonify({'success': False, 'message': '存储未初始化'})
         
     data = request.get_json()
@@ -1111,90 +1241,73 @@ def execute_all_tasks():
         return jsonify({'success': False, 'message': '没有指定要执行的任务'})
     
     # 将task_ids转换为orders
-    task_orders = [task_id + 1 for task_id in task_ids]
+    task_orders = sorted({task_id + 1 for task_id in task_ids})
     
-    # 获取并按order排序的任务列表
-    tasks = storage.list_tasks()
-    if not tasks:
+    if not storage.list_tasks():
         return jsonify({'success': False, 'message': '任务列表为空'})
     
-    tasks.sort(key=lambda x: x.get('order', float('inf')))
-    
-    # 找出要执行的任务
-    selected_tasks = [task for task in tasks if task.get('order') in task_orders]
+    # 按order直接找出要执行的任务
+    selected_tasks = [storage.get_task_by_order(order) for order in task_orders]
+    selected_tasks = [task for task in selected_tasks if task is not None and task.get('order')]
     
     if not selected_tasks:
         return jsonify({'success': False, 'message': '未找到指定的任务'})
     
-    results = {
-        'success': [],
-        'skipped': [],
-        'failed': [],
-        'transferred_files': {}
-    }
+    names = {task['order']: task.get('name') or f"任务{task['order']}" for task in selected_tasks}
+    job = job_manager.submit([task['order'] for task in selected_tasks], names)
     
-    for task in selected_tasks:
-        task_order = task.get('order')
-        if not task_order:
-            continue
-            
-        try:
-            result = storage.transfer_share(
-                task['url'],
-                task.get('pwd'),
-                None,
-                task.get('save_dir'),
-                None,  # progress_callback
-                task   # task_config
-            )
-            
-            if result.get('success'):
-                if result.get('skipped'):
-                    results['skipped'].append(task)
-                    storage.update_task_status_by_order(task_order, 'skipped', '没有新文件需要转存')
-                else:
-                    transferred_files = result.get('transferred_files', [])
-                    if transferred_files:
-                        results['success'].append(task)
-                        results['transferred_files'][task['url']] = transferred_files
-                        storage.update_task_status_by_order(
-                            task_order, 
-                            'success',
-                            '转存成功',
-                            transferred_files=transferred_files
-                        )
-                    else:
-                        results['skipped'].append(task)
-                        storage.update_task_status_by_order(task_order, 'skipped', '没有新文件需要转存')
-            else:
-                error_msg = result.get('error', '转存失败')
-                results['failed'].append(task)
-                storage.update_task_status_by_order(task_order, 'failed', error_msg)
-                
-        except Exception as e:
-            error_msg = str(e)
-            if "error_code: 115" in error_msg:
-                error_msg = "该分享链接已失效（文件禁止分享）"
-                try:
-                    storage.remove_task_by_order(task_order)
-                except Exception as del_err:
-                    logger.error(f"删除失效任务失败: {str(del_err)}")
-            results['failed'].append(task)
-            storage.update_task_status_by_order(task_order, 'failed', error_msg)
-    
-    # 发送通知
+    return jsonify({
+        'success': True,
+        'message': f'已开始批量执行 {len(selected_tasks)} 个任务',
+        'job_id': job.id,
+        'job': job.to_dict()
+    })
+
+def run_batch_task(task_order, job):
+    """批量作业中执行单个任务，与单任务执行共用日志缓冲区"""
+    task = storage.get_task_by_order(task_order)
+    if task is None:
+        return {'status': 'failed', 'task': None, 'error': '任务已不存在'}
+    start_task_log(task_order, task.get('name') or f'任务{task_order}')
+    return run_task_with_logs(task_order)
+
+def notify_batch_results(job):
+    """批量作业结束后发送汇总通知"""
+    results = job.results
     if results['success'] or results['failed']:
         try:
             notification_content = generate_transfer_notification(results)
             notify_send("百度网盘自动追更", notification_content)
         except Exception as e:
             logger.error(f"发送通知失败: {str(e)}")
-    
-    return jsonify({
-        'success': True,
-        'message': f'批量执行完成，成功: {len(results["success"])}，跳过: {len(results["skipped"])}，失败: {len(results["failed"])}',
-        'results': results
-    })
+
+@app.route('/api/jobs', methods=['GET'])
+@login_required
+@handle_api_error
+def list_jobs():
+    """列出最近的批量作业"""
+    if not job_manager:
+        return jsonify({'success': False, 'message': '存储未初始化'})
+    return jsonify({'success': True, 'jobs': [job.to_dict() for job in job_manager.list_jobs()]})
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@login_required
+@handle_api_error
+def get_job(job_id):
+    """获取批量作业进度（每个任务的状态，日志见 /api/task/log）"""
+    job = job_manager.get(job_id) if job_manager else None
+    if job is None:
+        return jsonify({'success': False, 'message': '作业不存在'})
+    return jsonify({'success': True, 'job': job.to_dict()})
+
+@app.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+@login_required
+@handle_api_error
+def cancel_job(job_id):
+    """取消批量作业，未开始的任务不再执行"""
+    if not job_manager or not job_manager.cancel(job_id):
+        return jsonify({'success': False, 'message': '作业不存在或已结束'})
+    return jsonify({'success': True, 'message': '作业已取消'})
 
 @app.route('/api/categories', methods=['GET'])
 @login_required
@@ -1209,18 +1322,15 @@ def get_categories():
 @app.route('/api/tasks/category/<category>', methods=['GET'])
 @login_required
 @handle_api_error
+@task_etag
 def get_tasks_by_category(category):
     """获取指定分类的任务"""
     if not storage:
         return jsonify({'success': False, 'message': '存储未初始化'})
         
-    if category == 'uncategorized':
-        tasks = storage.get_tasks_by_category(None)
-    else:
-        tasks = storage.get_tasks_by_category(category)
-    
-    # 按 order 排序
-    tasks.sort(key=lambda x: x.get('order', float('inf')))
+    # 快照中已按分类分组并排好序
+    categories = storage.get_task_snapshot().categories
+    tasks = categories.get(None if category == 'uncategorized' else category, ())
     return jsonify({'success': True, 'tasks': tasks})
 
 @app.route('/api/notify/fields', methods=['POST'])
@@ -1242,13 +1352,12 @@ def add_notify_field():
     if field_name == 'WEBHOOK_BODY':
         field_value = format_webhook_body(field_value)
         
-    notify_config = storage.config.get('notify', {})
+    notify_config = storage.get_settings('notify')
     if 'custom_fields' not in notify_config:
         notify_config['custom_fields'] = {}
         
     notify_config['custom_fields'][field_name] = field_value
-    storage.config['notify'] = notify_config
-    storage._save_config()
+    storage.update_settings({'notify': notify_config})
     
     return jsonify({'success': True, 'message': '添加通知字段成功'})
 
@@ -1266,7 +1375,7 @@ def delete_notify_field():
     if not field_name:
         return jsonify({'success': False, 'message': '字段名称不能为空'})
         
-    notify_config = storage.config.get('notify', {})
+    notify_config = storage.get_settings('notify')
     
     # 检查字段在哪个配置中
     field_deleted = False
@@ -1284,8 +1393,7 @@ def delete_notify_field():
     if not field_deleted:
         return jsonify({'success': False, 'message': f'未找到字段: {field_name}'})
     
-    storage.config['notify'] = notify_config
-    storage._save_config()
+    storage.update_settings({'notify': notify_config})
     
     # 重新初始化通知配置
     if scheduler:
@@ -1396,6 +1504,35 @@ def reload_scheduler():
             'message': f'重新加载调度器失败: {str(e)}'
         }), 500
 
+@app.route('/api/scheduler/stats', methods=['GET'])
+@login_required
+@handle_api_error
+def get_scheduler_stats():
+    """定时任务的触发统计：触发与实际开始的延迟、合并次数和跳过原因
+    查询参数 task_order 指定时只返回该任务
+    """
+    if not scheduler:
+        return jsonify({'success': False, 'message': '调度器未初始化'})
+    stats = scheduler.schedule_stats
+    scheduler_config = storage.config.get('scheduler', {})
+    task_order = request.args.get('task_order', type=int)
+    if task_order is not None:
+        task_stats = stats.get(task_order)
+        tasks = [task_stats] if task_stats else []
+    else:
+        tasks = stats.snapshot()
+    return jsonify({
+        'success': True,
+        'config': {
+            'max_workers': scheduler_config.get('max_workers', 1),
+            'coalesce': scheduler_config.get('coalesce', True),
+            'misfire_grace_time': scheduler_config.get('misfire_grace_time', 3600)
+        },
+        'skip_reasons': SKIP_REASONS,
+        'summary': stats.summary(),
+        'tasks': tasks
+    })
+
 @app.route('/api/tasks/batch-delete', methods=['POST'])
 @login_required
 @handle_api_error
@@ -1505,362 +1642,249 @@ def update_auth():
         return jsonify({'success': False, 'message': '用户名、新密码和旧密码都不能为空'})
     
     # 验证旧密码
-    auth_config = storage.config.get('auth', {})
+    auth_config = storage.get_settings('auth')
     if old_password != auth_config.get('password'):
         return jsonify({'success': False, 'message': '旧密码错误'})
     
     # 更新配置
     auth_config['users'] = new_username
     auth_config['password'] = new_password
-    storage.config['auth'] = auth_config
-    storage._save_config()
+    storage.update_settings({'auth': auth_config})
     
     return jsonify({'success': True, 'message': '登录凭据更新成功'})
 
 @app.route('/api/version/check', methods=['GET'])
 @handle_api_error
 def check_version():
-    """检查最新版本"""
-    try:
-        import feedparser
-        import requests
-        from requests.exceptions import RequestException
-        import re
-        
-        # 获取查询参数，确定使用哪个源检查更新
-        source = request.args.get('source', 'github')
-        
-        if source == 'dockerhub':
-            # 使用 Docker Hub RSS 检查更新
-            feed_url = DOCKER_HUB_RSS
-        elif source == 'dockerhub_alt':
-            # 使用备用 Docker Hub RSS 源
-            feed_url = DOCKER_HUB_RSS_ALT
-        elif source in ['msrun', '1ms']:
-            # 使用 1ms.run API 获取版本信息
-            try:
-                params = {
-                    "repositories": "kokojacket/baidu-autosave",
-                    "page": 1,
-                    "page_size": 10,
-                    "search": ""
-                }
-                response = requests.get(MS_RUN_API, params=params, timeout=5)
-                response.raise_for_status()
-                data = response.json()
-                
-                if data.get('code') == 0 and data.get('data', {}).get('list'):
-                    # 查找最新的正式版本（格式为vX.Y.Z）
-                    version_tags = []
-                    latest_tag = None
-                    
-                    # 首先找到latest标签
-                    for tag_info in data['data']['list']:
-                        if tag_info['tag_name'] == 'latest':
-                            latest_tag = tag_info
-                            break
-                    
-                    if latest_tag:
-                        # 找到与latest标签具有相同digest的版本标签
-                        latest_digest = latest_tag.get('digest')
-                        for tag_info in data['data']['list']:
-                            if re.match(r'^v\d+\.\d+\.\d+$', tag_info['tag_name']) and tag_info.get('digest') == latest_digest:
-                                version_tags.append(tag_info)
-                    
-                    # 如果没有找到与latest相同digest的版本标签，则收集所有版本标签
-                    if not version_tags:
-                        for tag_info in data['data']['list']:
-                            if re.match(r'^v\d+\.\d+\.\d+$', tag_info['tag_name']):
-                                version_tags.append(tag_info)
-                    
-                    if version_tags:
-                        # 按更新时间排序，选择最新的
-                        version_tags.sort(key=lambda x: x.get('tag_last_pushed', ''), reverse=True)
-                        latest_version = version_tags[0]['tag_name']
-                        published = version_tags[0].get('tag_last_pushed')
-                        link = f"https://hub.docker.com/layers/kokojacket/baidu-autosave/{latest_version}/images/{version_tags[0].get('digest', '').split(':')[-1]}"
-                        
-                        logger.info(f"从1ms.run API获取到最新版本: {latest_version}")
-                        return jsonify({
-                            'success': True,
-                            'version': latest_version,
-                            'published': published,
-                            'link': link,
-                            'source': '1ms'
-                        })
-                
-                # 如果没有找到有效的版本信息，返回错误
-                logger.warning("1ms.run API未返回有效的版本信息")
-                return jsonify({
-                    'success': False,
-                    'message': '1ms.run API未返回有效的版本信息',
-                    'source': '1ms'
-                })
-                
-            except Exception as e:
-                logger.warning(f"从1ms.run API获取版本信息失败: {str(e)}")
-                return jsonify({
-                    'success': False,
-                    'message': f'从1ms.run API获取版本信息失败: {str(e)}',
-                    'source': '1ms'
-                })
-        else:
-            # 默认使用 GitHub releases feed
-            feed_url = f'https://github.com/{GITHUB_REPO}/releases.atom'
-        
-        # 如果是使用RSS源，则执行以下代码
-        if source in ['github', 'dockerhub', 'dockerhub_alt']:
-            try:
-                # 设置超时，避免长时间等待
-                response = requests.get(feed_url, timeout=5)
-                response.raise_for_status()  # 如果响应状态码不是200，抛出异常
-            except RequestException as e:
-                logger.warning(f"获取{source}版本信息失败: {str(e)}")
-                return jsonify({
-                    'success': False,
-                    'message': f'无法获取{source}版本信息: {str(e)}',
-                    'source': source
-                })
-                
-            # 解析 feed
-            feed = feedparser.parse(response.content)
-            if not feed.entries:
-                logger.warning(f"{source}未找到版本信息")
-                return jsonify({
-                    'success': False,
-                    'message': f'{source}未找到版本信息',
-                    'source': source
-                })
-                
-            # 获取最新版本信息
-            if source in ['dockerhub', 'dockerhub_alt']:
-                # 首先查找latest标签的条目
-                latest_entry = None
-                latest_guid = None
-                version_entry = None
-                
-                for entry in feed.entries:
-                    if ':latest' in entry.title:
-                        latest_entry = entry
-                        # 提取镜像ID（guid的@后面部分）
-                        guid_match = re.search(r'@([a-f0-9]+)$', entry.guid)
-                        if guid_match:
-                            latest_guid = guid_match.group(1)
-                        break
-                
-                if not latest_entry:
-                    logger.warning("Docker Hub中未找到latest标签")
-                    # 如果没有找到latest标签，使用第一个条目
-                    latest_entry = feed.entries[0]
-                
-                # 如果找到了latest的guid，查找对应的版本号条目
-                if latest_guid:
-                    for entry in feed.entries:
-                        # 检查是否是版本号标签（如v1.0.8）并且与latest有相同的guid
-                        if re.search(r':v\d+\.\d+\.\d+', entry.title) and latest_guid in entry.guid:
-                            version_entry = entry
-                            break
-                
-                # 如果找到了版本号条目，使用它；否则使用latest条目
-                entry_to_use = version_entry if version_entry else latest_entry
-                
-                # 提取版本号
-                title = entry_to_use.title
-                version_match = re.search(r':(?:v?\d+\.\d+\.\d+|latest)', title)
-                latest_version = version_match.group(0)[1:] if version_match else title
-                
-                # 添加发布日期
-                pub_date = entry_to_use.pubDate if hasattr(entry_to_use, 'pubDate') else entry_to_use.published
-                
-                logger.info(f"从Docker Hub ({source})获取到最新版本: {latest_version}")
-                return jsonify({
-                    'success': True,
-                    'version': latest_version,
-                    'published': pub_date,
-                    'link': entry_to_use.link,
-                    'source': source
-                })
-            else:
-                # GitHub 格式
-                title = feed.entries[0].title
-                
-                # 从标题中提取版本号，支持多种格式：
-                # 1. "Release v1.0.8" -> "v1.0.8"
-                # 2. "v1.0.8" -> "v1.0.8"
-                # 3. "1.0.8" -> "1.0.8"
-                version_match = re.search(r'(?:Release\s+)?(v?\d+\.\d+\.\d+)', title)
-                if version_match:
-                    latest_version = version_match.group(1)
-                    # 确保版本号以v开头
-                    if not latest_version.startswith('v'):
-                        latest_version = 'v' + latest_version
-                else:
-                    # 如果无法提取版本号，使用原始标题
-                    latest_version = title
-                
-                pub_date = feed.entries[0].published if hasattr(feed.entries[0], 'published') else None
-                link = feed.entries[0].link if hasattr(feed.entries[0], 'link') else f"https://github.com/{GITHUB_REPO}/releases/latest"
-                
-                logger.info(f"从GitHub获取到最新版本: {title} -> 提取版本号: {latest_version}")
-                return jsonify({
-                    'success': True,
-                    'version': latest_version,
-                    'published': pub_date,
-                    'link': link,
-                    'source': 'github'
-                })
-    except Exception as e:
-        logger.error(f"检查版本失败: {str(e)}")
-        return jsonify({
-            'success': False,
-            'message': f'检查版本失败: {str(e)}',
-            'source': source if 'source' in locals() else 'unknown'
-        })
+    """获取最新版本，source 参数确定使用哪个源
+    直接返回调度器定时刷新的缓存，不等待网络请求；还没有缓存时在后台获取，并返回 pending
+    """
+    source = request.args.get('source', 'github')
+    result = version_checker.get(source)
+    if result is None:
+        return jsonify({'success': False, 'pending': True, 'message': '正在获取最新版本，请稍后再试',
+                        'source': source})
+    return jsonify(result)
 
 # 添加轮询API端点
 @app.route('/api/tasks/status', methods=['GET'])
 @login_required
 @handle_api_error
+@task_etag(include_schedule=True)
 def get_tasks_status():
-    """获取所有任务的状态（用于轮询）"""
+    """获取所有任务的状态（用于轮询）
+    查询参数 since 为上次响应中的 version，只返回之后状态有变化的任务（full=false），
+    期间有任务增删、重排等整体变化时返回完整列表（full=true）
+    """
     if not storage:
         return jsonify({'success': False, 'message': '存储未初始化'})
-    tasks = storage.list_tasks()
-    # 按 order 排序，没有 order 的排在最后
-    tasks.sort(key=lambda x: x.get('order', float('inf')))
-    return jsonify({'success': True, 'tasks': tasks})
+    since = request.args.get('since', type=int)
+    schedule = scheduler.schedule_stats.summary() if scheduler else None
+    if since is not None:
+        version, tasks = storage.get_task_changes(since)
+        if tasks is not None:
+            return jsonify({'success': True, 'version': version, 'full': False, 'tasks': tasks,
+                            'schedule': schedule})
+    # 快照已按 order 排序，直接序列化
+    snapshot = storage.get_task_snapshot()
+    return jsonify({'success': True, 'version': snapshot.version, 'full': True, 'tasks': snapshot.tasks,
+                    'schedule': schedule})
+
+def publish_task_change(version, task):
+    """存储变更回调：单任务变化发布 task_status 增量，整体变化发布 tasks_changed"""
+    if task is None:
+        event_broker.publish('tasks_changed', {'version': version})
+        return
+    # 转存文件列表可能很大，增量中不携带，需要时通过 /api/tasks 获取
+    fields = {key: value for key, value in list(task.items()) if key != 'transferred_files'}
+    event_broker.publish('task_status', {
+        'version': version,
+        'task_order': task.get('order'),
+        'task': fields
+    })
+
+@app.route('/api/health', methods=['GET'])
+def health():
+    """健康检查，无需登录
+    Web 服务可用即返回 200；带上 ready=1 时网盘客户端未就绪返回 503，可用作就绪检查
+    """
+    client = storage.client_status() if storage else {'state': 'pending', 'error': None, 'ready': False}
+    result = {
+        'success': True,
+        'ready': client['ready'],
+        'client': client['state'],
+        'scheduler': bool(scheduler and scheduler.is_running)
+    }
+    # 失败原因可能包含用户名，只对已登录的会话返回
+    if 'username' in session:
+        result['client_error'] = client['error']
+    status = 503 if request.args.get('ready') in ('1', 'true') and not client['ready'] else 200
+    return jsonify(result), status
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus 格式的运行指标
+    需带上 Authorization: Bearer <METRICS_TOKEN>（供 Prometheus 抓取），或已登录的会话；
+    未设置环境变量 METRICS_TOKEN 时只能通过登录会话访问
+    """
+    token = os.getenv('METRICS_TOKEN')
+    authorized = bool(token) and hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not authorized and 'username' in session:
+        session_timeout = storage.config.get('auth', {}).get('session_timeout', 3600) if storage else 3600
+        authorized = time.time() - session.get('login_time', 0) <= session_timeout
+    if not authorized:
+        return Response('unauthorized\n', status=401, mimetype='text/plain')
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/api/events', methods=['GET'])
+@login_required
+def stream_events():
+    """服务端推送事件流（SSE），替代对任务状态、任务日志和系统日志的轮询
+    查询参数:
+        types: 逗号分隔的事件类型（task_status/tasks_changed/task_log/log），默认全部
+        task_order: 只接收指定任务的 task_status/task_log 事件
+    断线重连时浏览器会带上 Last-Event-ID，从中断处继续推送；
+    错过的事件已被挤出缓冲区时推送 reset 事件，前端应重新拉取完整数据
+    """
+    types = {t.strip() for t in request.args.get('types', '').split(',') if t.strip()}
+    task_order = request.args.get('task_order', type=int)
+    try:
+        cursor = int(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+    except (TypeError, ValueError):
+        # 新连接只推送之后发生的事件
+        cursor = event_broker.last_id
+
+    def generate():
+        nonlocal cursor
+        yield 'retry: 3000\n\n'
+        last_write = time.time()
+        while True:
+            events, missed = event_broker.since(cursor)
+            if missed:
+                if not events:
+                    cursor = event_broker.last_id
+                yield format_sse('reset', {'last_event_id': cursor})
+                last_write = time.time()
+            for event in events:
+                cursor = event.id
+                if types and event.type not in types:
+                    continue
+                if task_order is not None and event.type in ('task_status', 'task_log') \
+                        and event.data.get('task_order') != task_order:
+                    continue
+                yield format_sse(event.type, event.data, event.id)
+                last_write = time.time()
+            if time.time() - last_write >= SSE_KEEPALIVE_INTERVAL:
+                # 心跳注释，防止代理因空闲断开连接
+                yield ': keep-alive\n\n'
+                last_write = time.time()
+            gevent.sleep(SSE_POLL_INTERVAL)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # 关闭nginx缓冲
+    })
+
+# 日志级别数值，用于按最低级别过滤
+LOG_LEVEL_NO = {'TRACE': 5, 'DEBUG': 10, 'INFO': 20, 'SUCCESS': 25, 'WARNING': 30, 'ERROR': 40, 'CRITICAL': 50}
+
+def parse_log_line(line):
+    """解析日志文件中的一行（时间 | 级别 | 位置 - 消息），无法解析时原样作为消息"""
+    parts = line.split('|', 2)
+    if len(parts) == 3:
+        return {
+            'timestamp': parts[0].strip(),
+            'level': parts[1].strip(),
+            'message': parts[2].strip()
+        }
+    # 异常堆栈等多行日志的后续行
+    return {'timestamp': '', 'level': 'INFO', 'message': line.strip()}
 
 @app.route('/api/logs', methods=['GET'])
 @login_required
 @handle_api_error
 def get_logs():
-    """获取最近的日志（用于轮询）"""
+    """获取最近的日志（用于轮询）
+    查询参数:
+        limit: 返回的日志条数，默认20
+        level: 最低日志级别，如 WARNING 返回 WARNING/ERROR/CRITICAL
+        keyword: 只返回包含关键字的日志
+        task_order: 只返回指定任务的日志
+        since: 只返回 seq 大于该值的日志，用于增量拉取
+        source: 为 file 时从当天的日志文件读取（可查看服务启动前的日志）
+    """
     # 获取查询参数
     limit = request.args.get('limit', 20, type=int)
-    
-    # 从日志文件中读取最新的日志
+    min_level = LOG_LEVEL_NO.get(request.args.get('level', '').strip().upper())
+    keyword = request.args.get('keyword', '').strip()
+    task_order = request.args.get('task_order', type=int)
+    since = request.args.get('since', type=int)
+    
+    if request.args.get('source') != 'file':
+        log_entries = log_buffer.query(limit, min_level=min_level, keyword=keyword,
+                                       task_order=task_order, since=since)
+        return jsonify({'success': True, 'logs': log_entries, 'last_seq': log_buffer.last_seq})
+    
+    def match(line):
+        if keyword and keyword not in line:
+            return False
+        if min_level is not None:
+            return LOG_LEVEL_NO.get(parse_log_line(line)['level'], 0) >= min_level
+        return True
+    
+    # 从日志文件末尾倒序读取，读取量只与limit有关
     log_entries = []
     try:
         today = datetime.now().strftime('%Y-%m-%d')
         log_file = f"log/web_app_{today}.log"
         
         if os.path.exists(log_file):
-            with open(log_file, 'r', encoding='utf-8') as f:
-                # 读取最后limit行
-                lines = f.readlines()
-                last_lines = lines[-limit:] if len(lines) > limit else lines
-                
-                for line in last_lines:
-                    # 解析日志格式
-                    try:
-                        parts = line.split('|')
-                        if len(parts) >= 3:
-                            timestamp = parts[0].strip()
-                            level = parts[1].strip()
-                            message = '|'.join(parts[2:]).strip()
-                            
-                            log_entries.append({
-                                'timestamp': timestamp,
-                                'level': level,
-                                'message': message
-                            })
-                    except:
-                        # 如果解析失败，添加原始行
-                        log_entries.append({
-                            'timestamp': '',
-                            'level': 'INFO',
-                            'message': line.strip()
-                        })
+            filtered = keyword or min_level is not None
+            lines = tail_lines(log_file, limit, match if filtered else None)
+            log_entries = [parse_log_line(line) for line in lines]
     except Exception as e:
         logger.error(f"读取日志文件失败: {str(e)}")
         return jsonify({'success': False, 'message': f'读取日志文件失败: {str(e)}'})
     
     return jsonify({'success': True, 'logs': log_entries})
 
-def cleanup_old_task_logs():
-    """清理超过1小时的任务日志，释放内存"""
-    if not hasattr(app, 'task_logs'):
-        return
-    
-    current_time = datetime.now()
-    tasks_to_remove = []
-    
-    # 获取所有任务状态
-    try:
-        if storage:
-            tasks = storage.list_tasks()
-            for task_order in list(app.task_logs.keys()):
-                # 查找对应的任务
-                task_found = False
-                for task in tasks:
-                    if task.get('order') == task_order:
-                        task_found = True
-                        # 如果任务不是运行状态，且日志有内容，检查最后一条日志的时间
-                        if task.get('status') != 'running' and app.task_logs[task_order]:
-                            last_log = app.task_logs[task_order][-1]
-                            if 'timestamp' in last_log:
-                                try:
-                                    # 解析时间戳（HH:MM:SS格式）
-                                    last_time_str = last_log['timestamp']
-                                    last_time = datetime.strptime(f"{current_time.strftime('%Y-%m-%d')} {last_time_str}", '%Y-%m-%d %H:%M:%S')
-                                    
-                                    # 如果是昨天的日志，需要调整日期
-                                    if last_time > current_time:
-                                        last_time = last_time.replace(day=last_time.day - 1)
-                                    
-                                    # 如果超过1小时，标记为删除
-                                    if (current_time - last_time).total_seconds() > 3600:
-                                        tasks_to_remove.append(task_order)
-                                except:
-                                    # 时间解析失败，保留日志
-                                    pass
-                        break
-                
-                # 如果任务不存在，也清理其日志
-                if not task_found:
-                    tasks_to_remove.append(task_order)
-        
-        # 删除标记的日志
-        for task_order in tasks_to_remove:
-            if task_order in app.task_logs:
-                del app.task_logs[task_order]
-                logger.debug(f"已清理任务{task_order}的历史日志")
-                
-    except Exception as e:
-        logger.error(f"清理任务日志失败: {str(e)}")
-
 @app.route('/api/task/log/<int:task_id>', methods=['GET'])
 @login_required
 @handle_api_error
 def get_task_log(task_id):
-    """获取指定任务的执行日志（用于轮询）"""
+    """获取指定任务的执行日志（用于轮询）
+    查询参数 since 为上次收到的最后一条日志的 seq，只返回其后的新日志；
+    run 为上次响应中的执行编号，任务重新执行（日志缓冲区已被重置）后编号不同，
+    此时返回完整日志并带上 reset=true
+    """
     try:
+        since = request.args.get('since', type=int)
+        run = request.args.get('run', type=int)
+
         # 根据task_id找到真实的任务order
         if not storage:
             return jsonify({'success': False, 'message': '存储未初始化'})
         
-        tasks = storage.list_tasks()
+        tasks = storage.get_task_snapshot().tasks
         if not tasks or task_id >= len(tasks):
-            return jsonify({'success': True, 'logs': []})
+            return jsonify({'success': True, 'logs': [], 'last_seq': since or 0})
         
         # 获取真实的task order
         task_order = tasks[task_id].get('order')
         
-        # 定期清理旧日志（每100次请求清理一次）
-        if not hasattr(app, '_log_cleanup_counter'):
-            app._log_cleanup_counter = 0
-        app._log_cleanup_counter += 1
-        if app._log_cleanup_counter >= 100:
-            cleanup_old_task_logs()
-            app._log_cleanup_counter = 0
-        
-        # 从全局变量中获取任务日志
-        if hasattr(app, 'task_logs') and task_order in app.task_logs:
-            logs = app.task_logs[task_order]
-            return jsonify({'success': True, 'logs': logs})
-        else:
-            # 如果没有找到任务日志，返回空列表
-            return jsonify({'success': True, 'logs': []})
+        # 获取任务日志，没有日志时为空列表
+        current_run, logs = task_logs.get_run(task_order)
+        last_seq = logs[-1]['seq'] if logs else (since or 0)
+        
+        if since is None:
+            return jsonify({'success': True, 'logs': logs, 'last_seq': last_seq, 'run': current_run})
+        if (run is not None and run != current_run) or (logs and since < logs[0]['seq'] - 1):
+            # 任务已重新执行，或游标早于当前缓冲区（日志超出保留条数），返回完整日志
+            return jsonify({'success': True, 'logs': logs, 'last_seq': last_seq, 'run': current_run,
+                            'reset': True})
+        # seq 单调递增，二分定位游标之后的日志
+        start = bisect.bisect_right(logs, since, key=lambda entry: entry['seq'])
+        return jsonify({'success': True, 'logs': logs[start:], 'last_seq': last_seq, 'run': current_run})
     except Exception as e:
         logger.error(f"获取任务日志失败: {str(e)}")
         return jsonify({'success': False, 'message': f'获取任务日志失败: {str(e)}'})
@@ -1868,6 +1892,7 @@ def get_task_log(task_id):
 @app.route('/api/task/share', methods=['POST'])
 @login_required
 @handle_api_error
+@run_blocking
 def share_task():
     """生成任务的分享链接"""
     if not storage:
@@ -1882,8 +1907,7 @@ def share_task():
         return jsonify({'success': False, 'message': '任务ID不能为空'})
     
     # 获取任务信息
-    tasks = storage.list_tasks()
-    tasks.sort(key=lambda x: x.get('order', float('inf')))
+    tasks = storage.get_task_snapshot().tasks
     
     if 0 <= task_id < len(tasks):
         task = tasks[task_id]
@@ -1942,8 +1966,7 @@ def update_share_config():
     }
     
     # 更新配置
-    storage.config['share'] = share_config
-    storage._save_config()
+    storage.update_settings({'share': share_config})
     
     return jsonify({'success': True, 'message': '分享配置已更新'})
 